@@ -0,0 +1,161 @@
+# Streaming exporters for analysed tweets
+# pip install pyarrow  (optional, enables Parquet output)
+
+import csv
+import json
+import logging
+import typing
+from dataclasses import fields, is_dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROW_GROUP_SIZE = 50_000
+
+
+def _column_kind(annotation: Any) -> str:
+    """Map a dataclass field annotation to a column kind"""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        # Optional[X] -> X
+        non_null = [a for a in args if a is not type(None)]
+        return _column_kind(non_null[0]) if len(non_null) == 1 else 'string'
+    if origin in (list, List):
+        return 'list_string'
+    return {str: 'string', int: 'int', float: 'float', bool: 'bool'}.get(annotation, 'string')
+
+
+def record_schema(record_type: type) -> List[Tuple[str, str]]:
+    """(column, kind) pairs derived from a dataclass, in field order"""
+    if not is_dataclass(record_type):
+        raise TypeError(f"{record_type!r} is not a dataclass")
+    hints = typing.get_type_hints(record_type)
+    return [(f.name, _column_kind(hints[f.name])) for f in fields(record_type)]
+
+
+def arrow_schema(schema: Sequence[Tuple[str, str]]) -> "pa.Schema":
+    types = {
+        'string': pa.string(), 'int': pa.int64(), 'float': pa.float64(),
+        'bool': pa.bool_(), 'list_string': pa.list_(pa.string())
+    }
+    return pa.schema([(name, types[kind]) for name, kind in schema])
+
+
+class NdjsonStreamWriter:
+    """One JSON object per line; constant memory"""
+
+    def __init__(self, path: str, schema: Sequence[Tuple[str, str]]):
+        self.path = path
+        self.columns = [name for name, _ in schema]
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, record: Any):
+        row = {name: getattr(record, name) for name in self.columns}
+        self.file.write(json.dumps(row, ensure_ascii=False))
+        self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CsvStreamWriter:
+    """CSV with a fixed header; list columns are JSON encoded"""
+
+    def __init__(self, path: str, schema: Sequence[Tuple[str, str]]):
+        self.path = path
+        self.schema = list(schema)
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow([name for name, _ in self.schema])
+
+    def write(self, record: Any):
+        row = []
+        for name, kind in self.schema:
+            value = getattr(record, name)
+            row.append(json.dumps(value, ensure_ascii=False) if kind == 'list_string' else value)
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetStreamWriter:
+    """Buffers column values and flushes one Parquet row group at a time"""
+
+    def __init__(self, path: str, schema: Sequence[Tuple[str, str]],
+                 row_group_size: int = DEFAULT_ROW_GROUP_SIZE):
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        self.path = path
+        self.columns = [name for name, _ in schema]
+        self.schema = arrow_schema(schema)
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        self.buffer: Dict[str, list] = {name: [] for name in self.columns}
+        self.buffered = 0
+
+    def write(self, record: Any):
+        for name in self.columns:
+            self.buffer[name].append(getattr(record, name))
+        self.buffered += 1
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffered:
+            return
+        batch = pa.record_batch([self.buffer[name] for name in self.columns], schema=self.schema)
+        self.writer.write_batch(batch, row_group_size=self.row_group_size)
+        self.buffer = {name: [] for name in self.columns}
+        self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+WRITERS = {
+    'ndjson': NdjsonStreamWriter,
+    'csv': CsvStreamWriter,
+    'parquet': ParquetStreamWriter,
+}
+
+
+def export_records(records: Iterable[Any], record_type: type, path_prefix: str,
+                   formats: Sequence[str] = ('ndjson', 'csv', 'parquet'),
+                   row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> Dict[str, str]:
+    """Stream records once into every requested format.
+
+    ``records`` may be any iterable (including a generator); memory use is
+    bounded by one Parquet row group. Parquet is skipped with a warning
+    when pyarrow is not installed. Returns {format: path}.
+    """
+    schema = record_schema(record_type)
+    writers = {}
+    for fmt in formats:
+        if fmt == 'parquet' and not PARQUET_AVAILABLE:
+            logger.warning("pyarrow not installed, skipping Parquet export")
+            continue
+        path = f"{path_prefix}.{fmt}"
+        if fmt == 'parquet':
+            writers[fmt] = ParquetStreamWriter(path, schema, row_group_size)
+        else:
+            writers[fmt] = WRITERS[fmt](path, schema)
+
+    try:
+        for record in records:
+            for writer in writers.values():
+                writer.write(record)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    return {fmt: writer.path for fmt, writer in writers.items()}
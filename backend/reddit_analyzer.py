@@ -1,8 +1,16 @@
 from textblob import TextBlob
-import json
+import os
+import sys
 from datetime import datetime
 from typing import List, Dict, Optional
 
+# Shared service modules live in python-services/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python-services'))
+from metrics import CACHE_REQUESTS
+from nlp_executor import shared_executor, text_polarity
+from post_model import Post
+from serialization import write_output
+
 # Reuse keywords from scraper.py
 KEYWORDS = [
     "ocean hazard", "tsunami", "storm surge", "hurricane", "cyclone", "typhoon",
@@ -19,6 +27,7 @@ EXTENDED_KEYWORDS = [
 class RedditHazardAnalyzer:
     def __init__(self):
         self.sentiment_cache = {}
+        self.nlp_executor = shared_executor(text_polarity)
         self.hazard_categories = {
             "tsunami": ["tsunami", "underwater earthquake"],
             "storms": ["hurricane", "cyclone", "typhoon", "storm surge", "storm damage"],
@@ -30,14 +39,24 @@ class RedditHazardAnalyzer:
             "general": ["ocean hazard", "marine ecosystem"]
         }
 
-    def analyze_sentiment(self, text: str) -> tuple:
+    def analyze_sentiments(self, texts: List[str]) -> List[tuple]:
+        """analyze_sentiment for a batch, computing uncached TextBlob polarities on worker processes"""
+        pending = list({text.lower().strip(): text for text in texts
+                        if text.lower().strip() not in self.sentiment_cache}.values())
+        CACHE_REQUESTS.inc(len(pending), cache='reddit_sentiment', result='miss')
+        CACHE_REQUESTS.inc(len(texts) - len(pending), cache='reddit_sentiment', result='hit')
+        for text, polarity in zip(pending, self.nlp_executor.map(pending)):
+            self.analyze_sentiment(text, polarity)
+        return [self.analyze_sentiment(text) for text in texts]
+
+    def analyze_sentiment(self, text: str, polarity: Optional[float] = None) -> tuple:
         """Analyze sentiment of text using TextBlob with ocean hazard context"""
         text_key = text.lower().strip()
         if text_key in self.sentiment_cache:
             return self.sentiment_cache[text_key]
         
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
+        if polarity is None:
+            polarity = TextBlob(text).sentiment.polarity
         
         # Enhanced ocean/disaster-specific sentiment modifiers with weights
         disaster_severity = {
@@ -107,7 +126,14 @@ class RedditHazardAnalyzer:
                 return category
         return "general"
 
-    def analyze_reddit_post(self, post: Dict) -> Optional[Dict]:
+    def analyze_reddit_posts(self, posts: List[Dict]) -> List[Post]:
+        """Analyze a batch of Reddit posts, scoring sentiment on worker processes"""
+        relevant = [post for post in posts
+                    if self.is_ocean_hazard_relevant(post.get('title', '') + ' ' + post.get('selftext', ''))]
+        sentiments = self.analyze_sentiments([f"{post['title']} {post['selftext']}" for post in relevant])
+        return [self.analyze_reddit_post(post, sentiment) for post, sentiment in zip(relevant, sentiments)]
+
+    def analyze_reddit_post(self, post: Dict, sentiment: Optional[tuple] = None) -> Optional[Post]:
         """Analyze a Reddit post for ocean hazard content"""
         if not self.is_ocean_hazard_relevant(post.get('title', '') + ' ' + post.get('selftext', '')):
             return None
@@ -115,35 +141,29 @@ class RedditHazardAnalyzer:
         # Combine title and text for analysis
         full_text = f"{post['title']} {post['selftext']}"
         matched_keywords = self.find_matching_keywords(full_text)
-        sentiment_score, sentiment_label, confidence = self.analyze_sentiment(full_text)
+        sentiment_score, sentiment_label, confidence = sentiment or self.analyze_sentiment(full_text)
         hazard_category = self.categorize_hazard(matched_keywords)
 
-        return {
-            'id': f"reddit_{post['id']}",
-            'text': full_text,
-            'created_at': datetime.fromtimestamp(post['created_utc']).isoformat(),
-            'author': {
-                'username': post['author'],
-                'name': post['author'],
-                'location': post.get('subreddit', 'Unknown')
-            },
-            'location': {
-                'type': 'subreddit',
-                'name': post['subreddit_name_prefixed']
-            },
-            'sentiment': sentiment_label.capitalize(),
-            'polarity': sentiment_score,
-            'urgency': self.determine_urgency(sentiment_score, matched_keywords),
-            'hazard_type': hazard_category,
-            'metrics': {
+        return Post(
+            id=f"reddit_{post['id']}",
+            text=full_text,
+            created_at=datetime.fromtimestamp(post['created_utc']).isoformat(),
+            author=post['author'],
+            author_location=post.get('subreddit', 'Unknown'),
+            location=post['subreddit_name_prefixed'],
+            location_type='subreddit',
+            sentiment=sentiment_label.capitalize(),
+            polarity=sentiment_score,
+            urgency=self.determine_urgency(sentiment_score, matched_keywords),
+            hazard_type=hazard_category,
+            engagement={
                 'upvotes': post['ups'],
                 'comments': post['num_comments'],
                 'score': post['score']
             },
-            'processed_at': datetime.now().isoformat(),
-            'source': 'reddit',
-            'matched_keywords': matched_keywords
-        }
+            source='reddit',
+            extra={'matched_keywords': matched_keywords}
+        )
 
     def determine_urgency(self, sentiment_score: float, keywords: List[str]) -> str:
         """Determine post urgency based on sentiment and keywords"""
@@ -198,7 +218,7 @@ def generate_mock_reddit_posts() -> List[Dict]:
         }
     ]
 
-def get_analyzed_reddit_posts(use_mock: bool = True) -> List[Dict]:
+def get_analyzed_reddit_posts(use_mock: bool = True) -> List[Post]:
     """Get and analyze Reddit posts"""
     analyzer = RedditHazardAnalyzer()
     
@@ -208,15 +228,9 @@ def get_analyzed_reddit_posts(use_mock: bool = True) -> List[Dict]:
         # TODO: Implement real Reddit API integration
         posts = generate_mock_reddit_posts()
     
-    analyzed_posts = []
-    for post in posts:
-        analyzed = analyzer.analyze_reddit_post(post)
-        if analyzed:
-            analyzed_posts.append(analyzed)
-    
-    return analyzed_posts
+    return analyzer.analyze_reddit_posts(posts)
 
 if __name__ == "__main__":
     # Test the analyzer
     posts = get_analyzed_reddit_posts()
-    print(json.dumps(posts, indent=2))
+    write_output(posts)
@@ -1,21 +1,20 @@
 # Required installations:
-# pip install selenium webdriver-manager fake-useragent beautifulsoup4 requests pandas textblob
+# pip install selenium webdriver-manager fake-useragent beautifulsoup4 requests textblob pyarrow
 
 import json
 import time
 import random
 import logging
 import os
+import sys
 import platform
 from dataclasses import dataclass, asdict
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterable, Optional
 import re
 from textblob import TextBlob
 from collections import Counter
-import pandas as pd
 from datetime import datetime, timedelta
 import concurrent.futures
-import requests
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -52,6 +51,15 @@ from urllib.parse import quote
 import csv
 from fake_useragent import UserAgent
 
+# Shared service modules live in python-services/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python-services'))
+from near_duplicates import NearDuplicateIndex
+from exporters import export_records
+from metrics import CACHE_REQUESTS
+from http_session import make_session
+from nlp_executor import shared_executor, text_polarity
+from post_model import intern_category, slotted
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -69,6 +77,7 @@ EXTENDED_KEYWORDS = [
     "ocean acidification", "marine ecosystem"
 ]
 
+@slotted
 @dataclass
 class OceanHazardTweet:
     username: str
@@ -87,6 +96,13 @@ class OceanHazardTweet:
     source: str
     location: Optional[str] = None
     verified: bool = False
+    duplicate_count: int = 1
+    
+    def __post_init__(self):
+        # Categorical values are shared rather than copied per tweet
+        self.sentiment_label = intern_category(self.sentiment_label)
+        self.hazard_category = intern_category(self.hazard_category)
+        self.source = intern_category(self.source)
 
 class TwitterScraper:
     """Advanced Twitter/X scraper with multiple browser fallbacks"""
@@ -94,8 +110,10 @@ class TwitterScraper:
     def __init__(self):
         self.driver = None
         self.ua = UserAgent()
-        self.session = requests.Session()
+        self.session = make_session()
         self.setup_session()
+        # Shared across searches so cross-keyword duplicates collapse too
+        self.dedupe_index = NearDuplicateIndex()
         
     def setup_session(self):
         """Setup requests session with proper headers"""
@@ -527,14 +545,11 @@ class TwitterScraper:
             selenium_tweets = self.scrape_twitter_selenium(query, max_tweets - len(all_tweets))
             all_tweets.extend(selenium_tweets)
         
-        # Remove duplicates based on content
-        unique_tweets = []
-        seen_content = set()
-        for tweet in all_tweets:
-            content_hash = hash(tweet['content'])
-            if content_hash not in seen_content:
-                seen_content.add(content_hash)
-                unique_tweets.append(tweet)
+        # Collapse exact and near-duplicate content, including tweets seen by earlier searches
+        collapsed = self.dedupe_index.collapse(
+            all_tweets, text_of=lambda t: t['content'], id_of=lambda t: t['tweet_id']
+        )
+        unique_tweets = [tweet for tweet, _ in collapsed]
         
         logger.info(f"✅ Total unique ocean hazard tweets for '{query}': {len(unique_tweets)}")
         return unique_tweets
@@ -591,6 +606,7 @@ class MockDataGenerator:
 class OceanHazardAnalyzer:
     def __init__(self):
         self.sentiment_cache = {}
+        self.nlp_executor = shared_executor(text_polarity)
         self.scraper = TwitterScraper()
         
         self.hazard_categories = {
@@ -613,61 +629,64 @@ class OceanHazardAnalyzer:
             raw_tweets = MockDataGenerator.generate_mock_tweets(50)
             all_tweets = []
             
-            for raw_tweet in raw_tweets:
-                matched_keywords = self.find_matching_keywords(raw_tweet['content'])
-                if matched_keywords:
-                    sentiment_score, sentiment_label, confidence = self.analyze_sentiment(raw_tweet['content'])
-                    hazard_category = self.categorize_hazard(matched_keywords)
-                    
-                    tweet = OceanHazardTweet(
-                        username=raw_tweet['username'], handle=raw_tweet['handle'],
-                        content=raw_tweet['content'], timestamp=raw_tweet['timestamp'],
-                        retweets=raw_tweet['retweets'], likes=raw_tweet['likes'],
-                        replies=raw_tweet['replies'], tweet_id=raw_tweet['tweet_id'],
-                        matched_keywords=matched_keywords, sentiment_score=sentiment_score,
-                        sentiment_label=sentiment_label, confidence=confidence,
-                        hazard_category=hazard_category, source=raw_tweet['source'],
-                        verified=raw_tweet.get('verified', False)
-                    )
-                    all_tweets.append(tweet)
+            relevant = self.match_keywords(raw_tweets)
+            sentiments = self.analyze_sentiments([raw_tweet['content'] for raw_tweet, _ in relevant])
+            for (raw_tweet, matched_keywords), sentiment in zip(relevant, sentiments):
+                sentiment_score, sentiment_label, confidence = sentiment
+                hazard_category = self.categorize_hazard(matched_keywords)
+                
+                tweet = OceanHazardTweet(
+                    username=raw_tweet['username'], handle=raw_tweet['handle'],
+                    content=raw_tweet['content'], timestamp=raw_tweet['timestamp'],
+                    retweets=raw_tweet['retweets'], likes=raw_tweet['likes'],
+                    replies=raw_tweet['replies'], tweet_id=raw_tweet['tweet_id'],
+                    matched_keywords=matched_keywords, sentiment_score=sentiment_score,
+                    sentiment_label=sentiment_label, confidence=confidence,
+                    hazard_category=hazard_category, source=raw_tweet['source'],
+                    verified=raw_tweet.get('verified', False)
+                )
+                all_tweets.append(tweet)
             
             logger.info(f"✅ Generated {len(all_tweets)} mock ocean hazard tweets")
             return all_tweets
         
         # Real scraping logic
-        all_tweets = []
+        raw_tweets = []
         priority_keywords = KEYWORDS[:5]  # Focus on most important keywords
         
         for keyword in priority_keywords:
             logger.info(f"🔍 Searching for keyword: '{keyword}'")
             try:
-                raw_tweets = self.scraper.scrape_multiple_sources(keyword, max_tweets_per_keyword)
-                
-                for raw_tweet in raw_tweets:
-                    matched_keywords = self.find_matching_keywords(raw_tweet['content'])
-                    if matched_keywords:
-                        sentiment_score, sentiment_label, confidence = self.analyze_sentiment(raw_tweet['content'])
-                        hazard_category = self.categorize_hazard(matched_keywords)
-                        
-                        tweet = OceanHazardTweet(
-                            username=raw_tweet['username'], handle=raw_tweet['handle'],
-                            content=raw_tweet['content'], timestamp=raw_tweet['timestamp'],
-                            retweets=raw_tweet['retweets'], likes=raw_tweet['likes'],
-                            replies=raw_tweet['replies'], tweet_id=raw_tweet['tweet_id'],
-                            matched_keywords=matched_keywords, sentiment_score=sentiment_score,
-                            sentiment_label=sentiment_label, confidence=confidence,
-                            hazard_category=hazard_category, source=raw_tweet['source'],
-                            verified=raw_tweet.get('verified', False)
-                        )
-                        all_tweets.append(tweet)
-                        
+                raw_tweets.extend(self.scraper.scrape_multiple_sources(keyword, max_tweets_per_keyword))
                 time.sleep(random.uniform(2, 5))
                 
             except Exception as e:
                 logger.error(f"❌ Error searching for '{keyword}': {str(e)}")
                 continue
         
-        unique_tweets = list({hash(t.content): t for t in all_tweets}.values())
+        # Near-duplicates were collapsed at scrape time; drop tweets found again by another keyword
+        raw_tweets = list({t['tweet_id']: t for t in raw_tweets}.values())
+        
+        unique_tweets = []
+        relevant = self.match_keywords(raw_tweets)
+        sentiments = self.analyze_sentiments([raw_tweet['content'] for raw_tweet, _ in relevant])
+        for (raw_tweet, matched_keywords), sentiment in zip(relevant, sentiments):
+            sentiment_score, sentiment_label, confidence = sentiment
+            hazard_category = self.categorize_hazard(matched_keywords)
+            
+            tweet = OceanHazardTweet(
+                username=raw_tweet['username'], handle=raw_tweet['handle'],
+                content=raw_tweet['content'], timestamp=raw_tweet['timestamp'],
+                retweets=raw_tweet['retweets'], likes=raw_tweet['likes'],
+                replies=raw_tweet['replies'], tweet_id=raw_tweet['tweet_id'],
+                matched_keywords=matched_keywords, sentiment_score=sentiment_score,
+                sentiment_label=sentiment_label, confidence=confidence,
+                hazard_category=hazard_category, source=raw_tweet['source'],
+                verified=raw_tweet.get('verified', False),
+                duplicate_count=self.scraper.dedupe_index.duplicate_count(raw_tweet['tweet_id'])
+            )
+            unique_tweets.append(tweet)
+        
         logger.info(f"✅ Found {len(unique_tweets)} unique ocean hazard tweets")
         
         # If no real tweets found, offer to use mock data
@@ -679,14 +698,29 @@ class OceanHazardAnalyzer:
         
         return unique_tweets
     
-    def analyze_sentiment(self, text: str) -> tuple:
+    def match_keywords(self, raw_tweets: List[dict]) -> List[tuple]:
+        """(raw_tweet, matched_keywords) for each tweet matching at least one keyword"""
+        matched = ((raw_tweet, self.find_matching_keywords(raw_tweet['content'])) for raw_tweet in raw_tweets)
+        return [(raw_tweet, keywords) for raw_tweet, keywords in matched if keywords]
+    
+    def analyze_sentiments(self, texts: List[str]) -> List[tuple]:
+        """analyze_sentiment for a batch, computing uncached TextBlob polarities on worker processes"""
+        pending = list({text.lower().strip(): text for text in texts
+                        if text.lower().strip() not in self.sentiment_cache}.values())
+        CACHE_REQUESTS.inc(len(pending), cache='tweet_sentiment', result='miss')
+        CACHE_REQUESTS.inc(len(texts) - len(pending), cache='tweet_sentiment', result='hit')
+        for text, polarity in zip(pending, self.nlp_executor.map(pending)):
+            self.analyze_sentiment(text, polarity)
+        return [self.analyze_sentiment(text) for text in texts]
+    
+    def analyze_sentiment(self, text: str, polarity: Optional[float] = None) -> tuple:
         """Advanced sentiment analysis optimized for disaster/ocean hazard context"""
         text_key = text.lower().strip()
         if text_key in self.sentiment_cache:
             return self.sentiment_cache[text_key]
         
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
+        if polarity is None:
+            polarity = TextBlob(text).sentiment.polarity
         
         # Ocean/disaster-specific sentiment modifiers
         disaster_negative = ["disaster", "devastation", "destroyed", "catastrophic", "emergency", 
@@ -763,29 +797,28 @@ class OceanHazardAnalyzer:
             }
         }
     
-    def save_results(self, tweets: List[OceanHazardTweet], filename_prefix: str = "ocean_hazard_"):
-        """Save results to JSON and CSV files"""
+    def save_results(self, tweets: Iterable[OceanHazardTweet], filename_prefix: str = "ocean_hazard_",
+                     report: Optional[Dict] = None) -> Dict:
+        """Stream results to NDJSON, CSV and Parquet files and save the sentiment report"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Save tweet data as JSON
-        json_filename = f"{filename_prefix}tweets_{timestamp}.json"
-        with open(json_filename, 'w', encoding='utf-8') as f:
-            json.dump([asdict(t) for t in tweets], f, indent=2, ensure_ascii=False)
-            
-        # Save as CSV for easy analysis
-        csv_filename = f"{filename_prefix}analysis_{timestamp}.csv"
-        pd.DataFrame([asdict(t) for t in tweets]).to_csv(csv_filename, index=False)
+        # The report needs every tweet; pass one in to keep `tweets` a single streaming pass
+        if report is None:
+            tweets = list(tweets)
+            report = self.generate_sentiment_report(tweets)
+        
+        # Stream tweet data once into every export format
+        exported = export_records(tweets, OceanHazardTweet, f"{filename_prefix}tweets_{timestamp}")
         
-        # Save sentiment report
         report_filename = f"{filename_prefix}report_{timestamp}.json"
-        report = self.generate_sentiment_report(tweets)
         with open(report_filename, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
             
         logger.info(f"💾 Results saved:")
-        logger.info(f"  📄 Tweet data: {json_filename}")
-        logger.info(f"  📊 CSV analysis: {csv_filename}")
+        for fmt, path in exported.items():
+            logger.info(f"  📄 Tweet data ({fmt}): {path}")
         logger.info(f"  📈 Sentiment report: {report_filename}")
+        return report
 
 def display_tweets(tweets: List[OceanHazardTweet], limit: int = 10):
     """Display tweets in a formatted way"""
@@ -848,10 +881,9 @@ def main():
     if tweets_to_analyze:
         print(f"\n✅ Successfully collected {len(tweets_to_analyze)} ocean hazard tweets")
         display_tweets(tweets_to_analyze, limit=10)
-        analyzer.save_results(tweets_to_analyze, "ocean_hazard_data_")
-        
-        # Generate summary statistics
+        # Generate summary statistics once and save it alongside the exports
         report = analyzer.generate_sentiment_report(tweets_to_analyze)
+        analyzer.save_results(tweets_to_analyze, "ocean_hazard_data_", report=report)
         print(f"\n📊 SUMMARY STATISTICS:")
         print(f"   Total tweets analyzed: {report['summary']['total_tweets']}")
         print(f"   Sentiment distribution: {report['summary']['sentiment_distribution']}")
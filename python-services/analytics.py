@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Analytics over hazard posts for the monitoring services
+Normalises the post shapes used across the services and maintains
+persisted counters that are updated by per-post deltas, so cumulative and
+windowed analytics cost O(new posts) per run instead of a full recount.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from post_store import resolve_db_path
+
+SENTIMENTS = ('positive', 'negative', 'neutral')
+URGENCIES = ('high', 'medium', 'low')
+LIKE_METRICS = ('like_count', 'upvotes', 'views')
+SHARE_METRICS = ('retweet_count', 'shares', 'score')
+
+
+def _get(post: Any, name: str, default: Any = None) -> Any:
+    if isinstance(post, dict):
+        return post.get(name, default)
+    return getattr(post, name, default)
+
+
+def normalize_sentiment(label: Optional[str]) -> str:
+    """Fold service-specific labels (Positive, very_negative, ...) into positive/negative/neutral"""
+    label = (label or '').lower()
+    for sentiment in ('positive', 'negative'):
+        if sentiment in label:
+            return sentiment
+    return 'neutral'
+
+
+def _first_metric(metrics: Dict[str, Any], names: Iterable[str]) -> float:
+    for name in names:
+        if name in metrics:
+            return metrics[name] or 0
+    return 0
+
+
+def event_time(post: Any) -> datetime:
+    """When a post was created, as naive local time; now when unknown or unparseable"""
+    created_at = _get(post, 'created_at')
+    if isinstance(created_at, str):
+        try:
+            moment = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+            return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+        except ValueError:
+            pass
+    return datetime.now()
+
+
+def _event_day(post: Any) -> str:
+    """Day a post belongs to: its creation date when parseable, else today"""
+    return event_time(post).date().isoformat()
+
+
+def post_facts(post: Any) -> Dict[str, Any]:
+    """The analytics-relevant facts of one post, whatever service produced it.
+
+    Engagement: likes are like_count/upvotes/views, shares are
+    retweet_count/shares/score, and total engagement sums every numeric
+    metric.
+    """
+    metrics = _get(post, 'metrics')
+    if metrics is None:
+        metrics = _get(post, 'engagement') or {}
+    return {
+        'sentiment': normalize_sentiment(_get(post, 'sentiment')),
+        'urgency': _get(post, 'urgency') or 'low',
+        'hazard_type': _get(post, 'hazard_type') or 'general',
+        'source': _get(post, 'source') or 'unknown',
+        'likes': _first_metric(metrics, LIKE_METRICS),
+        'shares': _first_metric(metrics, SHARE_METRICS),
+        'engagement': sum(v for v in metrics.values() if isinstance(v, (int, float)) and not isinstance(v, bool)),
+        'day': _event_day(post),
+    }
+
+
+def _contributions(facts: Dict[str, Any]) -> List[tuple]:
+    """(dimension, key, value) counter increments contributed by one post"""
+    return [
+        ('total', '', 1),
+        ('sentiment', facts['sentiment'], 1),
+        ('urgency', facts['urgency'], 1),
+        ('hazard_type', facts['hazard_type'], 1),
+        ('source', facts['source'], 1),
+        ('likes', '', facts['likes']),
+        ('shares', '', facts['shares']),
+        ('engagement', '', facts['engagement']),
+    ]
+
+
+def analytics_from_counters(counters: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """Build the common analytics schema from dimension -> key -> value counters"""
+    total = int(counters.get('total', {}).get('', 0))
+    sentiment = counters.get('sentiment', {})
+    urgency = counters.get('urgency', {})
+    likes = counters.get('likes', {}).get('', 0)
+    shares = counters.get('shares', {}).get('', 0)
+    engagement = counters.get('engagement', {}).get('', 0)
+    return {
+        'total_mentions': total,
+        'sentiment_breakdown': {name: int(sentiment.get(name, 0)) for name in SENTIMENTS},
+        'urgency_breakdown': {name: int(urgency.get(name, 0)) for name in URGENCIES},
+        'source_breakdown': {k: int(v) for k, v in counters.get('source', {}).items() if v},
+        'hazard_types': {k: int(v) for k, v in counters.get('hazard_type', {}).items() if v},
+        'engagement_stats': {
+            'avg_likes': likes / total if total else 0,
+            'avg_retweets': shares / total if total else 0,
+            'total_engagement': engagement,
+            'avg_engagement': engagement / total if total else 0
+        },
+        'last_updated': datetime.now().isoformat()
+    }
+
+
+class StreamingAnalytics:
+    """Single-pass aggregator producing the common analytics schema.
+
+    Posts (dicts or ScrapedPost objects, from a list or a generator) are
+    folded into counters as they arrive; nothing per post is retained.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, Dict[str, float]] = {}
+
+    def add(self, post: Any):
+        for dimension, key, value in _contributions(post_facts(post)):
+            bucket = self.counters.setdefault(dimension, {})
+            bucket[key] = bucket.get(key, 0) + value
+
+    def extend(self, posts: Iterable[Any]) -> 'StreamingAnalytics':
+        for post in posts:
+            self.add(post)
+        return self
+
+    @property
+    def total(self) -> int:
+        return int(self.counters.get('total', {}).get('', 0))
+
+    def result(self) -> Dict[str, Any]:
+        return analytics_from_counters(self.counters)
+
+
+class IncrementalAnalytics:
+    """Persisted analytics counters maintained by per-post deltas.
+
+    Every post's last contribution is remembered, so re-applying a post
+    replaces its old contribution (update) and ``remove`` subtracts it
+    (delete). Counters are kept for all time and per event day.
+    """
+
+    def __init__(self, namespace: str, db_path: Optional[str] = None):
+        self.namespace = namespace
+        self.db_path = resolve_db_path(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_post_state (
+                namespace TEXT,
+                post_id TEXT,
+                sentiment TEXT,
+                urgency TEXT,
+                hazard_type TEXT,
+                source TEXT,
+                likes REAL,
+                shares REAL,
+                engagement REAL,
+                day TEXT,
+                PRIMARY KEY (namespace, post_id)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_counters (
+                namespace TEXT,
+                scope TEXT,
+                dimension TEXT,
+                key TEXT,
+                value REAL,
+                PRIMARY KEY (namespace, scope, dimension, key)
+            )
+        ''')
+        self.conn.commit()
+
+    def _load_state(self, post_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute('''
+            SELECT sentiment, urgency, hazard_type, source, likes, shares, engagement, day
+            FROM analytics_post_state WHERE namespace = ? AND post_id = ?
+        ''', (self.namespace, post_id)).fetchone()
+        if not row:
+            return None
+        return dict(zip(('sentiment', 'urgency', 'hazard_type', 'source', 'likes', 'shares', 'engagement', 'day'), row))
+
+    def _add_deltas(self, deltas: Dict[tuple, float], facts: Dict[str, Any], sign: int):
+        for scope in ('all', f"day:{facts['day']}"):
+            for dimension, key, value in _contributions(facts):
+                deltas[(scope, dimension, key)] = deltas.get((scope, dimension, key), 0) + sign * value
+
+    def _flush_deltas(self, deltas: Dict[tuple, float]):
+        self.conn.executemany('''
+            INSERT INTO analytics_counters (namespace, scope, dimension, key, value)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (namespace, scope, dimension, key) DO UPDATE SET value = value + excluded.value
+        ''', [(self.namespace, scope, dimension, key, value)
+              for (scope, dimension, key), value in deltas.items() if value])
+
+    def apply(self, posts: Iterable[Any], id_of=lambda post: _get(post, 'id')) -> int:
+        """Insert or update posts; returns the number of posts whose contribution changed"""
+        deltas: Dict[tuple, float] = {}
+        changed = 0
+        with self.lock:
+            for post in posts:
+                post_id = str(id_of(post))
+                facts = post_facts(post)
+                old = self._load_state(post_id)
+                if old is not None:
+                    # Keep the original day so updates never move a post between windows
+                    facts['day'] = old['day']
+                    if old == facts:
+                        continue
+                    self._add_deltas(deltas, old, -1)
+                self._add_deltas(deltas, facts, +1)
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO analytics_post_state
+                    (namespace, post_id, sentiment, urgency, hazard_type, source, likes, shares, engagement, day)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (self.namespace, post_id, facts['sentiment'], facts['urgency'], facts['hazard_type'],
+                      facts['source'], facts['likes'], facts['shares'], facts['engagement'], facts['day']))
+                changed += 1
+            self._flush_deltas(deltas)
+            self.conn.commit()
+        return changed
+
+    def remove(self, post_ids: Iterable[str]) -> int:
+        """Delete posts' contributions; returns the number removed"""
+        deltas: Dict[tuple, float] = {}
+        removed = 0
+        with self.lock:
+            for post_id in post_ids:
+                old = self._load_state(str(post_id))
+                if old is None:
+                    continue
+                self._add_deltas(deltas, old, -1)
+                self.conn.execute(
+                    'DELETE FROM analytics_post_state WHERE namespace = ? AND post_id = ?',
+                    (self.namespace, str(post_id))
+                )
+                removed += 1
+            self._flush_deltas(deltas)
+            self.conn.commit()
+        return removed
+
+    def snapshot(self, window_days: Optional[int] = None) -> Dict[str, Any]:
+        """Cumulative analytics, or analytics over the last `window_days` event days"""
+        with self.lock:
+            if window_days is None:
+                rows = self.conn.execute('''
+                    SELECT dimension, key, value FROM analytics_counters
+                    WHERE namespace = ? AND scope = 'all'
+                ''', (self.namespace,)).fetchall()
+            else:
+                first_day = (datetime.now().date() - timedelta(days=window_days - 1)).isoformat()
+                rows = self.conn.execute('''
+                    SELECT dimension, key, SUM(value) FROM analytics_counters
+                    WHERE namespace = ? AND scope >= ? AND scope LIKE 'day:%'
+                    GROUP BY dimension, key
+                ''', (self.namespace, f"day:{first_day}")).fetchall()
+
+        counters: Dict[str, Dict[str, float]] = {}
+        for dimension, key, value in rows:
+            counters.setdefault(dimension, {})[key] = value
+        return analytics_from_counters(counters)
+
+    def summary(self) -> Dict[str, Any]:
+        """Cumulative analytics plus windows of event days: today, and the 7 days up to today.
+
+        Counters are kept per day, so windows are whole calendar days rather than rolling hours.
+        """
+        analytics = self.snapshot()
+        analytics['windows'] = {'today': self.snapshot(window_days=1), '7d': self.snapshot(window_days=7)}
+        return analytics
+
+
+GRANULARITIES = ('minute', 'hour', 'day')
+# Minute buckets are only useful for recent activity
+MINUTE_RETENTION = timedelta(days=2)
+ROLLUP_DIMENSIONS = ('source', 'hazard_type', 'urgency', 'sentiment')
+
+
+def bucket_start(moment: datetime, granularity: str) -> str:
+    """ISO start of the bucket containing `moment`"""
+    if granularity == 'minute':
+        moment = moment.replace(second=0, microsecond=0)
+    elif granularity == 'hour':
+        moment = moment.replace(minute=0, second=0, microsecond=0)
+    elif granularity == 'day':
+        moment = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return moment.isoformat(timespec='seconds')
+
+
+def _next_bucket(moment: datetime, granularity: str) -> datetime:
+    return moment + {'minute': timedelta(minutes=1), 'hour': timedelta(hours=1), 'day': timedelta(days=1)}[granularity]
+
+
+class TrendRollups:
+    """Materialized per-bucket post counts for trend charts.
+
+    Rows are keyed by (granularity, bucket_start, source, hazard_type,
+    urgency, sentiment) and updated once per newly inserted post, so a trend
+    query reads only the buckets in its range, whatever the history size.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = resolve_db_path(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS post_rollups (
+                granularity TEXT,
+                bucket_start TEXT,
+                source TEXT,
+                hazard_type TEXT,
+                urgency TEXT,
+                sentiment TEXT,
+                count INTEGER,
+                engagement_sum REAL,
+                PRIMARY KEY (granularity, bucket_start, source, hazard_type, urgency, sentiment)
+            )
+        ''')
+        self.conn.commit()
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.conn.execute('SELECT 1 FROM post_rollups LIMIT 1').fetchone() is None
+
+    def add(self, posts: Iterable[Any]) -> int:
+        """Count newly inserted posts into every granularity; returns the number of posts added"""
+        deltas: Dict[tuple, List[float]] = {}
+        added = 0
+        for post in posts:
+            facts = post_facts(post)
+            moment = event_time(post)
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(moment, granularity)) + tuple(facts[d] for d in ROLLUP_DIMENSIONS)
+                totals = deltas.setdefault(key, [0, 0])
+                totals[0] += 1
+                totals[1] += facts['engagement']
+            added += 1
+
+        with self.lock:
+            self.conn.executemany('''
+                INSERT INTO post_rollups
+                (granularity, bucket_start, source, hazard_type, urgency, sentiment, count, engagement_sum)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (granularity, bucket_start, source, hazard_type, urgency, sentiment) DO UPDATE SET
+                    count = count + excluded.count,
+                    engagement_sum = engagement_sum + excluded.engagement_sum
+            ''', [key + tuple(totals) for key, totals in deltas.items()])
+            self.conn.commit()
+        return added
+
+    def trend(self, granularity: str = 'hour', since: Optional[datetime] = None,
+              until: Optional[datetime] = None, fill: bool = True, **filters: str) -> List[Dict[str, Any]]:
+        """Per-bucket counts between `since` and `until` (default: the last 7 days).
+
+        Filters are any of source, hazard_type, urgency and sentiment, e.g.
+        ``trend('hour', hazard_type='cyclone', urgency='high')``. With
+        ``fill`` empty buckets are returned as zeros so charts get a
+        continuous series.
+        """
+        unknown = set(filters) - set(ROLLUP_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown rollup filters: {', '.join(sorted(unknown))}")
+        until = until or datetime.now()
+        since = since or until - timedelta(days=7)
+        first, last = bucket_start(since, granularity), bucket_start(until, granularity)
+
+        conditions = ['granularity = ?', 'bucket_start >= ?', 'bucket_start <= ?']
+        params: List[Any] = [granularity, first, last]
+        for name, value in filters.items():
+            if value is not None:
+                conditions.append(f'{name} = ?')
+                params.append(value)
+        with self.lock:
+            rows = self.conn.execute(f'''
+                SELECT bucket_start, SUM(count), SUM(engagement_sum) FROM post_rollups
+                WHERE {' AND '.join(conditions)}
+                GROUP BY bucket_start ORDER BY bucket_start
+            ''', params).fetchall()
+
+        found = {start: {'bucket_start': start, 'count': count, 'engagement_sum': engagement}
+                 for start, count, engagement in rows}
+        if not fill:
+            return list(found.values())
+
+        series = []
+        moment = datetime.fromisoformat(first)
+        while moment.isoformat(timespec='seconds') <= last:
+            start = moment.isoformat(timespec='seconds')
+            series.append(found.get(start, {'bucket_start': start, 'count': 0, 'engagement_sum': 0}))
+            moment = _next_bucket(moment, granularity)
+        return series
+
+    def prune(self, minute_retention: timedelta = MINUTE_RETENTION) -> int:
+        """Drop minute buckets older than the retention; hour and day buckets are kept"""
+        cutoff = bucket_start(datetime.now() - minute_retention, 'minute')
+        with self.lock:
+            deleted = self.conn.execute(
+                "DELETE FROM post_rollups WHERE granularity = 'minute' AND bucket_start < ?", (cutoff,)
+            ).rowcount
+            self.conn.commit()
+        return deleted
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Benchmark cases for the classification, sentiment, storage and analytics hot paths
+Each case times one function over a Workload: posts from the seeded
+synthetic corpus at a given scale. `setup` builds the case's input outside
+the timed region and `run` processes it. Cases whose module cannot be
+imported here (backend/scraper.py needs selenium, social_media_monitor.py
+needs tweepy and spaCy) raise ImportError from setup and are reported as
+skipped.
+"""
+
+import atexit
+import functools
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BENCH_DIR, '..'))
+sys.path.append(os.path.join(BENCH_DIR, '..', '..', 'backend'))
+
+from post_model import Post
+from synthetic_corpus import CorpusConfig, CorpusGenerator, record_text
+
+BENCH_SEED = 2024
+
+# Source names the scrapers give each corpus shape
+SHAPE_SOURCES = {'reddit': 'reddit', 'news': 'thehindu', 'cap': 'noaa', 'tweet': 'twitter'}
+SENTIMENTS = ('Negative', 'Neutral', 'Positive')
+URGENCIES = ('high', 'medium', 'low')
+
+
+class Workload:
+    """Synthetic inputs for one scale, built on first use and shared by the cases"""
+
+    def __init__(self, scale: int, seed: int = BENCH_SEED):
+        self.scale = scale
+        self.seed = seed
+
+    @functools.cached_property
+    def rows(self) -> List[tuple]:
+        """(id, source, text, hazard, place, created_at) per corpus record"""
+        rows = []
+        for record in CorpusGenerator(CorpusConfig(count=self.scale, seed=self.seed)):
+            label = record['label']
+            data = record['data']
+            created_at = data.get('updated') or data.get('timestamp') or data.get('published') or data.get('created_utc')
+            rows.append((label['id'], SHAPE_SOURCES[record['shape']], record_text(record),
+                         label['hazard'], label['place'], str(created_at)))
+        return rows
+
+    @functools.cached_property
+    def texts(self) -> List[str]:
+        return [row[2] for row in self.rows]
+
+    @functools.cached_property
+    def posts(self) -> List[Post]:
+        return [
+            Post(id=post_id, text=text[:500], created_at=created_at, author=f"author_{index % 5000}",
+                 location=place, source=source, url=f"https://example.org/{post_id}",
+                 sentiment=SENTIMENTS[index % 3], urgency=URGENCIES[index % 3],
+                 hazard_type='general' if hazard == 'none' else hazard,
+                 engagement={'score': index % 400, 'comments': index % 40})
+            for index, (post_id, source, text, hazard, place, created_at) in enumerate(self.rows)
+        ]
+
+
+@dataclass
+class Case:
+    """One benchmark: `run(setup(workload))` is timed; `teardown` cleans up after it"""
+    name: str
+    setup: Callable[[Workload], Any]
+    run: Callable[[Any], Any]
+    teardown: Optional[Callable[[Any], None]] = None
+
+
+def _require_spacy_model():
+    """Importing social_media_monitor would download a missing spaCy model; stay offline instead"""
+    if importlib.util.find_spec('spacy') is None or importlib.util.find_spec('en_core_web_sm') is None:
+        raise ImportError("spaCy with the en_core_web_sm model is not installed")
+
+
+def _scratch_scraper(directory: str):
+    """A scraper on an empty database in directory, never the real store or its legacy copy"""
+    from real_web_scraper import RealWebScraper
+    return RealWebScraper(db_path=os.path.join(directory, 'scraped_posts.db'), import_legacy=False)
+
+
+@functools.lru_cache(maxsize=None)
+def _web_scraper():
+    directory = tempfile.mkdtemp(prefix='corsair-bench-')
+    atexit.register(shutil.rmtree, directory, True)
+    return _scratch_scraper(directory)
+
+
+def _method(name: str) -> Callable[[Workload], tuple]:
+    """Setup for a RealWebScraper text method; the scraper is built before timing starts"""
+    def setup(workload: Workload) -> tuple:
+        return getattr(_web_scraper(), name), workload.texts
+    return setup
+
+
+def _each(args: tuple):
+    fn, texts = args
+    for text in texts:
+        fn(text)
+
+
+def _gazetteer(workload: Workload) -> tuple:
+    from gazetteer import default_gazetteer
+    return default_gazetteer().first, workload.texts
+
+
+def _urgency(workload: Workload) -> tuple:
+    return _web_scraper().calculate_urgency, workload.rows
+
+
+def _each_with_source(args: tuple):
+    calculate_urgency, rows = args
+    for row in rows:
+        calculate_urgency(row[2], row[1])
+
+
+# --- sentiment variants ---
+
+def _social_media_sentiment(workload: Workload):
+    _require_spacy_model()
+    import social_media_monitor
+    social_media_monitor._init()
+    return social_media_monitor.analyze_sentiment, workload.texts
+
+
+def _ocean_hazard_sentiment(workload: Workload):
+    # A fresh analyzer per run, so its sentiment cache starts empty
+    from scraper import OceanHazardAnalyzer
+    return OceanHazardAnalyzer().analyze_sentiment, workload.texts
+
+
+def _reddit_sentiment(workload: Workload):
+    from reddit_analyzer import RedditHazardAnalyzer
+    return RedditHazardAnalyzer().analyze_sentiment, workload.texts
+
+
+# --- storage and analytics ---
+
+def _fresh_store(workload: Workload):
+    """A scraper on an empty database, so every post is a new insert"""
+    directory = tempfile.mkdtemp(prefix='corsair-bench-')
+    return _scratch_scraper(directory), workload.posts, directory
+
+
+def _save(args: tuple):
+    scraper, posts, _ = args
+    scraper.save_to_database(posts)
+
+
+def _drop_store(args: tuple):
+    scraper, _, directory = args
+    scraper.store.conn.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _tweets(workload: Workload) -> tuple:
+    from scraper import OceanHazardAnalyzer, OceanHazardTweet
+    return OceanHazardAnalyzer(), [
+        OceanHazardTweet(
+            username=f"user {index % 5000}", handle=f"user_{index % 5000}", content=text,
+            timestamp=created_at, retweets=index % 50, likes=index % 300, replies=index % 20,
+            tweet_id=post_id, matched_keywords=[] if hazard == 'none' else [hazard.replace('_', ' ')],
+            sentiment_score=((index * 37) % 200 - 100) / 100, sentiment_label=SENTIMENTS[index % 3].lower(),
+            confidence=(index % 10) / 10, hazard_category='general' if hazard == 'none' else hazard,
+            source=source, location=place
+        )
+        for index, (post_id, source, text, hazard, place, created_at) in enumerate(workload.rows)
+    ]
+
+
+def _sentiment_report(args: tuple):
+    analyzer, tweets = args
+    analyzer.generate_sentiment_report(tweets)
+
+
+CASES = [
+    Case('real_web_scraper.detect_hazard_type', _method('detect_hazard_type'), _each),
+    Case('real_web_scraper.is_coastal_related', _method('is_coastal_related'), _each),
+    Case('real_web_scraper.calculate_urgency', _urgency, _each_with_source),
+    Case('real_web_scraper.analyze_sentiment', _method('analyze_sentiment'), _each),
+    Case('gazetteer.first', _gazetteer, _each),
+    Case('social_media_monitor.analyze_sentiment', _social_media_sentiment, _each),
+    Case('scraper.analyze_sentiment', _ocean_hazard_sentiment, _each),
+    Case('reddit_analyzer.analyze_sentiment', _reddit_sentiment, _each),
+    Case('real_web_scraper.save_to_database', _fresh_store, _save, _drop_store),
+    Case('real_web_scraper.calculate_analytics',
+         lambda w: (_web_scraper(), w.posts), lambda args: args[0].calculate_analytics(args[1])),
+    Case('scraper.generate_sentiment_report', _tweets, _sentiment_report),
+]
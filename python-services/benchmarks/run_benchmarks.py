@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark runner for the service hot paths
+Runs the cases in cases.py over seeded synthetic corpora at 1k, 100k and
+1M posts, recording throughput (best of --repeat timed runs) and peak
+memory (tracemalloc over one extra run), and compares both against the
+stored baseline. Nothing touches the network or the services' database:
+posts come from synthetic_corpus.py and storage goes to temporary files.
+
+  python benchmarks/run_benchmarks.py                       # 1k and 100k
+  python benchmarks/run_benchmarks.py --scales 1m --cases detect_hazard_type
+  python benchmarks/run_benchmarks.py --check               # exit 1 on regression
+  python benchmarks/run_benchmarks.py --save-baseline
+"""
+
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from cases import BENCH_DIR, BENCH_SEED, CASES, Case, Workload
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_SCALES = '1k,100k'
+# Throughput drop or memory growth beyond this fraction of the baseline is a regression
+DEFAULT_TOLERANCE = 0.25
+# ...and memory growth must also exceed this, so a few KiB on a tiny peak is not flagged
+MEMORY_FLOOR = 1 << 20
+# Large scales run long enough that one timed run is stable
+LARGE_SCALE = 100_000
+
+SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_scale(value: str) -> int:
+    """'1k' -> 1000, '1m' -> 1000000, '250' -> 250"""
+    value = value.strip().lower()
+    if value[-1:] in SUFFIXES:
+        return int(float(value[:-1]) * SUFFIXES[value[-1]])
+    return int(value)
+
+
+def scale_label(scale: int) -> str:
+    for suffix, size in sorted(SUFFIXES.items(), key=lambda item: -item[1]):
+        if scale >= size and scale % size == 0:
+            return f"{scale // size}{suffix}"
+    return str(scale)
+
+
+def _timed_run(case: Case, workload: Workload) -> float:
+    state = case.setup(workload)
+    try:
+        gc.collect()
+        started = time.perf_counter()
+        case.run(state)
+        return time.perf_counter() - started
+    finally:
+        if case.teardown:
+            case.teardown(state)
+
+
+def _traced_run(case: Case, workload: Workload) -> int:
+    """Peak bytes allocated while the case runs (setup excluded)"""
+    state = case.setup(workload)
+    try:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            case.run(state)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    finally:
+        if case.teardown:
+            case.teardown(state)
+
+
+def run_case(case: Case, workload: Workload, repeat: int, memory: bool = True) -> Dict[str, Any]:
+    result = {'case': case.name, 'scale': workload.scale}
+    try:
+        seconds = min(_timed_run(case, workload) for _ in range(repeat))
+        peak = _traced_run(case, workload) if memory else None
+    except ImportError as e:
+        result['skipped'] = str(e)
+        return result
+    result.update({
+        'seconds': round(seconds, 4),
+        'posts_per_second': round(workload.scale / seconds, 1) if seconds else None,
+        'peak_bytes': peak
+    })
+    return result
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Any]:
+    """Annotate a result with its change against the baseline and whether it regressed"""
+    previous = baseline.get('results', {}).get(f"{result['case']}@{scale_label(result['scale'])}")
+    if not previous or 'skipped' in result:
+        return result
+    regressions = []
+    if previous.get('posts_per_second') and result.get('posts_per_second'):
+        change = result['posts_per_second'] / previous['posts_per_second'] - 1
+        result['throughput_change'] = round(change, 3)
+        if change < -tolerance:
+            regressions.append('throughput')
+    if previous.get('peak_bytes') and result.get('peak_bytes') is not None:
+        change = result['peak_bytes'] / previous['peak_bytes'] - 1
+        result['memory_change'] = round(change, 3)
+        if change > tolerance and result['peak_bytes'] - previous['peak_bytes'] > MEMORY_FLOOR:
+            regressions.append('memory')
+    result['regressions'] = regressions
+    return result
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, results: List[Dict[str, Any]]):
+    """Merge measured results into the baseline file, keeping entries not re-run"""
+    baseline = load_baseline(path)
+    entries = baseline.get('results', {})
+    for result in results:
+        if 'skipped' not in result:
+            entries[f"{result['case']}@{scale_label(result['scale'])}"] = {
+                key: result[key] for key in ('seconds', 'posts_per_second', 'peak_bytes')
+            }
+    baseline = {
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'host': {'python': platform.python_version(), 'machine': platform.machine(),
+                 'system': platform.system(), 'cpus': os.cpu_count()},
+        'results': dict(sorted(entries.items()))
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+
+
+def _percent(change: Optional[float]) -> str:
+    return f"{change:+.0%}" if change is not None else ''
+
+
+def print_report(results: List[Dict[str, Any]], out=sys.stdout):
+    header = f"{'case':<40} {'scale':>6} {'posts/s':>12} {'vs base':>8} {'peak KiB':>11} {'vs base':>8}"
+    print(header, file=out)
+    print('-' * len(header), file=out)
+    for result in results:
+        name, scale = result['case'], scale_label(result['scale'])
+        if 'skipped' in result:
+            print(f"{name:<40} {scale:>6}   skipped: {result['skipped']}", file=out)
+            continue
+        peak = result['peak_bytes']
+        flag = '  REGRESSION: ' + ', '.join(result['regressions']) if result.get('regressions') else ''
+        print(f"{name:<40} {scale:>6} {result['posts_per_second']:>12,.0f} "
+              f"{_percent(result.get('throughput_change')):>8} "
+              f"{peak / 1024 if peak is not None else float('nan'):>11,.0f} "
+              f"{_percent(result.get('memory_change')):>8}{flag}", file=out)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the classification, sentiment, storage and analytics paths")
+    parser.add_argument('--scales', default=DEFAULT_SCALES, help="Comma-separated post counts, e.g. 1k,100k,1m")
+    parser.add_argument('--cases', help="Comma-separated substrings selecting cases by name")
+    parser.add_argument('--repeat', type=int,
+                        help=f"Timed runs per case, best kept (default 3, or 1 from {scale_label(LARGE_SCALE)} posts)")
+    parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc run")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true', help="Record these results as the new baseline")
+    parser.add_argument('--check', action='store_true', help="Exit with status 1 if anything regressed")
+    parser.add_argument('--json', help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    cases = CASES
+    if args.cases:
+        wanted = [part.strip() for part in args.cases.split(',')]
+        cases = [case for case in CASES if any(part in case.name for part in wanted)]
+
+    # Keep every store the cases open away from the services' own database
+    scratch = tempfile.mkdtemp(prefix='corsair-bench-')
+    os.environ['CORSAIR_DB_PATH'] = os.path.join(scratch, 'scraped_posts.db')
+
+    baseline = load_baseline(args.baseline)
+    results = []
+    try:
+        for scale in (parse_scale(value) for value in args.scales.split(',')):
+            workload = Workload(scale, args.seed)
+            repeat = args.repeat or (1 if scale >= LARGE_SCALE else 3)
+            for case in cases:
+                print(f"{case.name} @ {scale_label(scale)}...", file=sys.stderr)
+                result = compare(run_case(case, workload, repeat, not args.no_memory), baseline, args.tolerance)
+                results.append(result)
+            del workload
+            gc.collect()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+    if args.check and any(result.get('regressions') for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Durable write-behind spool for Firestore uploads
+Scrapes enqueue documents into an SQLite outbound queue and return at once;
+a background flusher drains the queue in batches, most urgent first, with
+retry and exponential backoff. Documents survive Firestore outages and a
+missing service account key until a later run can deliver them.
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from post_store import resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+URGENCY_PRIORITY = {'high': 0, 'medium': 1, 'low': 2}
+DEFAULT_PRIORITY = 2
+
+
+def urgency_priority(data: Dict[str, Any]) -> int:
+    """Lower numbers are flushed first"""
+    return URGENCY_PRIORITY.get(data.get('urgency'), DEFAULT_PRIORITY)
+
+
+class FirestoreSpool:
+    """SQLite-backed outbound queue of (collection, doc_id, data) writes.
+
+    Re-enqueueing a document that has not been flushed yet replaces its
+    payload in place, so the queue never holds two versions of one document.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = resolve_db_path(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS firestore_spool (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT,
+                doc_id TEXT,
+                payload TEXT,
+                priority INTEGER,
+                enqueued_at REAL,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL,
+                last_error TEXT,
+                version INTEGER DEFAULT 0,
+                UNIQUE (collection, doc_id)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE INDEX IF NOT EXISTS idx_firestore_spool_ready
+            ON firestore_spool (priority, seq)
+        ''')
+        self.conn.commit()
+
+    def enqueue(self, collection: str, docs: Iterable[Tuple[str, Dict[str, Any]]],
+                priority_of: Callable[[Dict[str, Any]], int] = urgency_priority) -> int:
+        """Queue documents for upload; returns the number queued"""
+        now = time.time()
+        rows = [
+            (collection, doc_id, json.dumps(data, default=str), priority_of(data), now, now)
+            for doc_id, data in docs
+        ]
+        with self.lock:
+            self.conn.executemany('''
+                INSERT INTO firestore_spool (collection, doc_id, payload, priority, enqueued_at, next_attempt_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (collection, doc_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    priority = MIN(priority, excluded.priority),
+                    attempts = 0,
+                    next_attempt_at = excluded.next_attempt_at,
+                    version = version + 1
+            ''', rows)
+            self.conn.commit()
+        return len(rows)
+
+    def claim(self, limit: int) -> List[Tuple[Tuple[int, int], str, str, Dict[str, Any]]]:
+        """Return up to `limit` ready entries, most urgent and oldest first.
+
+        Entries are keyed by (seq, version) so an ack never deletes a payload
+        that was replaced while the older one was being uploaded.
+        """
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT seq, version, collection, doc_id, payload FROM firestore_spool
+                WHERE next_attempt_at <= ?
+                ORDER BY priority, seq
+                LIMIT ?
+            ''', (time.time(), limit)).fetchall()
+        return [
+            ((seq, version), collection, doc_id, json.loads(payload))
+            for seq, version, collection, doc_id, payload in rows
+        ]
+
+    def ack(self, keys: List[Tuple[int, int]]):
+        """Remove delivered entries"""
+        with self.lock:
+            self.conn.executemany('DELETE FROM firestore_spool WHERE seq = ? AND version = ?', keys)
+            self.conn.commit()
+
+    def retry_later(self, keys: List[Tuple[int, int]], error: str, base_delay: float = 2.0, max_delay: float = 300.0):
+        """Schedule failed entries for another attempt with exponential backoff and jitter"""
+        now = time.time()
+        with self.lock:
+            for seq, version in keys:
+                # A newer version enqueued meanwhile is ready immediately and keeps its schedule
+                row = self.conn.execute(
+                    'SELECT attempts FROM firestore_spool WHERE seq = ? AND version = ?', (seq, version)
+                ).fetchone()
+                if not row:
+                    continue
+                attempts = row[0] + 1
+                delay = min(max_delay, base_delay * (2 ** (attempts - 1))) * random.uniform(0.8, 1.2)
+                self.conn.execute(
+                    'UPDATE firestore_spool SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE seq = ?',
+                    (attempts, now + delay, error[:500], seq)
+                )
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, lag (age of the oldest entry) and per-priority depth"""
+        now = time.time()
+        with self.lock:
+            depth, oldest, ready, failing = self.conn.execute('''
+                SELECT COUNT(*), MIN(enqueued_at),
+                       SUM(CASE WHEN next_attempt_at <= ? THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN attempts > 0 THEN 1 ELSE 0 END)
+                FROM firestore_spool
+            ''', (now,)).fetchone()
+            by_priority = dict(self.conn.execute(
+                'SELECT priority, COUNT(*) FROM firestore_spool GROUP BY priority'
+            ).fetchall())
+        names = {value: name for name, value in URGENCY_PRIORITY.items()}
+        return {
+            'depth': depth,
+            'ready': ready or 0,
+            'retrying': failing or 0,
+            'lag_seconds': round(now - oldest, 3) if oldest else 0.0,
+            'by_urgency': {names.get(priority, str(priority)): count for priority, count in by_priority.items()}
+        }
+
+
+class SpoolFlusher:
+    """Background thread draining a FirestoreSpool through a FirestoreBatchWriter"""
+
+    def __init__(self, spool: FirestoreSpool, writer, batch_size: int = 500, interval: float = 2.0):
+        self.spool = spool
+        self.writer = writer
+        self.batch_size = batch_size
+        self.interval = interval
+        self.totals = {'written': 0, 'skipped': 0, 'failed': 0}
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='firestore-spool-flusher', daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """Wake the flusher early, e.g. right after an enqueue"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                drained = self.flush_once()
+            except Exception as e:
+                logger.error(f"Spool flush failed: {e}")
+                drained = 0
+            if not drained:
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+    def flush_once(self) -> int:
+        """Deliver one batch of ready entries; returns the number of entries handled"""
+        with self._flush_lock:
+            return self._flush_entries(self.spool.claim(self.batch_size))
+
+    def _flush_entries(self, entries: List[Tuple[Tuple[int, int], str, str, Dict[str, Any]]]) -> int:
+        if not entries:
+            return 0
+
+        by_collection: Dict[str, List[Tuple[Tuple[int, int], str, Dict[str, Any]]]] = {}
+        for key, collection, doc_id, data in entries:
+            by_collection.setdefault(collection, []).append((key, doc_id, data))
+
+        for collection, items in by_collection.items():
+            keys = [key for key, _, _ in items]
+            result = self.writer.write(collection, [(doc_id, data) for _, doc_id, data in items])
+            self.totals['written'] += result.written
+            self.totals['skipped'] += result.skipped
+            if result.failed:
+                self.totals['failed'] += result.failed
+                self.spool.retry_later(keys, '; '.join(result.errors) or 'write failed')
+            else:
+                self.spool.ack(keys)
+        return len(entries)
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Flush ready entries in the calling thread until empty or timed out; True when nothing is ready"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if not self.flush_once():
+                return True
+        return False
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Shared Firestore access for the monitoring services
+Initializes the Firebase Admin client once (or the Firestore emulator when
+FIRESTORE_EMULATOR_HOST is set) and writes documents in chunked batches of
+at most 500 operations, committed concurrently with retry. A local shadow
+table of content hashes lets unchanged documents be skipped.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from post_store import resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_OPS = 500
+# Fields stamped fresh on every run; they alone do not make a document "changed"
+VOLATILE_FIELDS = ('processed_at',)
+
+
+def resolve_key_path(key_path: Optional[str] = None) -> str:
+    """Service account key: explicit path, FIREBASE_ADMIN_KEY, then the working directory or python-services/"""
+    candidates = [key_path, os.environ.get('FIREBASE_ADMIN_KEY'), 'firebase-admin-key.json',
+                  os.path.join(SERVICE_DIR, 'firebase-admin-key.json')]
+    for candidate in candidates:
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return key_path or 'firebase-admin-key.json'
+
+
+def get_firestore_client(key_path: Optional[str] = None):
+    """Return a Firestore client, or None (with a warning) when Firebase is unavailable"""
+    try:
+        if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+            from google.auth.credentials import AnonymousCredentials
+            from google.cloud import firestore as gcloud_firestore
+            project = os.environ.get('GCLOUD_PROJECT', 'corsair-emulator')
+            return gcloud_firestore.Client(project=project, credentials=AnonymousCredentials())
+
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        if not firebase_admin._apps:
+            cred = credentials.Certificate(resolve_key_path(key_path))
+            firebase_admin.initialize_app(cred)
+        return firestore.client()
+    except Exception as e:
+        # stderr keeps stdout clean for the JSON the CLIs print
+        print(f"Firebase initialization warning: {e}", file=sys.stderr)
+        return None
+
+
+@dataclass
+class WriteResult:
+    """Outcome of one FirestoreBatchWriter.write call"""
+    written: int = 0
+    skipped: int = 0
+    failed: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def success(self) -> bool:
+        return self.failed == 0
+
+
+def content_hash(data: Dict[str, Any]) -> str:
+    """Hash of a document's content, ignoring volatile fields"""
+    stable = {key: value for key, value in data.items() if key not in VOLATILE_FIELDS}
+    encoded = json.dumps(stable, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class FirestoreShadow:
+    """SQLite record of the content hash last written for each document"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = resolve_db_path(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS firestore_shadow (
+                collection TEXT,
+                doc_id TEXT,
+                content_hash TEXT,
+                written_at TEXT,
+                PRIMARY KEY (collection, doc_id)
+            )
+        ''')
+        self.conn.commit()
+
+    def changed(self, collection: str, docs: Iterable[Tuple[str, Dict[str, Any]]]) -> Tuple[List[Tuple[str, Dict[str, Any], str]], int]:
+        """Split docs into (new or changed docs with their hashes, number unchanged)"""
+        pending, unchanged = [], 0
+        with self.lock:
+            for doc_id, data in docs:
+                digest = content_hash(data)
+                row = self.conn.execute(
+                    'SELECT content_hash FROM firestore_shadow WHERE collection = ? AND doc_id = ?',
+                    (collection, doc_id)
+                ).fetchone()
+                if row and row[0] == digest:
+                    unchanged += 1
+                else:
+                    pending.append((doc_id, data, digest))
+        return pending, unchanged
+
+    def record(self, collection: str, hashes: Iterable[Tuple[str, str]]):
+        """Remember the hashes of successfully written documents"""
+        written_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO firestore_shadow (collection, doc_id, content_hash, written_at) '
+                'VALUES (?, ?, ?, ?)',
+                [(collection, doc_id, digest, written_at) for doc_id, digest in hashes]
+            )
+            self.conn.commit()
+
+    def forget(self, collection: str, doc_ids: Iterable[str]):
+        """Drop shadow entries so the documents are rewritten next time"""
+        with self.lock:
+            self.conn.executemany(
+                'DELETE FROM firestore_shadow WHERE collection = ? AND doc_id = ?',
+                [(collection, doc_id) for doc_id in doc_ids]
+            )
+            self.conn.commit()
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class FirestoreBatchWriter:
+    """Writes documents in <=500-op batches committed by a bounded thread pool.
+
+    Every write is a ``set`` with a caller-chosen document id, so retrying a
+    failed batch is idempotent. With a ``shadow``, documents whose content
+    hash matches the last successful write are skipped.
+    """
+
+    def __init__(self, db, max_batch_ops: int = MAX_BATCH_OPS, max_workers: int = 4,
+                 max_retries: int = 3, backoff_seconds: float = 0.5,
+                 shadow: Optional[FirestoreShadow] = None):
+        if not 0 < max_batch_ops <= MAX_BATCH_OPS:
+            raise ValueError(f"max_batch_ops must be between 1 and {MAX_BATCH_OPS}")
+        self.db = db
+        self.max_batch_ops = max_batch_ops
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.shadow = shadow
+
+    def commit_batch(self, collection: str, docs: List[Tuple[str, Dict[str, Any]]], merge: bool = True):
+        """Commit one batch, retrying with exponential backoff"""
+        collection_ref = self.db.collection(collection)
+        for attempt in range(self.max_retries + 1):
+            try:
+                batch = self.db.batch()
+                for doc_id, data in docs:
+                    batch.set(collection_ref.document(doc_id), data, merge=merge)
+                batch.commit()
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * (2 ** attempt)
+                logger.warning(f"Batch commit to {collection} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def write(self, collection: str, docs: Iterable[Tuple[str, Dict[str, Any]]], merge: bool = True) -> WriteResult:
+        """Write (doc_id, data) pairs to a collection"""
+        result = WriteResult()
+        if self.shadow:
+            pending, result.skipped = self.shadow.changed(collection, docs)
+        else:
+            pending = [(doc_id, data, None) for doc_id, data in docs]
+
+        batches = list(chunked(pending, self.max_batch_ops))
+        if not batches:
+            return result
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+            futures = {
+                pool.submit(self.commit_batch, collection, [(doc_id, data) for doc_id, data, _ in batch], merge): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                result.batches += 1
+                try:
+                    future.result()
+                    result.written += len(batch)
+                    if self.shadow:
+                        self.shadow.record(collection, [(doc_id, digest) for doc_id, _, digest in batch])
+                except Exception as e:
+                    result.failed += len(batch)
+                    result.failed_batches += 1
+                    result.errors.append(str(e))
+                    logger.error(f"Giving up on batch of {len(batch)} documents for {collection}: {e}")
+        return result
+
+
+def main():
+    """Emulator smoke test: python firestore_writer.py [num_docs]"""
+    if not os.environ.get('FIRESTORE_EMULATOR_HOST'):
+        print("Set FIRESTORE_EMULATOR_HOST (e.g. localhost:8080) to run against the emulator")
+        sys.exit(1)
+
+    num_docs = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    writer = FirestoreBatchWriter(get_firestore_client())
+    docs = ((f"smoke_{i}", {'text': f"smoke test post {i}", 'index': i}) for i in range(num_docs))
+
+    started = time.perf_counter()
+    result = writer.write('social_media_posts_smoke', docs)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {result.written} docs in {result.batches} batches ({result.failed} failed) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
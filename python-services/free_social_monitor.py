@@ -1,27 +1,38 @@
-import requests
-import json
 import time
+import hashlib
 from datetime import datetime, timedelta
-import feedparser
 import re
 from textblob import TextBlob
-import firebase_admin
-from firebase_admin import credentials, firestore
 import os
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
+
+from firestore_writer import FirestoreBatchWriter, FirestoreShadow, get_firestore_client
+from firestore_spool import FirestoreSpool, SpoolFlusher
+from http_session import fetch_feed, make_session, pace
+from analytics import IncrementalAnalytics, StreamingAnalytics
+from ndjson_stream import streaming_stdout
+from post_model import Post
+from serialization import write_output
+from tracing import span
 
 # === FREE DATA SOURCES CONFIGURATION ===
 class FreeDataMonitor:
     def __init__(self):
         # Initialize Firebase (if not already done)
-        try:
-            if not firebase_admin._apps:
-                cred = credentials.Certificate("firebase-admin-key.json")
-                firebase_admin.initialize_app(cred)
-            self.db = firestore.client()
-        except Exception as e:
-            print(f"Firebase initialization warning: {e}")
-            self.db = None
+        self.db = get_firestore_client()
+        self.writer = FirestoreBatchWriter(self.db, shadow=FirestoreShadow()) if self.db else None
+        
+        # Uploads go through a durable spool so they survive Firestore outages
+        self.spool = FirestoreSpool()
+        self.flusher = SpoolFlusher(self.spool, self.writer) if self.writer else None
+        if self.flusher:
+            self.flusher.start()
+        
+        # One session for all sources, so cassette record/replay covers every request
+        self.session = make_session()
+        
+        # Cumulative analytics for everything uploaded to social_media_posts
+        self.analytics = IncrementalAnalytics('social_media_posts')
         
         # Coastal hazard keywords
         self.keywords = [
@@ -31,7 +42,7 @@ class FreeDataMonitor:
             'oil spill', 'coastal damage', 'shore erosion', 'tidal surge'
         ]
     
-    def get_reddit_posts(self) -> List[Dict]:
+    def get_reddit_posts(self, on_posts: Optional[Callable[[List[Dict]], None]] = None) -> List[Post]:
         """Fetch posts from Reddit using free API"""
         posts = []
         
@@ -47,21 +58,32 @@ class FreeDataMonitor:
                 url = f"https://www.reddit.com/r/{subreddit}/hot.json?limit=25"
                 headers = {'User-Agent': 'CORSAIR-Monitor/1.0'}
                 
-                response = requests.get(url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    for post_data in data.get('data', {}).get('children', []):
-                        post = post_data.get('data', {})
+                with span('source', source='reddit', subreddit=subreddit):
+                    with span('request', url=url) as request:
+                        response = self.session.get(url, headers=headers, timeout=10)
+                        request.set_attribute('status', response.status_code)
+                    if response.status_code == 200:
+                        data = response.json()
+                        children = data.get('data', {}).get('children', [])
                         
-                        # Check if post contains coastal keywords
-                        text = f"{post.get('title', '')} {post.get('selftext', '')}"
-                        if self.contains_keywords(text):
-                            processed_post = self.process_reddit_post(post, subreddit)
-                            if processed_post:
-                                posts.append(processed_post)
+                        subreddit_posts = []
+                        with span('classify', items=len(children)) as classify:
+                            for post_data in children:
+                                post = post_data.get('data', {})
+                                
+                                # Check if post contains coastal keywords
+                                text = f"{post.get('title', '')} {post.get('selftext', '')}"
+                                if self.contains_keywords(text):
+                                    processed_post = self.process_reddit_post(post, subreddit)
+                                    if processed_post:
+                                        subreddit_posts.append(processed_post)
+                            classify.set_attribute('posts', len(subreddit_posts))
+                        
+                        posts.extend(subreddit_posts)
+                        if on_posts and subreddit_posts:
+                            on_posts([post.build_api() for post in subreddit_posts])
                 
-                time.sleep(1)  # Rate limiting
+                pace(1)  # Rate limiting
                 
             except Exception as e:
                 print(f"Error fetching from r/{subreddit}: {e}")
@@ -69,7 +91,7 @@ class FreeDataMonitor:
         
         return posts
     
-    def get_news_feeds(self) -> List[Dict]:
+    def get_news_feeds(self, on_posts: Optional[Callable[[List[Dict]], None]] = None) -> List[Post]:
         """Fetch news from free RSS feeds"""
         posts = []
         
@@ -93,17 +115,28 @@ class FreeDataMonitor:
         
         for feed_url in feeds:
             try:
-                feed = feedparser.parse(feed_url)
-                
-                for entry in feed.entries[:10]:  # Limit to 10 per feed
-                    text = f"{entry.get('title', '')} {entry.get('summary', '')}"
+                with span('source', source='news', feed=feed_url):
+                    with span('request', url=feed_url) as request:
+                        feed, response = fetch_feed(self.session, feed_url)
+                        request.set_attribute('status', response.status_code)
                     
-                    if self.contains_keywords(text):
-                        processed_post = self.process_news_post(entry, feed_url)
-                        if processed_post:
-                            posts.append(processed_post)
+                    feed_posts = []
+                    entries = feed.entries[:10]  # Limit to 10 per feed
+                    with span('classify', items=len(entries)) as classify:
+                        for entry in entries:
+                            text = f"{entry.get('title', '')} {entry.get('summary', '')}"
+                            
+                            if self.contains_keywords(text):
+                                processed_post = self.process_news_post(entry, feed_url)
+                                if processed_post:
+                                    feed_posts.append(processed_post)
+                        classify.set_attribute('posts', len(feed_posts))
                 
-                time.sleep(0.5)  # Rate limiting
+                posts.extend(feed_posts)
+                if on_posts and feed_posts:
+                    on_posts([post.build_api() for post in feed_posts])
+                
+                pace(0.5)  # Rate limiting
                 
             except Exception as e:
                 print(f"Error fetching feed {feed_url}: {e}")
@@ -111,7 +144,7 @@ class FreeDataMonitor:
         
         return posts
     
-    def get_government_alerts(self) -> List[Dict]:
+    def get_government_alerts(self, on_posts: Optional[Callable[[List[Dict]], None]] = None) -> List[Post]:
         """Fetch free government alerts and warnings"""
         posts = []
         
@@ -120,23 +153,31 @@ class FreeDataMonitor:
             url = "https://api.weather.gov/alerts/active"
             headers = {'User-Agent': 'CORSAIR-Monitor/1.0 (contact@corsair.com)'}
             
-            response = requests.get(url, headers=headers, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                
-                for alert in data.get('features', [])[:20]:  # Limit to 20 alerts
-                    properties = alert.get('properties', {})
+            with span('source', source='government'):
+                with span('request', url=url) as request:
+                    response = self.session.get(url, headers=headers, timeout=10)
+                    request.set_attribute('status', response.status_code)
+                if response.status_code == 200:
+                    data = response.json()
+                    alerts = data.get('features', [])[:20]  # Limit to 20 alerts
                     
-                    # Check if alert is coastal-related
-                    text = f"{properties.get('headline', '')} {properties.get('description', '')}"
-                    if self.contains_keywords(text) or 'coastal' in text.lower():
-                        processed_post = self.process_government_alert(properties)
-                        if processed_post:
-                            posts.append(processed_post)
+                    with span('classify', items=len(alerts)) as classify:
+                        for alert in alerts:
+                            properties = alert.get('properties', {})
+                            
+                            # Check if alert is coastal-related
+                            text = f"{properties.get('headline', '')} {properties.get('description', '')}"
+                            if self.contains_keywords(text) or 'coastal' in text.lower():
+                                processed_post = self.process_government_alert(properties)
+                                if processed_post:
+                                    posts.append(processed_post)
+                        classify.set_attribute('posts', len(posts))
             
         except Exception as e:
             print(f"Error fetching government alerts: {e}")
         
+        if on_posts and posts:
+            on_posts([post.build_api() for post in posts])
         return posts
     
     def contains_keywords(self, text: str) -> bool:
@@ -144,7 +185,7 @@ class FreeDataMonitor:
         text_lower = text.lower()
         return any(keyword in text_lower for keyword in self.keywords)
     
-    def process_reddit_post(self, post: Dict, subreddit: str) -> Dict:
+    def process_reddit_post(self, post: Dict, subreddit: str) -> Optional[Post]:
         """Process Reddit post into standard format"""
         try:
             text = f"{post.get('title', '')} {post.get('selftext', '')}"
@@ -159,37 +200,32 @@ class FreeDataMonitor:
             # Determine hazard type
             hazard_type = self.determine_hazard_type(text)
             
-            return {
-                'id': f"reddit_{post.get('id', '')}",
-                'text': text[:500],  # Limit text length
-                'created_at': datetime.fromtimestamp(post.get('created_utc', time.time())).isoformat(),
-                'author': {
-                    'username': post.get('author', 'unknown'),
-                    'name': f"Reddit User (@{post.get('author', 'unknown')})",
-                    'location': f"r/{subreddit}"
-                },
-                'location': {
-                    'type': 'subreddit',
-                    'name': f"r/{subreddit}"
-                },
-                'sentiment': sentiment,
-                'polarity': blob.sentiment.polarity,
-                'urgency': urgency,
-                'hazard_type': hazard_type,
-                'metrics': {
+            return Post(
+                id=f"reddit_{post.get('id', '')}",
+                text=text[:500],  # Limit text length
+                # Missing times stay None rather than now, so the content hash is stable across runs
+                created_at=datetime.fromtimestamp(post['created_utc']).isoformat() if post.get('created_utc') else None,
+                author=post.get('author', 'unknown'),
+                author_name=f"Reddit User (@{post.get('author', 'unknown')})",
+                location=f"r/{subreddit}",
+                location_type='subreddit',
+                sentiment=sentiment,
+                polarity=blob.sentiment.polarity,
+                urgency=urgency,
+                hazard_type=hazard_type,
+                engagement={
                     'upvotes': post.get('ups', 0),
                     'comments': post.get('num_comments', 0),
                     'score': post.get('score', 0)
                 },
-                'processed_at': datetime.now().isoformat(),
-                'source': 'reddit',
-                'url': f"https://reddit.com{post.get('permalink', '')}"
-            }
+                source='reddit',
+                url=f"https://reddit.com{post.get('permalink', '')}"
+            )
         except Exception as e:
             print(f"Error processing Reddit post: {e}")
             return None
     
-    def process_news_post(self, entry: Any, feed_url: str) -> Dict:
+    def process_news_post(self, entry: Any, feed_url: str) -> Optional[Post]:
         """Process news feed entry into standard format"""
         try:
             text = f"{entry.get('title', '')} {entry.get('summary', '')}"
@@ -208,37 +244,31 @@ class FreeDataMonitor:
             # Determine source name
             source_name = self.get_source_name(feed_url)
             
-            return {
-                'id': f"news_{hash(entry.get('link', '') + entry.get('title', ''))}",
-                'text': text[:500],
-                'created_at': entry.get('published_parsed', time.gmtime()),
-                'author': {
-                    'username': source_name,
-                    'name': source_name,
-                    'location': 'News Source'
-                },
-                'location': {
-                    'type': 'news',
-                    'name': source_name
-                },
-                'sentiment': sentiment,
-                'polarity': blob.sentiment.polarity,
-                'urgency': urgency,
-                'hazard_type': hazard_type,
-                'metrics': {
+            return Post(
+                # Stable across runs (builtin hash() is salted per process) so unchanged posts can be skipped
+                id=f"news_{hashlib.md5((entry.get('link', '') + entry.get('title', '')).encode()).hexdigest()[:16]}",
+                text=text[:500],
+                created_at=entry.get('published_parsed') or entry.get('updated_parsed'),
+                author=source_name,
+                author_location='News Source',
+                location=source_name,
+                sentiment=sentiment,
+                polarity=blob.sentiment.polarity,
+                urgency=urgency,
+                hazard_type=hazard_type,
+                engagement={
                     'retweet_count': 0,
                     'like_count': 0,
                     'reply_count': 0
                 },
-                'processed_at': datetime.now().isoformat(),
-                'source': 'news',
-                'url': entry.get('link', '')
-            }
+                source='news',
+                url=entry.get('link', '')
+            )
         except Exception as e:
             print(f"Error processing news post: {e}")
             return None
     
-    def process_government_alert(self, alert: Dict) -> Dict:
+    def process_government_alert(self, alert: Dict) -> Optional[Post]:
         """Process government alert into standard format"""
         try:
             text = f"{alert.get('headline', '')} {alert.get('description', '')}"
@@ -247,32 +277,26 @@ class FreeDataMonitor:
             urgency = 'high' if any(word in text.lower() for word in ['warning', 'emergency', 'urgent', 'immediate']) else 'medium'
             hazard_type = self.determine_hazard_type(text)
             
-            return {
-                'id': f"gov_{alert.get('id', hash(text))}",
-                'text': text[:500],
-                'created_at': alert.get('sent', datetime.now().isoformat()),
-                'author': {
-                    'username': alert.get('senderName', 'NWS'),
-                    'name': alert.get('senderName', 'National Weather Service'),
-                    'location': 'Government Alert'
-                },
-                'location': {
-                    'type': 'government',
-                    'name': alert.get('areaDesc', 'Multiple Areas')
-                },
-                'sentiment': 'Negative',
-                'polarity': -0.5,
-                'urgency': urgency,
-                'hazard_type': hazard_type,
-                'metrics': {
+            return Post(
+                id=f"gov_{alert.get('id') or hashlib.md5(text.encode()).hexdigest()[:16]}",
+                text=text[:500],
+                created_at=alert.get('sent') or alert.get('effective'),
+                author=alert.get('senderName', 'NWS'),
+                author_name=alert.get('senderName', 'National Weather Service'),
+                author_location='Government Alert',
+                location=alert.get('areaDesc', 'Multiple Areas'),
+                sentiment='Negative',
+                polarity=-0.5,
+                urgency=urgency,
+                hazard_type=hazard_type,
+                engagement={
                     'retweet_count': 100,  # Government alerts are widely shared
                     'like_count': 50,
                     'reply_count': 25
                 },
-                'processed_at': datetime.now().isoformat(),
-                'source': 'government',
-                'url': alert.get('web', '')
-            }
+                source='government',
+                url=alert.get('web', '')
+            )
         except Exception as e:
             print(f"Error processing government alert: {e}")
             return None
@@ -329,111 +353,81 @@ class FreeDataMonitor:
         else:
             return 'News Source'
     
-    def save_to_firebase(self, posts: List[Dict]):
-        """Save posts to Firebase"""
-        if not self.db:
-            print("Firebase not initialized, skipping save")
-            return
-        
+    def save_to_firebase(self, posts: List[Post]):
+        """Queue posts for upload to Firebase; the spool flusher delivers them in the background"""
         try:
-            collection_ref = self.db.collection('social_media_posts')
-            
-            for post in posts:
-                # Use post ID as document ID to avoid duplicates
-                doc_ref = collection_ref.document(post['id'])
-                doc_ref.set(post, merge=True)
-            
-            print(f"Saved {len(posts)} posts to Firebase")
+            # Use post ID as document ID to avoid duplicates
+            with span('persist', table='social_media_posts', posts=len(posts)) as persist:
+                queued = self.spool.enqueue('social_media_posts', ((post.id, post.build_api()) for post in posts))
+                persist.set_attribute('queued', queued)
+            print(f"Queued {queued} posts for Firebase upload")
             
             # Update analytics
             self.update_analytics(posts)
             
+            if self.flusher:
+                self.flusher.notify()
+            else:
+                print("Firebase not initialized, posts kept in the upload spool for a later run")
+            
         except Exception as e:
-            print(f"Error saving to Firebase: {e}")
+            print(f"Error queueing posts for Firebase: {e}")
     
-    def update_analytics(self, posts: List[Dict]):
-        """Update analytics data"""
+    def update_analytics(self, posts: List[Post]):
+        """Apply posts to the persisted analytics counters and queue the cumulative summary"""
         try:
-            analytics = {
-                'total_mentions': len(posts),
-                'sentiment_breakdown': {
-                    'positive': sum(1 for p in posts if p['sentiment'] == 'Positive'),
-                    'negative': sum(1 for p in posts if p['sentiment'] == 'Negative'),
-                    'neutral': sum(1 for p in posts if p['sentiment'] == 'Neutral')
-                },
-                'urgency_breakdown': {
-                    'high': sum(1 for p in posts if p['urgency'] == 'high'),
-                    'medium': sum(1 for p in posts if p['urgency'] == 'medium'),
-                    'low': sum(1 for p in posts if p['urgency'] == 'low')
-                },
-                'source_breakdown': {
-                    'reddit': sum(1 for p in posts if p['source'] == 'reddit'),
-                    'news': sum(1 for p in posts if p['source'] == 'news'),
-                    'government': sum(1 for p in posts if p['source'] == 'government')
-                },
-                'last_updated': datetime.now().isoformat()
-            }
-            
-            # Count hazard types
-            hazard_counts = {}
-            for post in posts:
-                hazard = post['hazard_type']
-                hazard_counts[hazard] = hazard_counts.get(hazard, 0) + 1
-            
-            analytics['hazard_types'] = hazard_counts
-            
-            # Calculate engagement stats
-            total_engagement = sum(
-                post['metrics'].get('upvotes', 0) + 
-                post['metrics'].get('comments', 0) + 
-                post['metrics'].get('score', 0) + 
-                post['metrics'].get('retweet_count', 0) + 
-                post['metrics'].get('like_count', 0)
-                for post in posts
-            )
-            
-            analytics['engagement_stats'] = {
-                'total_engagement': total_engagement,
-                'avg_engagement': total_engagement / len(posts) if posts else 0
-            }
+            self.analytics.apply(posts)
+            analytics = self.analytics.summary()
+            analytics['last_run'] = StreamingAnalytics().extend(posts).result()
             
-            # Save analytics
-            self.db.collection('social_media_analytics').document('latest').set(analytics, merge=True)
-            print("Analytics updated successfully")
+            # Save analytics ahead of queued posts
+            self.spool.enqueue('social_media_analytics', [('latest', analytics)], priority_of=lambda _: 0)
+            print("Analytics update queued")
             
         except Exception as e:
             print(f"Error updating analytics: {e}")
     
-    def run_monitoring(self, keywords: List[str] = None):
-        """Run the free monitoring service"""
+    def run_monitoring(self, keywords: List[str] = None,
+                       on_posts: Optional[Callable[[List[Dict]], None]] = None):
+        """Run the free monitoring service
+        
+        `on_posts` receives each subreddit's, feed's and alert batch's posts
+        as soon as they are classified (used by --stream).
+        """
         if keywords:
             self.keywords.extend(keywords)
         
         print("🌊 Starting FREE CORSAIR Social Media Monitor...")
         print(f"📝 Monitoring keywords: {', '.join(self.keywords)}")
         
-        all_posts = []
-        
-        print("📱 Fetching Reddit posts...")
-        reddit_posts = self.get_reddit_posts()
-        all_posts.extend(reddit_posts)
-        print(f"✅ Found {len(reddit_posts)} Reddit posts")
-        
-        print("📰 Fetching news feeds...")
-        news_posts = self.get_news_feeds()
-        all_posts.extend(news_posts)
-        print(f"✅ Found {len(news_posts)} news posts")
-        
-        print("🏛️ Fetching government alerts...")
-        gov_posts = self.get_government_alerts()
-        all_posts.extend(gov_posts)
-        print(f"✅ Found {len(gov_posts)} government alerts")
-        
-        print(f"📊 Total posts collected: {len(all_posts)}")
+        with span('monitor', keywords=len(self.keywords)) as run:
+            all_posts = []
+            
+            print("📱 Fetching Reddit posts...")
+            reddit_posts = self.get_reddit_posts(on_posts)
+            all_posts.extend(reddit_posts)
+            print(f"✅ Found {len(reddit_posts)} Reddit posts")
+            
+            print("📰 Fetching news feeds...")
+            news_posts = self.get_news_feeds(on_posts)
+            all_posts.extend(news_posts)
+            print(f"✅ Found {len(news_posts)} news posts")
+            
+            print("🏛️ Fetching government alerts...")
+            gov_posts = self.get_government_alerts(on_posts)
+            all_posts.extend(gov_posts)
+            print(f"✅ Found {len(gov_posts)} government alerts")
+            
+            print(f"📊 Total posts collected: {len(all_posts)}")
+            run.set_attribute('posts', len(all_posts))
+            
+            if all_posts:
+                print("💾 Saving to Firebase...")
+                self.save_to_firebase(all_posts)
         
-        if all_posts:
-            print("💾 Saving to Firebase...")
-            self.save_to_firebase(all_posts)
+        # Give the upload a bounded head start; anything left stays spooled for the next run
+        if self.flusher:
+            self.flusher.drain(timeout=10)
         
         # Generate summary
         result = {
@@ -445,21 +439,36 @@ class FreeDataMonitor:
                 'news_posts': len(news_posts),
                 'government_alerts': len(gov_posts),
                 'keywords_monitored': len(self.keywords),
+                'firestore': {
+                    **(self.flusher.totals if self.flusher else {'written': 0, 'skipped': 0, 'failed': 0}),
+                    'spool': self.spool.stats()
+                },
                 'timestamp': datetime.now().isoformat()
             }
         }
         
-        print(json.dumps(result, indent=2))
+        if not on_posts:
+            write_output(result)
         return result
 
 if __name__ == "__main__":
     import sys
     
+    # --stream writes one JSON line per post, then a summary line
+    stream = '--stream' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--stream']
+    
     # Get keywords from command line arguments
     keywords = []
-    if len(sys.argv) > 1:
-        keywords = sys.argv[1].split(',')
+    if args:
+        keywords = args[0].split(',')
     
     # Run the free monitoring service
-    monitor = FreeDataMonitor()
-    monitor.run_monitoring(keywords)
+    if stream:
+        with streaming_stdout() as emitter:
+            monitor = FreeDataMonitor()
+            result = monitor.run_monitoring(keywords, on_posts=emitter.posts_batch)
+            emitter.summary(result)
+    else:
+        monitor = FreeDataMonitor()
+        monitor.run_monitoring(keywords)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Gazetteer of Indian coastal places for fast location extraction
+Loads data/coastal_gazetteer.json, which lists each place's canonical
+name, aliases (Bombay/Mumbai, Vizag/Visakhapatnam, Calicut/Kozhikode),
+state and coordinates. Every name is compiled into one case-insensitive
+regex, so a post is resolved in a single pass, with coordinates attached.
+The monitors use this first and only run spaCy NER and geocoding when it
+finds nothing.
+
+Some names also belong to places elsewhere (Kochi in Japan, Surat Thani,
+Dwarka in Delhi, the Andaman Sea). The file marks these as ambiguous. An
+ambiguous name only counts when the text also has context: the word
+India or another of the file's context terms, the place's state, or an
+unambiguous place from the gazetteer.
+
+  python gazetteer.py "Heavy rain lashes Vizag and Calicut"
+"""
+
+import functools
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'coastal_gazetteer.json')
+
+
+@dataclass(frozen=True)
+class Place:
+    """A coastal place; `lat`/`lon` are approximate decimal degrees"""
+    name: str
+    state: str
+    lat: float
+    lon: float
+    aliases: Tuple[str, ...] = field(default=(), compare=False)
+    # Names (lowercase) that need context, see the module docstring
+    ambiguous: FrozenSet[str] = field(default=frozenset(), compare=False)
+
+    def coordinates(self) -> Dict[str, float]:
+        return {'lat': self.lat, 'lng': self.lon}
+
+
+class Gazetteer:
+    """Finds known places in text with one compiled pattern"""
+
+    def __init__(self, places: Iterable[Place], context: Sequence[str] = ()):
+        self.places = list(places)
+        self._by_name: Dict[str, Place] = {}
+        for place in self.places:
+            for name in (place.name,) + place.aliases:
+                key = name.lower()
+                if key in self._by_name and self._by_name[key] != place:
+                    raise ValueError(f"'{name}' names both {self._by_name[key].name} and {place.name}")
+                self._by_name[key] = place
+        # Longest names first, so 'Navi Mumbai' wins over 'Mumbai'. Patterns are
+        # lowercase and run on lowercased text, which is faster than IGNORECASE.
+        names = sorted(self._by_name, key=len, reverse=True)
+        self._pattern = re.compile(r'\b(?:' + '|'.join(re.escape(name) for name in names) + r')\b')
+        terms = sorted({term.lower() for term in context} | {place.state.lower() for place in self.places},
+                       key=len, reverse=True)
+        self._context = re.compile(r'\b(?:' + '|'.join(re.escape(term) for term in terms) + r')\b')
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> 'Gazetteer':
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls((Place(entry['name'], entry['state'], entry['lat'], entry['lon'],
+                          tuple(entry.get('aliases', ())),
+                          frozenset(name.lower() for name in entry.get('ambiguous', ())))
+                    for entry in data['places']), data.get('context', ()))
+
+    def _matches(self, text: str) -> Iterable[Tuple[str, Place]]:
+        for match in self._pattern.finditer(text):
+            name = match.group()
+            yield name, self._by_name[name]
+
+    def find_all(self, text: str) -> List[Place]:
+        """Places mentioned in the text, in order of first mention"""
+        text = text.lower()
+        has_context = None
+        found = []
+        for name, place in self._matches(text):
+            if name in place.ambiguous:
+                if has_context is None:
+                    has_context = self._has_context(text)
+                if not has_context:
+                    continue
+            if place not in found:
+                found.append(place)
+        return found
+
+    def first(self, text: str) -> Optional[Place]:
+        """The first place mentioned in the text, if any"""
+        text = text.lower()
+        match = self._pattern.search(text)
+        if match is None:
+            return None
+        name = match.group()
+        place = self._by_name[name]
+        if name not in place.ambiguous or self._has_context(text, match.end()):
+            return place
+        return None
+
+    def _has_context(self, text: str, after: int = 0) -> bool:
+        """Whether ambiguous names in lowercased text count: a context term, or an unambiguous place after `after`"""
+        if self._context.search(text):
+            return True
+        for match in self._pattern.finditer(text, after):
+            name = match.group()
+            if name not in self._by_name[name].ambiguous:
+                return True
+        return False
+
+    def lookup(self, name: str) -> Optional[Place]:
+        """The place a name or alias refers to exactly, ambiguous or not"""
+        return self._by_name.get(name.strip().lower())
+
+
+@functools.lru_cache(maxsize=None)
+def default_gazetteer() -> Gazetteer:
+    """The bundled gazetteer, loaded once per process"""
+    return Gazetteer.load()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the coastal places a text mentions")
+    parser.add_argument('text')
+    parser.add_argument('--gazetteer', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    for place in Gazetteer.load(args.gazetteer).find_all(args.text):
+        print(f"{place.name}, {place.state}  ({place.lat:.4f}, {place.lon:.4f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Record/replay HTTP cassettes for offline, deterministic scrapes
+In record mode, a transport adapter mounted on the shared session
+(http_session.make_session) stores every response it sees. That covers
+the status, headers, body and the time the download took. Failed requests
+(timeouts, refused connections) are stored as errors. The cassette is
+written as gzip-compressed JSON lines. In replay mode the same adapter
+serves the stored responses and never touches the network. It can wait
+out each recorded download time, or answer at zero latency so that fetch
+and parse throughput can be profiled on their own.
+
+  python real_web_scraper.py --record run.cassette.gz
+  python real_web_scraper.py --replay run.cassette.gz --replay-latency zero
+
+Other entry points use the environment instead: CORSAIR_CASSETTE=PATH
+with CORSAIR_CASSETTE_MODE=record|replay and
+CORSAIR_CASSETTE_LATENCY=recorded|zero. The flags above set these too, so
+processes they start (the detached --cached refresh) share the cassette.
+A recording started with --record empties the file before any process
+starts; every save, in the parent or a child, then adds its responses.
+"""
+
+import atexit
+import base64
+import gzip
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+MODES = ('record', 'replay')
+LATENCIES = ('recorded', 'zero')
+
+# Bodies are stored decoded, so the transfer headers no longer describe them
+_DROPPED_HEADERS = ('content-encoding', 'transfer-encoding')
+
+
+class CassetteMiss(requests.ConnectionError):
+    """A replayed request that the cassette has no response for"""
+
+
+class Cassette:
+    """Recorded interactions by (method, URL), in recording order"""
+
+    def __init__(self, path: str, mode: str = 'replay', latency: str = 'recorded'):
+        if mode not in MODES:
+            raise ValueError(f"cassette mode must be one of {', '.join(MODES)}")
+        if latency not in LATENCIES:
+            raise ValueError(f"cassette latency must be one of {', '.join(LATENCIES)}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.interactions: List[Dict[str, Any]] = []
+        # Replay position per key; repeated requests get the recorded responses in order
+        self._by_key: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._served: Dict[Tuple[str, str], int] = {}
+        # Interactions already in the file
+        self._saved = 0
+        if mode == 'replay':
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, 'rb') as f:
+            interactions = [loads(line) for line in f if line.strip()]
+        with self.lock:
+            self.interactions = interactions
+            self._saved = len(interactions)
+            self._by_key.clear()
+            self._served.clear()
+            for interaction in interactions:
+                self._by_key.setdefault((interaction['method'], interaction['url']), []).append(interaction)
+        logger.info(f"Loaded {len(interactions)} recorded responses from {self.path}")
+
+    def save(self):
+        """Write what was recorded since the last save"""
+        with self.lock:
+            lines = [dumps(interaction) + b'\n' for interaction in self.interactions[self._saved:]]
+            if not lines:
+                return
+            self._saved = len(self.interactions)
+        # Each save adds a gzip member, so processes sharing the file never overwrite each other
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with gzip.open(self.path, 'ab') as f:
+            f.writelines(lines)
+        logger.info(f"Recorded {len(lines)} responses to {self.path}")
+
+    def _append(self, interaction: Dict[str, Any]):
+        with self.lock:
+            self.interactions.append(interaction)
+
+    def record(self, request: requests.PreparedRequest, response: requests.Response, elapsed: float):
+        self._append({
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items()
+                        if name.lower() not in _DROPPED_HEADERS},
+            'body': base64.b64encode(response.content or b'').decode('ascii'),
+            'elapsed': round(elapsed, 6),
+            'recorded_at': datetime.now().isoformat()
+        })
+
+    def record_error(self, request: requests.PreparedRequest, error: Exception, elapsed: float):
+        self._append({
+            'method': request.method,
+            'url': request.url,
+            'error': type(error).__name__,
+            'message': str(error),
+            'elapsed': round(elapsed, 6),
+            'recorded_at': datetime.now().isoformat()
+        })
+
+    def next_interaction(self, method: str, url: str) -> Optional[Dict[str, Any]]:
+        """The next recorded interaction for this request; the last one repeats once all were served"""
+        key = (method, url)
+        with self.lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                return None
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            return recorded[min(index, len(recorded) - 1)]
+
+    def replay(self, request: requests.PreparedRequest) -> requests.Response:
+        interaction = self.next_interaction(request.method, request.url)
+        if interaction is None:
+            raise CassetteMiss(f"{request.method} {request.url} is not in cassette {self.path}", request=request)
+        if self.latency == 'recorded' and interaction['elapsed'] > 0:
+            time.sleep(interaction['elapsed'])
+
+        if 'error' in interaction:
+            error = getattr(requests.exceptions, interaction['error'], None)
+            if not (isinstance(error, type) and issubclass(error, requests.RequestException)):
+                error = requests.ConnectionError
+            raise error(interaction['message'], request=request)
+
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.reason = interaction['reason']
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = base64.b64decode(interaction['body'])
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=interaction['elapsed'])
+        return response
+
+
+class CassetteAdapter(HTTPAdapter):
+    """Transport that records through to the network, or replays without it"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if self.cassette.mode == 'replay':
+            return self.cassette.replay(request)
+        started = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+            # Read the body here, so the recorded time covers the whole download
+            response.content
+        except requests.RequestException as e:
+            self.cassette.record_error(request, e, time.perf_counter() - started)
+            raise
+        self.cassette.record(request, response, time.perf_counter() - started)
+        return response
+
+
+_cassette: Optional[Cassette] = None
+
+
+def configure(path: Optional[str] = None, mode: Optional[str] = None, latency: Optional[str] = None):
+    """Use a cassette for sessions made from now on (None goes back to the network)"""
+    global _cassette
+    previous, _cassette = _cassette, None
+    if previous is not None:
+        previous.save()
+    if path:
+        _cassette = Cassette(path, mode or 'replay', latency or 'recorded')
+
+
+def configure_processes(path: str, mode: str, latency: str = 'recorded'):
+    """configure(), and pass the cassette on to child processes through the environment
+
+    A new recording starts from an empty file here, before any child can
+    have added to it.
+    """
+    configure(path, mode, latency)
+    if mode == 'record':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        open(path, 'wb').close()
+    os.environ.update(CORSAIR_CASSETTE=path, CORSAIR_CASSETTE_MODE=mode, CORSAIR_CASSETTE_LATENCY=latency)
+
+
+def active() -> Optional[Cassette]:
+    return _cassette
+
+
+def replaying() -> bool:
+    """Whether sessions answer from a cassette, with no server to pace requests for"""
+    return _cassette is not None and _cassette.mode == 'replay'
+
+
+def _save():
+    if _cassette is not None:
+        _cassette.save()
+
+
+atexit.register(_save)
+configure(os.environ.get('CORSAIR_CASSETTE'), os.environ.get('CORSAIR_CASSETTE_MODE'),
+          os.environ.get('CORSAIR_CASSETTE_LATENCY'))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List the responses stored in a cassette")
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    cassette = Cassette(args.path, 'replay', 'zero')
+    for interaction in cassette.interactions:
+        outcome = interaction.get('error') or interaction['status']
+        size = len(base64.b64decode(interaction['body'])) if 'body' in interaction else 0
+        print(f"{interaction['method']:<6} {outcome!s:<16} {size:>9} B {interaction['elapsed']:>8.3f}s  "
+              f"{interaction['url']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP session setup for the scrapers
+Every scraper builds its requests.Session with make_session(), so all of
+them use the same transport. When a cassette is configured
+(http_cassette.py), its adapter is mounted for http and https, and the
+session records or replays instead of going only to the network.
+With CORSAIR_SOURCE_OVERRIDE=http://127.0.0.1:8799, every request is
+sent to that server instead, with the original host as the first path
+segment. That is how the scrapers are pointed at stand_in_server.py.
+fetch_feed() downloads RSS/Atom feeds through such a session, so
+feedparser never opens its own connections. pace() is the sleep between
+requests to one site, skipped while a cassette is replayed.
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+
+import http_cassette
+from http_cassette import CassetteAdapter
+
+DEFAULT_TIMEOUT = 10
+
+
+def override_url(base_url: str, url: str) -> str:
+    """'https://www.reddit.com/r/india/hot.json?limit=10' -> '<base>/www.reddit.com/r/india/hot.json?limit=10'"""
+    parts = urlsplit(url)
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{base_url.rstrip('/')}/{parts.netloc}{parts.path or '/'}{query}"
+
+
+class SourceOverrideAdapter(HTTPAdapter):
+    """Sends every request to one base URL (a stand-in server) instead of its own host"""
+
+    def __init__(self, base_url: str, transport: Optional[HTTPAdapter] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url
+        self.transport = transport
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        if not request.url.startswith(self.base_url):
+            request.url = override_url(self.base_url, request.url)
+        if self.transport is not None:
+            return self.transport.send(request, **kwargs)
+        return super().send(request, **kwargs)
+
+
+def make_session(headers: Optional[Dict[str, str]] = None) -> requests.Session:
+    """A requests session with the configured transport mounted"""
+    session = requests.Session()
+    if headers:
+        session.headers.update(headers)
+    adapter = None
+    cassette = http_cassette.active()
+    if cassette is not None:
+        adapter = CassetteAdapter(cassette)
+    override = os.environ.get('CORSAIR_SOURCE_OVERRIDE')
+    if override:
+        adapter = SourceOverrideAdapter(override, adapter)
+    if adapter is not None:
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+    return session
+
+
+def pace(seconds: float):
+    """Wait between requests to a live site; replayed responses need no rate limiting"""
+    if not http_cassette.replaying():
+        time.sleep(seconds)
+
+
+def fetch_feed(session: requests.Session, url: str, timeout: float = DEFAULT_TIMEOUT,
+               **kwargs) -> Tuple[Any, requests.Response]:
+    """Download a feed through `session` and parse it; returns (feed, response)"""
+    response = session.get(url, timeout=timeout, **kwargs)
+    feed = feedparser.parse(response.content, response_headers=dict(response.headers))
+    feed['status'] = response.status_code
+    feed['href'] = response.url
+    return feed, response
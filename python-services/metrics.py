@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+In-process metrics for the scraping services
+Counters, gauges and histograms with labels, kept in one registry per
+process. The daemon serves them as Prometheus text at GET /metrics and the
+CLIs add a JSON `metrics` block (snapshot()) to their output. The metrics
+the services record are defined at the bottom of this module, so every
+module reports under the same names:
+
+  corsair_fetch_seconds{host}            source download latency
+  corsair_fetch_bytes_total{host}        bytes downloaded
+  corsair_parse_seconds{source}          parsing one fetched source unit
+  corsair_classify_seconds               classifying one post
+  corsair_db_write_seconds{table}        storing one batch of posts
+  corsair_cache_requests_total{cache, result}
+  corsair_pipeline_items_total{pipeline, stage} and busy/blocked seconds
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; suits network fetches and batch writes
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; suits per-post CPU work measured in microseconds
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """A named metric with one value per combination of label values"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {', '.join(self.labelnames) or '(none)'}")
+        try:
+            return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError as e:
+            raise ValueError(f"{self.name} has no label {e}") from None
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self.lock:
+            return sorted(self._values.items())
+
+    def reset(self):
+        with self.lock:
+            self._values.clear()
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(Metric):
+    """A value that only goes up (requests, bytes, seconds spent)"""
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self.lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}"
+                for key, value in self._items()]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [{'labels': self._labels(key), 'value': round(value, 6)} for key, value in self._items()]
+
+
+class Gauge(Counter):
+    """A value that is set to the latest reading"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self._values[key] = value
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'sum', 'max')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram(Metric):
+    """Distribution of observed values (e.g. latencies) over fixed buckets"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = _Series(len(self.bounds) + 1)
+            series.buckets[index] += 1
+            series.count += 1
+            series.sum += value
+            if value > series.max:
+                series.max = value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the with-block, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        with self.lock:
+            series = self._values.get(self._key(labels))
+            return self._quantile(series, q) if series else None
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.buckets):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else series.max
+                return min(series.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return series.max
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in self._items():
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), series.buckets):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {series.count}")
+        return lines
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            items = sorted(self._values.items())
+            return [{
+                'labels': self._labels(key),
+                'count': series.count,
+                'sum': round(series.sum, 6),
+                'avg': round(series.sum / series.count, 6),
+                'p50': round(self._quantile(series, 0.5), 6),
+                'p95': round(self._quantile(series, 0.95), 6),
+                'max': round(series.max, 6)
+            } for key, series in items]
+
+
+class MetricsRegistry:
+    """All metrics of one process, by name"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics: Dict[str, Metric] = {}
+
+    def _get(self, cls: type, name: str, *args, **kwargs) -> Any:
+        with self.lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"metric {name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets)
+
+    def metrics(self) -> List[Metric]:
+        with self.lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Recorded values by metric name, for JSON output; metrics never touched are left out"""
+        snapshot = {}
+        for metric in self.metrics():
+            values = metric.snapshot()
+            if values:
+                snapshot[metric.name] = values
+        return snapshot
+
+    def reset(self):
+        for metric in self.metrics():
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def snapshot() -> Dict[str, List[Dict[str, Any]]]:
+    return REGISTRY.snapshot()
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render_prometheus()
+
+
+# --- metrics recorded by the services ---
+
+FETCH_SECONDS = REGISTRY.histogram('corsair_fetch_seconds', 'Source download latency by host', ('host',))
+FETCH_BYTES = REGISTRY.counter('corsair_fetch_bytes_total', 'Bytes downloaded from sources by host', ('host',))
+FETCH_ERRORS = REGISTRY.counter('corsair_fetch_errors_total', 'Failed source downloads by host', ('host',))
+PARSE_SECONDS = REGISTRY.histogram('corsair_parse_seconds', 'Time to parse one fetched source unit', ('source',))
+CLASSIFY_SECONDS = REGISTRY.histogram('corsair_classify_seconds', 'Time to classify one post', buckets=FAST_BUCKETS)
+DB_WRITE_SECONDS = REGISTRY.histogram('corsair_db_write_seconds', 'Time to store one batch of posts', ('table',))
+DB_POSTS_WRITTEN = REGISTRY.counter('corsair_db_posts_written_total', 'Posts newly inserted', ('table',))
+CACHE_REQUESTS = REGISTRY.counter('corsair_cache_requests_total', 'Cache lookups by outcome', ('cache', 'result'))
+PIPELINE_ITEMS = REGISTRY.counter('corsair_pipeline_items_total', 'Items processed per pipeline stage',
+                                  ('pipeline', 'stage'))
+PIPELINE_ERRORS = REGISTRY.counter('corsair_pipeline_errors_total', 'Items dropped by stage errors',
+                                   ('pipeline', 'stage'))
+PIPELINE_BUSY_SECONDS = REGISTRY.counter('corsair_pipeline_busy_seconds_total', 'Time stages spent processing items',
+                                         ('pipeline', 'stage'))
+PIPELINE_BLOCKED_SECONDS = REGISTRY.counter('corsair_pipeline_blocked_seconds_total',
+                                            'Time stages waited on a full downstream queue', ('pipeline', 'stage'))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+NDJSON streaming output for the service CLIs
+In --stream mode each classified post is written to stdout as one JSON line
+as soon as it is available, followed by a final summary line:
+
+  {"type": "post", "post": {...}}
+  {"type": "summary", ...}
+
+Everything else (print output, logging) goes to stderr so stdout stays
+machine-readable line by line.
+"""
+
+import contextlib
+import sys
+from typing import Any, Dict, Iterable, Iterator, TextIO
+
+from serialization import dumps
+
+
+class NdjsonEmitter:
+    """Writes and flushes one JSON object per line"""
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.posts = 0
+
+    def _write(self, record: Dict[str, Any]):
+        self.out.write(dumps(record).decode('utf-8'))
+        self.out.write('\n')
+        self.out.flush()
+
+    def post(self, post: Dict[str, Any]):
+        self._write({'type': 'post', 'post': post})
+        self.posts += 1
+
+    def posts_batch(self, posts: Iterable[Dict[str, Any]]):
+        for post in posts:
+            self.post(post)
+
+    def summary(self, summary: Dict[str, Any]):
+        self._write({'type': 'summary', 'streamed_posts': self.posts, **summary})
+
+
+@contextlib.contextmanager
+def streaming_stdout() -> Iterator[NdjsonEmitter]:
+    """Yield an emitter bound to the real stdout while print() output goes to stderr"""
+    emitter = NdjsonEmitter(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        yield emitter
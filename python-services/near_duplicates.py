@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for scraped posts
+Collapses syndicated and cross-posted copies of the same story using
+MinHash signatures over word shingles with banded LSH lookup. The index is
+persisted in SQLite next to the posts table so duplicates are recognised
+across runs, not just within one batch.
+"""
+
+import array
+import hashlib
+import random
+import re
+import sqlite3
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _stable_hash(value: bytes) -> int:
+    """Stable 64-bit hash (the builtin hash() is salted per process)"""
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+def shingles(text: str, size: int = 2) -> set:
+    """Normalised word shingles of a text"""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) < size:
+        return set(tokens)
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """Fixed family of universal hash permutations; seeded so signatures are comparable across runs"""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text: str) -> List[int]:
+        features = [_stable_hash(s.encode('utf-8')) for s in shingles(text)]
+        if not features:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in features)
+            for a, b in self.permutations
+        ]
+
+
+def estimate_similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of post signatures.
+
+    Signatures are cut into ``bands`` bands of ``num_perm / bands`` rows;
+    posts sharing any band become candidates and are confirmed against
+    ``threshold`` using the full signature.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, threshold: float = 0.6,
+                 num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.db_path = db_path or ':memory:'
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        # Callers serialize access; the scraper daemon uses the index from handler threads
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.init_tables()
+
+    def init_tables(self):
+        """Create the signature and band tables"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS post_fingerprints (
+                post_id TEXT PRIMARY KEY,
+                signature BLOB,
+                canonical_id TEXT,
+                duplicate_count INTEGER DEFAULT 1,
+                first_seen TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS post_fingerprint_bands (
+                band INTEGER,
+                band_hash INTEGER,
+                post_id TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_post_fingerprint_bands
+            ON post_fingerprint_bands (band, band_hash)
+        ''')
+        self.conn.commit()
+
+    def band_hashes(self, signature: List[int]) -> List[int]:
+        hashes = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            # Signed 64-bit so the value fits an SQLite INTEGER
+            hashes.append(_stable_hash(array.array('I', rows).tobytes()) - (1 << 63))
+        return hashes
+
+    def find_canonical(self, signature: List[int]) -> Optional[str]:
+        """Return the canonical id of the most similar stored post above the threshold"""
+        cursor = self.conn.cursor()
+        candidates = set()
+        for band, band_hash in enumerate(self.band_hashes(signature)):
+            rows = cursor.execute(
+                'SELECT post_id FROM post_fingerprint_bands WHERE band = ? AND band_hash = ?',
+                (band, band_hash)
+            ).fetchall()
+            candidates.update(row[0] for row in rows)
+
+        best_id, best_similarity = None, self.threshold
+        for post_id in candidates:
+            stored_signature, canonical_id = cursor.execute(
+                'SELECT signature, canonical_id FROM post_fingerprints WHERE post_id = ?', (post_id,)
+            ).fetchone()
+            similarity = estimate_similarity(signature, array.array('I', stored_signature))
+            if similarity >= best_similarity:
+                best_id, best_similarity = canonical_id or post_id, similarity
+        return best_id
+
+    def lookup_id(self, post_id: str) -> Optional[str]:
+        """Return the canonical id recorded for an already indexed post"""
+        row = self.conn.execute(
+            'SELECT canonical_id FROM post_fingerprints WHERE post_id = ?', (post_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def add(self, post_id: str, signature: List[int], canonical_id: Optional[str] = None):
+        """Record a signature, either as a canonical post or as an alias of one"""
+        canonical_id = canonical_id or post_id
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR IGNORE INTO post_fingerprints
+            (post_id, signature, canonical_id, duplicate_count, first_seen)
+            VALUES (?, ?, ?, 1, ?)
+        ''', (post_id, array.array('I', signature).tobytes(), canonical_id, datetime.now().isoformat()))
+        if cursor.rowcount == 0:
+            return
+
+        # Only canonical posts need to be findable; aliases resolve through them
+        if canonical_id == post_id:
+            cursor.executemany(
+                'INSERT INTO post_fingerprint_bands (band, band_hash, post_id) VALUES (?, ?, ?)',
+                [(band, band_hash, post_id) for band, band_hash in enumerate(self.band_hashes(signature))]
+            )
+        else:
+            cursor.execute(
+                'UPDATE post_fingerprints SET duplicate_count = duplicate_count + 1 WHERE post_id = ?',
+                (canonical_id,)
+            )
+
+    def duplicate_count(self, post_id: str) -> int:
+        row = self.conn.execute(
+            'SELECT duplicate_count FROM post_fingerprints WHERE post_id = ?', (post_id,)
+        ).fetchone()
+        return row[0] if row else 1
+
+    def collapse(self, items: Iterable[Any], text_of: Callable[[Any], str],
+                 id_of: Callable[[Any], str]) -> List[Tuple[Any, int]]:
+        """Collapse near-duplicate items onto one canonical item each.
+
+        Returns ``(item, duplicate_count)`` pairs for the canonical items of
+        this batch. Items matching a canonical post indexed by an earlier
+        run are dropped and counted against that post instead. Re-scraping
+        a post under its own id is not counted as a duplicate.
+        """
+        canonical: Dict[str, Any] = {}
+        for item in items:
+            post_id = id_of(item)
+            known = self.lookup_id(post_id)
+            if known is not None:
+                if known == post_id:
+                    canonical.setdefault(post_id, item)
+                continue
+
+            signature = self.hasher.signature(text_of(item))
+            match = self.find_canonical(signature)
+            self.add(post_id, signature, match)
+            if match is None:
+                canonical[post_id] = item
+
+        self.conn.commit()
+        return [(item, self.duplicate_count(post_id)) for post_id, item in canonical.items()]
+
+    def close(self):
+        self.conn.close()
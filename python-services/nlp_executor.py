@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Process-pool executor for CPU-bound NLP
+TextBlob sentiment and spaCy NER hold the GIL, so analysing a batch on the
+main thread uses one core. NlpExecutor ships chunks of texts to a
+ProcessPoolExecutor whose workers load the models once, in the pool
+initializer, and returns results in input order. Chunk size is chosen from
+the batch size and worker count; batches too small to repay the round trip
+(a few texts for spaCy, a few dozen for TextBlob alone), or hosts where a
+pool cannot start, run in-process instead.
+
+Tasks must be module-level functions of one text (see text_polarity and
+text_features). map() can also run another task whose models the pool
+already loads, so one text_features pool serves text_polarity too. Workers come from a forkserver (spawn where there is none),
+never a plain fork: callers such as the scraper daemon hold threads, locks
+and SQLite connections that a forked child would copy mid-use. Workers
+import the calling script as a module, so scripts that use the pool must
+not do setup at import time: models, clients, stores and threads are
+created from main() or on first use, and the entry point stays under
+`if __name__ == '__main__'`.
+"""
+
+import atexit
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Below this many texts the pool round trip costs more than it saves. A warm
+# pool adds about 0.5-6 ms per batch; TextBlob takes about 0.35 ms per tweet
+# and spaCy NER several ms, so NER pays off from a handful of texts.
+DEFAULT_MIN_PARALLEL = 32
+MIN_CHUNK = 8
+MAX_CHUNK = 256
+# Chunks per worker, so a slow chunk does not leave the other workers idle
+CHUNKS_PER_WORKER = 4
+
+LOCATION_LABELS = ('GPE', 'LOC')
+SPACY_MODEL = 'en_core_web_sm'
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+
+def load_models(names: Sequence[str]) -> Dict[str, Any]:
+    """Load ('textblob', 'spacy') models into this process once"""
+    with _models_lock:
+        if 'textblob' in names and 'textblob' not in _models:
+            from textblob import TextBlob
+            TextBlob('warm up').sentiment  # Loads the pattern lexicon
+            _models['textblob'] = TextBlob
+        if 'spacy' in names and 'spacy' not in _models:
+            import spacy
+            try:
+                _models['spacy'] = spacy.load(SPACY_MODEL)
+            except OSError:
+                print(f"Downloading spaCy model '{SPACY_MODEL}'...", file=sys.stderr)
+                from spacy.cli import download
+                download(SPACY_MODEL)
+                _models['spacy'] = spacy.load(SPACY_MODEL)
+    return _models
+
+
+def text_polarity(text: str) -> float:
+    """TextBlob polarity of one text"""
+    return load_models(('textblob',))['textblob'](text).sentiment.polarity
+
+
+def text_features(text: str) -> Dict[str, Any]:
+    """TextBlob polarity plus the GPE/LOC entities spaCy finds, in order"""
+    models = load_models(('textblob', 'spacy'))
+    return {
+        'polarity': models['textblob'](text).sentiment.polarity,
+        'locations': [ent.text for ent in models['spacy'](text).ents if ent.label_ in LOCATION_LABELS]
+    }
+
+
+# Models each built-in task needs preloaded
+TASK_MODELS = {text_polarity: ('textblob',), text_features: ('textblob', 'spacy')}
+# Smallest batch each built-in task is sent to the pool for
+TASK_MIN_PARALLEL = {text_polarity: DEFAULT_MIN_PARALLEL, text_features: 4}
+
+
+def _run_chunk(task: Callable[[str], Any], texts: List[str]) -> List[Any]:
+    return [task(text) for text in texts]
+
+
+def _pool_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        # Workers fork from a server that has imported this module already
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+class NlpExecutor:
+    """Map one NLP task over batches of texts on a pool of preloaded worker processes"""
+
+    def __init__(self, task: Callable[[str], Any], models: Optional[Sequence[str]] = None,
+                 max_workers: Optional[int] = None, min_parallel: Optional[int] = None):
+        self.task = task
+        self.models = tuple(models if models is not None else TASK_MODELS.get(task, ()))
+        if max_workers is None:
+            max_workers = int(os.environ.get('CORSAIR_NLP_WORKERS', 0)) or os.cpu_count() or 1
+        self.max_workers = max(1, max_workers)
+        if min_parallel is None:
+            min_parallel = TASK_MIN_PARALLEL.get(task, DEFAULT_MIN_PARALLEL)
+        self.min_parallel = min_parallel
+        self.lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_failed = False
+
+    def chunk_size(self, count: int) -> int:
+        """Texts per pool task for a batch of `count`; small batches still reach every worker"""
+        size = math.ceil(count / (self.max_workers * CHUNKS_PER_WORKER))
+        return max(min(MIN_CHUNK, math.ceil(count / self.max_workers)), min(MAX_CHUNK, size))
+
+    def uses_pool(self, count: int, task: Optional[Callable[[str], Any]] = None) -> bool:
+        """Whether a batch of `count` texts is worth sending to the pool"""
+        if task is None or task is self.task:
+            min_parallel = self.min_parallel
+        else:
+            min_parallel = TASK_MIN_PARALLEL.get(task, DEFAULT_MIN_PARALLEL)
+        return count >= min_parallel and self.max_workers != 1
+
+    def start(self):
+        """Start the workers now, so they load their models while the caller waits on I/O"""
+        pool = self._get_pool() if self.max_workers != 1 else None
+        if pool is not None:
+            for _ in range(self.max_workers):
+                pool.submit(_run_chunk, self.task, [])
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        with self.lock:
+            if self._pool is None and not self._pool_failed:
+                try:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers, mp_context=_pool_context(),
+                        initializer=load_models, initargs=(self.models,)
+                    )
+                    atexit.register(self.shutdown)
+                except (OSError, NotImplementedError, ValueError) as e:
+                    logger.warning(f"NLP process pool unavailable, analysing in-process: {e}")
+                    self._pool_failed = True
+            return self._pool
+
+    def map(self, texts: Sequence[str], task: Optional[Callable[[str], Any]] = None) -> List[Any]:
+        """Results of the task (or `task`, if its models are loaded here) for each text, in input order"""
+        task = task or self.task
+        missing = set(TASK_MODELS.get(task, ())) - set(self.models)
+        if missing:
+            raise ValueError(f"{task.__name__} needs {', '.join(sorted(missing))}, which this pool does not load")
+        texts = list(texts)
+        with span('nlp', task=task.__name__, texts=len(texts)) as nlp:
+            pool = self._get_pool() if self.uses_pool(len(texts), task) else None
+            nlp.set_attribute('mode', 'pool' if pool else 'in-process')
+            if pool is None:
+                return self._map_in_process(task, texts)
+            return self._map_in_pool(pool, task, texts)
+
+    def _map_in_pool(self, pool: ProcessPoolExecutor, task: Callable[[str], Any], texts: List[str]) -> List[Any]:
+        size = self.chunk_size(len(texts))
+        chunks = [texts[start:start + size] for start in range(0, len(texts), size)]
+        try:
+            results = []
+            for chunk_results in pool.map(_run_chunk, [task] * len(chunks), chunks):
+                results.extend(chunk_results)
+            return results
+        except Exception as e:
+            # A broken pool (e.g. a worker killed by the OOM killer) should not lose the batch
+            logger.error(f"NLP process pool failed, analysing in-process: {e}")
+            self.shutdown()
+            self._pool_failed = True
+            return self._map_in_process(task, texts)
+
+    def _map_in_process(self, task: Callable[[str], Any], texts: List[str]) -> List[Any]:
+        load_models(self.models)
+        return _run_chunk(task, texts)
+
+    def shutdown(self):
+        with self.lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+_shared: Dict[Tuple[Callable[[str], Any], Tuple[str, ...]], NlpExecutor] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_executor(task: Callable[[str], Any], models: Optional[Sequence[str]] = None) -> NlpExecutor:
+    """One executor per task per process, so analyzers share a pool"""
+    key = (task, tuple(models if models is not None else TASK_MODELS.get(task, ())))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = NlpExecutor(task, key[1])
+        return _shared[key]
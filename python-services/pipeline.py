@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Staged producer/consumer pipeline with bounded queues
+Items flow through a chain of stages (e.g. fetch -> parse -> dedupe ->
+classify -> persist), each run by its own pool of worker threads and fed by
+a bounded queue. A full queue blocks the stage in front of it, so a burst of
+input never holds more than the queue sizes in memory, and slow network
+fetches overlap with CPU-bound parsing and classification. Each stage
+reports throughput, busy/blocked time and queue depth, per run from
+metrics() and cumulatively through metrics.py. With tracing on, every
+stage call is a span under the caller's span, linked to the span of the
+stage call that produced its input.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import tracing
+from metrics import PIPELINE_BLOCKED_SECONDS, PIPELINE_BUSY_SECONDS, PIPELINE_ERRORS, PIPELINE_ITEMS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 64
+
+# Marks the end of a stage's input; each worker consumes one
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step run by `workers` threads.
+
+    `fn` receives one item, or with `batch_size` a list of up to that many
+    queued items, and returns an iterable of outputs for the next stage
+    (None means no output). An exception drops the item (or batch) and is
+    counted in the stage's errors.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Optional[Iterable[Any]]],
+                 workers: int = 1, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: Optional[int] = None):
+        if workers < 1:
+            raise ValueError(f"stage {name} needs at least one worker")
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.inbox: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self.running = self.workers
+        self.received = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.max_queue_depth = 0
+        self.depth_total = 0
+        self.depth_samples = 0
+
+    def _take(self) -> tuple:
+        """Block for the next (item, origin span), then drain up to a batch; returns (entries, input finished)"""
+        depth = self.inbox.qsize()
+        first = self.inbox.get()
+        with self.lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self.depth_total += depth
+            self.depth_samples += 1
+        if first is _DONE:
+            return [], True
+        items = [first]
+        while self.batch_size and len(items) < self.batch_size:
+            try:
+                item = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def metrics(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items_in': self.received,
+            'items_out': self.emitted,
+            'errors': self.errors,
+            'busy_seconds': round(self.busy_seconds, 4),
+            'blocked_seconds': round(self.blocked_seconds, 4),
+            'items_per_second': round(self.received / elapsed, 2) if elapsed > 0 else 0.0,
+            'queue_size': self.queue_size,
+            'max_queue_depth': self.max_queue_depth,
+            'avg_queue_depth': round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0.0
+        }
+
+
+class Pipeline:
+    """Runs items through a chain of stages connected by bounded queues"""
+
+    def __init__(self, stages: List[Stage], name: str = 'pipeline'):
+        if not stages:
+            raise ValueError("a pipeline needs at least one stage")
+        self.stages = stages
+        self.name = name
+        self.elapsed = 0.0
+        self._outputs: List[Any] = []
+        self._outputs_lock = threading.Lock()
+        self._parent: tracing.Span = tracing.NOOP_SPAN
+
+    def _emit(self, index: int, outputs: Iterable[Any], origin: tracing.Span):
+        stage = self.stages[index]
+        if index + 1 == len(self.stages):
+            outputs = list(outputs)
+            with self._outputs_lock:
+                self._outputs.extend(outputs)
+            with stage.lock:
+                stage.emitted += len(outputs)
+            return
+        downstream = self.stages[index + 1].inbox
+        for output in outputs:
+            started = time.perf_counter()
+            downstream.put((output, origin))  # Blocks while the next stage is behind
+            blocked = time.perf_counter() - started
+            with stage.lock:
+                stage.emitted += 1
+                stage.blocked_seconds += blocked
+            PIPELINE_BLOCKED_SECONDS.inc(blocked, pipeline=self.name, stage=stage.name)
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        finished = False
+        while not finished:
+            entries, finished = stage._take()
+            if not entries:
+                continue
+            if stage.batch_size:
+                units = [([item for item, _ in entries], [origin for _, origin in entries])]
+            else:
+                units = [(item, [origin]) for item, origin in entries]
+            for unit, origins in units:
+                started = time.perf_counter()
+                received = len(unit) if stage.batch_size else 1
+                with tracing.span(stage.name, parent=self._parent, links=origins,
+                                  pipeline=self.name, items=received) as stage_span:
+                    try:
+                        outputs = stage.fn(unit)
+                        outputs = list(outputs) if outputs is not None else []
+                    except Exception as e:
+                        logger.error(f"{self.name} stage {stage.name} failed: {e}")
+                        outputs = []
+                        stage_span.status, stage_span.error = 'error', f"{type(e).__name__}: {e}"
+                        with stage.lock:
+                            stage.errors += 1
+                        PIPELINE_ERRORS.inc(pipeline=self.name, stage=stage.name)
+                    stage_span.set_attribute('outputs', len(outputs))
+                busy = time.perf_counter() - started
+                with stage.lock:
+                    stage.received += received
+                    stage.busy_seconds += busy
+                PIPELINE_ITEMS.inc(received, pipeline=self.name, stage=stage.name)
+                PIPELINE_BUSY_SECONDS.inc(busy, pipeline=self.name, stage=stage.name)
+                self._emit(index, outputs, stage_span)
+
+        # The last worker out tells every worker of the next stage to finish
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if last and index + 1 < len(self.stages):
+            following = self.stages[index + 1]
+            for _ in range(following.workers):
+                following.inbox.put(_DONE)
+
+    def run(self, items: Iterable[Any]) -> List[Any]:
+        """Feed `items` (consumed lazily) through every stage; returns the last stage's outputs"""
+        for stage in self.stages:
+            stage.reset()
+        self._outputs = []
+        # Worker threads do not inherit the caller's context; stage spans hang off this span
+        self._parent = tracing.current_span()
+        started = time.perf_counter()
+
+        threads = [
+            threading.Thread(target=self._work, args=(index,),
+                             name=f"{self.name}-{stage.name}-{worker}", daemon=True)
+            for index, stage in enumerate(self.stages)
+            for worker in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        first = self.stages[0]
+        try:
+            for item in items:
+                first.inbox.put((item, None))
+        finally:
+            for _ in range(first.workers):
+                first.inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+            self.elapsed = time.perf_counter() - started
+        return self._outputs
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-stage counters from the last run"""
+        return {
+            'elapsed_seconds': round(self.elapsed, 4),
+            'stages': [stage.metrics(self.elapsed) for stage in self.stages]
+        }
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Adaptive polling scheduler for scrape sources
+Each source unit (a CAP region feed, a subreddit, an RSS feed) is polled on
+its own interval. The interval shrinks when the unit recently produced
+relevant or high-urgency posts and grows while it is quiet, unchanged or
+failing. A global token bucket caps outbound requests across all units.
+Per-unit state is persisted in the `source_schedule` table so intervals
+survive restarts.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from post_store import resolve_db_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_INTERVAL = 60.0
+DEFAULT_BASE_INTERVAL = 300.0
+DEFAULT_MAX_INTERVAL = 3600.0
+# Outbound requests per minute across every source unit
+DEFAULT_BUDGET_PER_MINUTE = 30
+
+# Interval multipliers applied after each poll
+HIGH_URGENCY_FACTOR = 0.25
+RELEVANT_FACTOR = 0.5
+QUIET_FACTOR = 1.5
+ERROR_FACTOR = 2.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available"""
+        with self.lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+
+def _field(post: Any, name: str) -> Any:
+    return post.get(name) if isinstance(post, dict) else getattr(post, name, None)
+
+
+def _yield_hash(posts: List[Any]) -> str:
+    ids = sorted(str(_field(post, 'id')) for post in posts)
+    return hashlib.sha1('\n'.join(ids).encode('utf-8')).hexdigest()
+
+
+class AdaptivePollScheduler:
+    """Decides which source units are due and adapts their intervals to their yield"""
+
+    def __init__(self, db_path: Optional[str] = None,
+                 min_interval: float = DEFAULT_MIN_INTERVAL,
+                 base_interval: float = DEFAULT_BASE_INTERVAL,
+                 max_interval: float = DEFAULT_MAX_INTERVAL,
+                 budget_per_minute: Optional[float] = None):
+        self.db_path = resolve_db_path(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.min_interval = min_interval
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        if budget_per_minute is None:
+            budget_per_minute = float(os.environ.get('CORSAIR_POLL_BUDGET', DEFAULT_BUDGET_PER_MINUTE))
+        self.budget = TokenBucket(budget_per_minute / 60.0, capacity=max(1.0, budget_per_minute / 4))
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS source_schedule (
+                unit_id TEXT PRIMARY KEY,
+                interval_seconds REAL,
+                next_poll_at REAL,
+                last_polled_at REAL,
+                polls INTEGER DEFAULT 0,
+                posts_total INTEGER DEFAULT 0,
+                high_urgency_total INTEGER DEFAULT 0,
+                last_yield INTEGER DEFAULT 0,
+                quiet_streak INTEGER DEFAULT 0,
+                errors INTEGER DEFAULT 0,
+                last_error TEXT,
+                last_yield_hash TEXT
+            )
+        ''')
+        self.conn.commit()
+
+    def register(self, unit_ids: List[str]):
+        """Add unknown units, due immediately"""
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO source_schedule (unit_id, interval_seconds, next_poll_at) VALUES (?, ?, ?)',
+                [(unit_id, self.base_interval, now) for unit_id in unit_ids]
+            )
+            self.conn.commit()
+
+    def due(self, unit_ids: List[str], now: Optional[float] = None) -> List[str]:
+        """Units whose next poll time has passed, most overdue first"""
+        now = now or time.time()
+        wanted = set(unit_ids)
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT unit_id FROM source_schedule WHERE next_poll_at <= ? ORDER BY next_poll_at', (now,)
+            ).fetchall()
+        return [unit_id for (unit_id,) in rows if unit_id in wanted]
+
+    def next_due_in(self, unit_ids: List[str]) -> float:
+        """Seconds until the next unit is due (0 when one already is)"""
+        if not unit_ids:
+            return self.max_interval
+        placeholders = ', '.join('?' for _ in unit_ids)
+        with self.lock:
+            (next_at,) = self.conn.execute(
+                f'SELECT MIN(next_poll_at) FROM source_schedule WHERE unit_id IN ({placeholders})', unit_ids
+            ).fetchone()
+        return max(0.0, (next_at or time.time()) - time.time())
+
+    def record(self, unit_id: str, posts: List[Any], error: Optional[str] = None) -> float:
+        """Update a unit's stats after a poll and return its new interval"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT interval_seconds, quiet_streak, last_yield_hash FROM source_schedule WHERE unit_id = ?',
+                (unit_id,)
+            ).fetchone()
+            interval, quiet_streak, last_hash = row if row else (self.base_interval, 0, None)
+
+            high = sum(1 for post in posts if _field(post, 'urgency') == 'high')
+            digest = _yield_hash(posts) if posts else None
+            if error:
+                interval *= ERROR_FACTOR
+            elif high and digest != last_hash:
+                interval *= HIGH_URGENCY_FACTOR
+            elif posts and digest != last_hash:
+                interval *= RELEVANT_FACTOR
+            else:
+                interval *= QUIET_FACTOR
+            interval = min(self.max_interval, max(self.min_interval, interval))
+            quiet_streak = 0 if (posts and digest != last_hash) else quiet_streak + 1
+
+            # Jitter keeps units that share an interval from polling in lockstep
+            next_poll_at = now + interval * random.uniform(0.9, 1.1)
+            self.conn.execute('''
+                INSERT INTO source_schedule (unit_id, interval_seconds, next_poll_at, last_polled_at, polls,
+                    posts_total, high_urgency_total, last_yield, quiet_streak, errors, last_error, last_yield_hash)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (unit_id) DO UPDATE SET
+                    interval_seconds = excluded.interval_seconds,
+                    next_poll_at = excluded.next_poll_at,
+                    last_polled_at = excluded.last_polled_at,
+                    polls = polls + 1,
+                    posts_total = posts_total + excluded.posts_total,
+                    high_urgency_total = high_urgency_total + excluded.high_urgency_total,
+                    last_yield = excluded.last_yield,
+                    quiet_streak = excluded.quiet_streak,
+                    errors = errors + excluded.errors,
+                    last_error = COALESCE(excluded.last_error, last_error),
+                    last_yield_hash = COALESCE(excluded.last_yield_hash, last_yield_hash)
+            ''', (unit_id, interval, next_poll_at, now, len(posts), high, len(posts), quiet_streak,
+                  1 if error else 0, error, digest))
+            self.conn.commit()
+        return interval
+
+    def run_due(self, units: Dict[str, Callable[[], List[Any]]],
+                on_posts: Optional[Callable[[List[Any]], Optional[List[Any]]]] = None) -> List[Any]:
+        """Poll due units while the request budget allows; returns all posts found.
+
+        Units left over when the budget runs out stay due and go first next time.
+        `on_posts` gets each unit's posts as soon as that unit is polled (to store
+        and publish them without waiting for the rest of the round); what it
+        returns replaces them in the result.
+        """
+        self.register(list(units))
+        posts = []
+        for unit_id in self.due(list(units)):
+            if not self.budget.try_acquire():
+                logger.info("Poll budget exhausted, deferring remaining due sources")
+                break
+            try:
+                unit_posts = units[unit_id]() or []
+                self.record(unit_id, unit_posts)
+            except Exception as e:
+                logger.error(f"Polling {unit_id} failed: {e}")
+                self.record(unit_id, [], error=str(e))
+                continue
+            if on_posts and unit_posts:
+                try:
+                    unit_posts = on_posts(unit_posts)
+                except Exception as e:
+                    logger.error(f"Handling posts from {unit_id} failed: {e}")
+                    continue
+            posts.extend(unit_posts or [])
+        return posts
+
+    def seconds_until_work(self, unit_ids: List[str]) -> float:
+        """How long a polling loop can sleep: until a unit is due and a token is free"""
+        return max(self.next_due_in(unit_ids), self.budget.wait_time())
+
+    def run_forever(self, poll: Callable[[], Any], unit_ids: Callable[[], List[str]],
+                    stop: Optional[threading.Event] = None, max_sleep: float = 30.0):
+        """Call `poll` whenever units are due, until `stop` is set"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                poll()
+            except Exception as e:
+                logger.error(f"Scheduled poll failed: {e}")
+            stop.wait(min(max_sleep, max(1.0, self.seconds_until_work(unit_ids()))))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Persisted per-unit stats, soonest due first"""
+        with self.lock:
+            cursor = self.conn.execute('SELECT * FROM source_schedule ORDER BY next_poll_at')
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
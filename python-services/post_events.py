@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+In-process publish/subscribe for newly stored posts
+The scraper publishes every newly inserted post from its database write
+path; subscribers (the daemon's /events Server-Sent Events stream) receive
+the posts matching their urgency/hazard_type/source filters. Each subscriber
+has a bounded buffer: when a slow client falls behind, the oldest buffered
+non-high-urgency post is dropped first, so urgent alerts are the last to go.
+"""
+
+import itertools
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+FILTER_FIELDS = ('urgency', 'hazard_type', 'source')
+DEFAULT_BUFFER_SIZE = 256
+
+
+def parse_filters(params: Dict[str, str]) -> Dict[str, Set[str]]:
+    """{'urgency': 'high,medium'} -> {'urgency': {'high', 'medium'}}"""
+    return {
+        name: {value.strip() for value in params[name].split(',') if value.strip()}
+        for name in FILTER_FIELDS if params.get(name)
+    }
+
+
+class Subscription:
+    """One subscriber's filtered, bounded event buffer"""
+
+    def __init__(self, bus: 'PostEventBus', filters: Dict[str, Set[str]], max_buffer: int):
+        self.bus = bus
+        self.filters = filters
+        self.max_buffer = max_buffer
+        self.buffer: deque = deque()
+        self.dropped = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def matches(self, post: Dict[str, Any]) -> bool:
+        return all(post.get(name) in values for name, values in self.filters.items())
+
+    def offer(self, event: Tuple[int, Dict[str, Any]]):
+        with self.condition:
+            if len(self.buffer) >= self.max_buffer:
+                self._drop_one()
+            self.buffer.append(event)
+            self.condition.notify()
+
+    def _drop_one(self):
+        for index, (_, post) in enumerate(self.buffer):
+            if post.get('urgency') != 'high':
+                del self.buffer[index]
+                break
+        else:
+            self.buffer.popleft()
+        self.dropped += 1
+
+    def take(self, timeout: float) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+        """Wait up to `timeout` for events; returns (events, posts dropped since the last take)"""
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(timeout)
+            events = list(self.buffer)
+            self.buffer.clear()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class PostEventBus:
+    """Fans newly stored posts out to subscribers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions: List[Subscription] = []
+        self._ids = itertools.count(1)
+
+    def has_subscribers(self) -> bool:
+        return bool(self.subscriptions)
+
+    def subscribe(self, filters: Optional[Dict[str, Set[str]]] = None,
+                  max_buffer: int = DEFAULT_BUFFER_SIZE) -> Subscription:
+        subscription = Subscription(self, filters or {}, max_buffer)
+        with self.lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def publish(self, posts: Iterable[Dict[str, Any]]) -> int:
+        """Deliver posts to matching subscribers; returns the number published"""
+        subscriptions = self.subscriptions
+        published = 0
+        for post in posts:
+            event = (next(self._ids), post)
+            for subscription in subscriptions:
+                if subscription.matches(post):
+                    subscription.offer(event)
+            published += 1
+        return published
+
+    def close(self):
+        for subscription in list(self.subscriptions):
+            subscription.close()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Canonical post model shared by the services
+One compact post type for scraped posts, tweets, Reddit posts, news items
+and government alerts. Instances use __slots__ (no per-object __dict__),
+categorical fields such as source, urgency and hazard_type are interned so
+100k posts share one copy of each value, and the nested dict served by the
+APIs is only built when asked for (build_api) and never kept on the post.
+Item access (post['urgency']) reads the matching attribute directly.
+"""
+
+import sys
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Enum-like fields with a small set of values, stored interned
+CATEGORICAL_FIELDS = frozenset({
+    'source', 'sentiment', 'urgency', 'hazard_type', 'location', 'location_type', 'country',
+    'location_state'
+})
+
+# Columns persisted by post_store.PostStore, in constructor order
+RECORD_FIELDS = (
+    'id', 'text', 'created_at', 'author', 'location', 'source', 'url',
+    'sentiment', 'urgency', 'hazard_type', 'engagement', 'duplicate_count'
+)
+
+_set = object.__setattr__
+
+# Default for author_location: use the post's location
+_FROM_POST = object()
+
+
+def intern_category(value: Any) -> Any:
+    """Interned copy of a categorical string value (other values unchanged)"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class Post:
+    """A classified post from any source.
+
+    `author`, `location` and `source` fill the API view's nested author and
+    location objects unless `author_name`, `author_location` or
+    `location_type` say otherwise (an explicit author_location of None
+    stays None); `country`, `location_state` and
+    `coordinates` ({'lat', 'lng'}) are added to the location when known. `engagement` is served as `metrics`;
+    `extra` holds source-specific top-level fields (e.g. matched_keywords).
+    Item access (post['id'], post.get('metrics')) reads one key of the API
+    view without building the rest.
+    """
+
+    __slots__ = (
+        'id', 'text', 'created_at', 'author', 'location', 'source', 'url',
+        'sentiment', 'urgency', 'hazard_type', 'engagement', 'duplicate_count',
+        'polarity', 'author_name', 'author_location', 'location_type', 'country',
+        'location_state', 'coordinates', 'processed_at', 'extra'
+    )
+
+    def __init__(self, id: str, text: str, created_at: Any, author: str, location: str,
+                 source: str, url: str = '', sentiment: str = 'Neutral', urgency: str = 'low',
+                 hazard_type: str = 'general', engagement: Optional[Dict[str, int]] = None,
+                 duplicate_count: int = 1, polarity: Optional[float] = None,
+                 author_name: Optional[str] = None, author_location: Any = _FROM_POST,
+                 location_type: Optional[str] = None, country: Optional[str] = None,
+                 location_state: Optional[str] = None, coordinates: Optional[Dict[str, float]] = None,
+                 processed_at: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+        _set(self, 'id', id)
+        _set(self, 'text', text)
+        _set(self, 'created_at', created_at)
+        _set(self, 'author', author)
+        _set(self, 'location', intern_category(location))
+        _set(self, 'source', intern_category(source))
+        _set(self, 'url', url)
+        _set(self, 'sentiment', intern_category(sentiment))
+        _set(self, 'urgency', intern_category(urgency))
+        _set(self, 'hazard_type', intern_category(hazard_type))
+        _set(self, 'engagement', engagement)
+        _set(self, 'duplicate_count', duplicate_count)
+        _set(self, 'polarity', polarity)
+        _set(self, 'author_name', author_name)
+        _set(self, 'author_location', location if author_location is _FROM_POST else author_location)
+        _set(self, 'location_type', intern_category(location_type))
+        _set(self, 'country', intern_category(country))
+        _set(self, 'location_state', intern_category(location_state))
+        _set(self, 'coordinates', coordinates)
+        _set(self, 'processed_at', processed_at)
+        _set(self, 'extra', extra)
+
+    def __setattr__(self, name: str, value: Any):
+        if name in CATEGORICAL_FIELDS:
+            value = intern_category(value)
+        _set(self, name, value)
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'Post':
+        """Build a post from a stored row (engagement already decoded)"""
+        return cls(**{name: record[name] for name in RECORD_FIELDS if name in record})
+
+    def to_record(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in RECORD_FIELDS}
+
+    def build_api(self) -> Dict[str, Any]:
+        """The nested dict the APIs and Firestore documents use, built fresh on every call
+
+        Not cached: posts are kept in memory in bulk, and a cached dict per
+        post costs more than the post itself.
+        """
+        api = {key: getter(self) for key, getter in _API_FIELDS.items()}
+        if self.extra:
+            api.update(self.extra)
+        return api
+
+    def _author_api(self) -> Dict[str, Any]:
+        return {
+            'username': self.author,
+            'name': self.author_name or self.author,
+            'location': self.author_location
+        }
+
+    def _location_api(self) -> Dict[str, Any]:
+        location = {'type': self.location_type or self.source, 'name': self.location}
+        if self.country is not None:
+            location['country'] = self.country
+        if self.location_state is not None:
+            location['state'] = self.location_state
+        if self.coordinates is not None:
+            location['coordinates'] = self.coordinates
+        return location
+
+    def __getitem__(self, key: str) -> Any:
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return _API_FIELDS[key](self)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        getter = _API_FIELDS.get(key)
+        return default if getter is None else getter(self)
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name)
+                   for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"Post(id={self.id!r}, source={self.source!r}, urgency={self.urgency!r}, "
+                f"hazard_type={self.hazard_type!r}, text={self.text[:40]!r})")
+
+
+# Top-level keys of the API view, in order, and how each is read from a post
+_API_FIELDS = {
+    'id': lambda post: post.id,
+    'text': lambda post: post.text,
+    'created_at': lambda post: post.created_at,
+    'author': Post._author_api,
+    'location': Post._location_api,
+    'sentiment': lambda post: post.sentiment,
+    'polarity': lambda post: post.polarity,
+    'urgency': lambda post: post.urgency,
+    'hazard_type': lambda post: post.hazard_type,
+    'metrics': lambda post: post.engagement or {},
+    'processed_at': lambda post: post.processed_at or datetime.now().isoformat(),
+    'source': lambda post: post.source,
+    'url': lambda post: post.url,
+    'duplicate_count': lambda post: post.duplicate_count,
+}
+
+
+def slotted(cls: type) -> type:
+    """Rebuild a dataclass with __slots__ (dataclass(slots=True) before Python 3.10)"""
+    names = tuple(f.name for f in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
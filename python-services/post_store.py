@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Time-partitioned SQLite store for scraped posts
+Posts are written to one table per ingest month (posts_YYYY_MM) behind a
+`posts` view, so hot queries only touch recent partitions and old months
+can be archived to compressed NDJSON and dropped without rewriting the
+live tables. The database path is resolved independently of the working
+directory.
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(SERVICE_DIR, 'data', 'scraped_posts.db')
+# Copy created when the scraper was run from the repository root
+LEGACY_DB_PATHS = [os.path.join(SERVICE_DIR, '..', 'data', 'scraped_posts.db')]
+DEFAULT_RETAIN_MONTHS = 6
+
+POST_COLUMNS = [
+    'id', 'text', 'created_at', 'author', 'location', 'source', 'url',
+    'sentiment', 'urgency', 'hazard_type', 'engagement_data', 'scraped_at',
+    'duplicate_count'
+]
+
+_PARTITION_RE = re.compile(r'^posts_(\d{4})_(\d{2})$')
+
+
+def resolve_db_path(db_path: Optional[str] = None) -> str:
+    """Canonical database path: explicit argument, then CORSAIR_DB_PATH, then python-services/data"""
+    return os.path.abspath(db_path or os.environ.get('CORSAIR_DB_PATH') or DEFAULT_DB_PATH)
+
+
+def partition_name(timestamp: str) -> str:
+    """Partition table holding posts ingested at an ISO timestamp"""
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        moment = datetime.now()
+    return f"posts_{moment.year:04d}_{moment.month:02d}"
+
+
+class PostStore:
+    """Monthly-partitioned posts table with retention and archiving"""
+
+    def __init__(self, db_path: Optional[str] = None, import_legacy: bool = True):
+        self.db_path = resolve_db_path(db_path)
+        # Scratch stores (benchmarks) must not pull in the legacy root-level copy
+        self.import_legacy = import_legacy
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.archive_dir = os.path.join(os.path.dirname(self.db_path), 'archive')
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._partitions = None
+        self.init_schema()
+
+    def init_schema(self):
+        """Create bookkeeping tables and migrate a legacy single posts table"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS post_partitions_index (
+                    id TEXT PRIMARY KEY,
+                    partition TEXT
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS store_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+
+            legacy = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts'"
+            ).fetchone()
+            if legacy:
+                self._migrate_table('main.posts')
+                cursor.execute('DROP TABLE posts')
+                self._rebuild_view()
+
+            self.ensure_partition(partition_name(datetime.now().isoformat()))
+            self.conn.commit()
+
+        if self.import_legacy:
+            for legacy_path in LEGACY_DB_PATHS:
+                self.import_legacy_database(legacy_path)
+
+    def _create_partition_sql(self, name: str) -> str:
+        return f'''
+            CREATE TABLE IF NOT EXISTS {name} (
+                id TEXT PRIMARY KEY,
+                text TEXT,
+                created_at TEXT,
+                author TEXT,
+                location TEXT,
+                source TEXT,
+                url TEXT,
+                sentiment TEXT,
+                urgency TEXT,
+                hazard_type TEXT,
+                engagement_data TEXT,
+                scraped_at TEXT,
+                duplicate_count INTEGER DEFAULT 1
+            )
+        '''
+
+    def partitions(self) -> List[str]:
+        """Partition tables, oldest first"""
+        if self._partitions is None:
+            rows = self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+            self._partitions = sorted(name for (name,) in rows if _PARTITION_RE.match(name))
+        return self._partitions
+
+    def ensure_partition(self, name: str):
+        if name in self.partitions():
+            return
+        self.conn.execute(self._create_partition_sql(name))
+        self._partitions = None
+        self._rebuild_view()
+
+    def _rebuild_view(self):
+        """Recreate the `posts` view over all partitions, newest first"""
+        legacy_table = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts'"
+        ).fetchone()
+        if legacy_table or not self.partitions():
+            # Still migrating the unpartitioned table; the view is built once it is gone
+            return
+        columns = ', '.join(POST_COLUMNS)
+        selects = ' UNION ALL '.join(f'SELECT {columns} FROM {name}' for name in reversed(self.partitions()))
+        self.conn.execute('DROP VIEW IF EXISTS posts')
+        self.conn.execute(f'CREATE VIEW posts AS {selects}')
+
+    def _migrate_table(self, table: str):
+        """Copy rows of an unpartitioned posts table into monthly partitions"""
+        source_columns = [row[1] for row in self.conn.execute(f'PRAGMA {table.split(".")[0]}.table_info(posts)')]
+        selected = ', '.join(c if c in source_columns else 'NULL' for c in POST_COLUMNS)
+        rows = self.conn.execute(f'SELECT {selected} FROM {table}').fetchall()
+        self._write_rows([dict(zip(POST_COLUMNS, row)) for row in rows], replace=False)
+        logger.info(f"Migrated {len(rows)} posts from {table} into monthly partitions")
+
+    def import_legacy_database(self, legacy_path: str):
+        """One-off import of posts from a diverged copy of the database"""
+        legacy_path = os.path.abspath(legacy_path)
+        if legacy_path == self.db_path or not os.path.exists(legacy_path):
+            return
+        key = f"imported:{legacy_path}"
+        with self.lock:
+            if self.conn.execute('SELECT 1 FROM store_meta WHERE key = ?', (key,)).fetchone():
+                return
+            self.conn.execute('ATTACH DATABASE ? AS legacy', (legacy_path,))
+            try:
+                has_posts = self.conn.execute(
+                    "SELECT 1 FROM legacy.sqlite_master WHERE type = 'table' AND name = 'posts'"
+                ).fetchone()
+                if has_posts:
+                    self._migrate_table('legacy.posts')
+                self.conn.execute(
+                    'INSERT INTO store_meta (key, value) VALUES (?, ?)', (key, datetime.now().isoformat())
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                logger.error(f"Error importing legacy database {legacy_path}: {e}")
+            finally:
+                self.conn.execute('DETACH DATABASE legacy')
+
+    def _write_rows(self, rows: List[Dict[str, Any]], replace: bool = True) -> List[str]:
+        """Write rows into the partition that first saw each id; returns newly inserted ids"""
+        cursor = self.conn.cursor()
+        placeholders = ', '.join('?' for _ in POST_COLUMNS)
+        columns = ', '.join(POST_COLUMNS)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        inserted = []
+
+        for row in rows:
+            existing = cursor.execute(
+                'SELECT partition FROM post_partitions_index WHERE id = ?', (row['id'],)
+            ).fetchone()
+            if existing and existing[0] in self.partitions():
+                partition = existing[0]
+            else:
+                partition = partition_name(row.get('scraped_at'))
+                self.ensure_partition(partition)
+                cursor.execute(
+                    'INSERT OR REPLACE INTO post_partitions_index (id, partition) VALUES (?, ?)',
+                    (row['id'], partition)
+                )
+                inserted.append(row['id'])
+
+            cursor.execute(
+                f'{verb} INTO {partition} ({columns}) VALUES ({placeholders})',
+                tuple(row.get(column) for column in POST_COLUMNS)
+            )
+        return inserted
+
+    def save_posts(self, rows: Iterable[Dict[str, Any]]) -> List[str]:
+        """Insert or update posts; returns the ids that were not stored before"""
+        with self.lock:
+            inserted = self._write_rows(list(rows))
+            self.conn.commit()
+        return inserted
+
+    def recent_posts(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently scraped posts, reading partitions newest first until `limit` is reached"""
+        columns = ', '.join(POST_COLUMNS)
+        posts: List[Dict[str, Any]] = []
+        with self.lock:
+            for name in reversed(self.partitions()):
+                rows = self.conn.execute(
+                    f'SELECT {columns} FROM {name} ORDER BY scraped_at DESC LIMIT ?', (limit - len(posts),)
+                ).fetchall()
+                for row in rows:
+                    post = dict(zip(POST_COLUMNS, row))
+                    post['engagement'] = json.loads(post.pop('engagement_data') or '{}')
+                    posts.append(post)
+                if len(posts) >= limit:
+                    break
+        return posts
+
+    def iter_posts(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield every stored post as a dict, with engagement_data decoded to `engagement`"""
+        with self.lock:
+            cursor = self.conn.execute(f"SELECT {', '.join(POST_COLUMNS)} FROM posts")
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    post = dict(zip(POST_COLUMNS, row))
+                    post['engagement'] = json.loads(post.pop('engagement_data') or '{}')
+                    yield post
+
+    def apply_retention(self, retain_months: Optional[int] = None, archive: bool = True) -> List[str]:
+        """Archive and drop partitions older than the retention window.
+
+        Each expired partition is written to archive/posts_YYYY_MM.ndjson.gz
+        before its table is dropped. Returns the dropped partition names.
+        """
+        if retain_months is None:
+            retain_months = int(os.environ.get('CORSAIR_RETAIN_MONTHS', DEFAULT_RETAIN_MONTHS))
+        now = datetime.now()
+        cutoff = (now.year * 12 + now.month - 1) - (retain_months - 1)
+
+        dropped = []
+        with self.lock:
+            for name in self.partitions():
+                year, month = (int(part) for part in _PARTITION_RE.match(name).groups())
+                if year * 12 + month - 1 >= cutoff:
+                    continue
+                if archive:
+                    self.archive_partition(name)
+                self.conn.execute(f'DROP TABLE {name}')
+                self.conn.execute('DELETE FROM post_partitions_index WHERE partition = ?', (name,))
+                dropped.append(name)
+
+            if dropped:
+                self._partitions = None
+                self._prune_fingerprints(cutoff)
+                self._rebuild_view()
+                self.conn.commit()
+                logger.info(f"Retention dropped partitions: {', '.join(dropped)}")
+        return dropped
+
+    def _prune_fingerprints(self, cutoff_month_index: int):
+        """Forget near-duplicate signatures of posts that no longer exist"""
+        has_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'post_fingerprints'"
+        ).fetchone()
+        if not has_index:
+            return
+        cutoff = f"{cutoff_month_index // 12:04d}-{cutoff_month_index % 12 + 1:02d}-01"
+        self.conn.execute(
+            'DELETE FROM post_fingerprint_bands WHERE post_id IN '
+            '(SELECT post_id FROM post_fingerprints WHERE first_seen < ?)', (cutoff,)
+        )
+        self.conn.execute('DELETE FROM post_fingerprints WHERE first_seen < ?', (cutoff,))
+
+    def archive_partition(self, name: str) -> str:
+        """Write a partition to gzip-compressed NDJSON; returns the archive path"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{name}.ndjson.gz")
+        columns = ', '.join(POST_COLUMNS)
+        # Append mode so re-archiving a partition never loses an earlier archive
+        with gzip.open(path, 'at', encoding='utf-8') as f:
+            for row in self.conn.execute(f'SELECT {columns} FROM {name}'):
+                f.write(json.dumps(dict(zip(POST_COLUMNS, row)), ensure_ascii=False) + '\n')
+        return path
+
+    def vacuum(self):
+        """Reclaim space freed by dropped partitions"""
+        with self.lock:
+            self.conn.execute('VACUUM')
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    """CLI: apply the retention policy to the canonical store"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Apply retention to the scraped posts store")
+    parser.add_argument('--db', help="Database path (default: CORSAIR_DB_PATH or python-services/data)")
+    parser.add_argument('--retain-months', type=int, default=None)
+    parser.add_argument('--no-archive', action='store_true', help="Drop expired partitions without archiving")
+    parser.add_argument('--vacuum', action='store_true', help="VACUUM after dropping partitions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = PostStore(args.db)
+    dropped = store.apply_retention(args.retain_months, archive=not args.no_archive)
+    if args.vacuum:
+        store.vacuum()
+    print(json.dumps({'db_path': store.db_path, 'partitions': store.partitions(), 'dropped': dropped}))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,50 +9,95 @@ Scrapes live data from multiple public sources including:
 - Social media mentions
 """
 
-import requests
 import json
 import time
 import re
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple
 import logging
 from urllib.parse import urljoin, urlparse
+import functools
 import hashlib
 import random
 from dataclasses import dataclass
-import feedparser
 from bs4 import BeautifulSoup
-import sqlite3
 import os
+import subprocess
+import sys
+import threading
+
+from analytics import IncrementalAnalytics, StreamingAnalytics, TrendRollups
+import metrics
+from metrics import (CLASSIFY_SECONDS, DB_POSTS_WRITTEN, DB_WRITE_SECONDS, FETCH_BYTES, FETCH_ERRORS,
+                     FETCH_SECONDS, PARSE_SECONDS)
+import tracing
+from tracing import current_span, span
+import http_cassette
+from http_session import fetch_feed, make_session
+from ndjson_stream import streaming_stdout
+from near_duplicates import NearDuplicateIndex
+from pipeline import DEFAULT_QUEUE_SIZE, Pipeline, Stage
+from poll_scheduler import AdaptivePollScheduler
+from post_events import PostEventBus
+from post_model import Post
+from post_store import PostStore
+from scrape_cache import ScrapeCache
+from serialization import FORMATS, write_output
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Scraped posts use the shared compact post model
+ScrapedPost = Post
+
 @dataclass
-class ScrapedPost:
-    """Data structure for scraped social media posts"""
-    id: str
-    text: str
-    created_at: str
-    author: str
-    location: str
-    source: str
-    url: str
-    sentiment: str = "Neutral"
-    urgency: str = "low"
-    hazard_type: str = "general"
-    engagement: Dict[str, int] = None
+class Candidate:
+    """A parsed post waiting for classification"""
+    post: ScrapedPost
+    full_text: str  # Classified before truncation to post.text
+    urgency_source: str  # Source hint for calculate_urgency
+
+# Called with each source unit's posts; returns the posts to keep
+UnitHook = Callable[[List[ScrapedPost]], List[ScrapedPost]]
+
+def spawn_refresh_process():
+    """Start a detached `real_web_scraper.py --refresh-cache` that outlives this process"""
+    kwargs = {'stdin': subprocess.DEVNULL, 'stdout': subprocess.DEVNULL,
+              'stderr': subprocess.DEVNULL, 'close_fds': True}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), '--refresh-cache'], **kwargs)
 
 class RealWebScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, cache_mode: str = 'thread', db_path: Optional[str] = None,
+                 import_legacy: bool = True):
+        self.session = make_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         })
         
+        # Reddit asks for at most one request per second
+        self.reddit_gate = threading.Lock()
+        self.reddit_next_request = 0.0
+        
+        # Workers per stage of a full scrape (see build_pipeline)
+        self.fetch_workers = int(os.environ.get('CORSAIR_FETCH_WORKERS', 4))
+        self.classify_workers = int(os.environ.get('CORSAIR_CLASSIFY_WORKERS', 2))
+        self.queue_size = int(os.environ.get('CORSAIR_PIPELINE_QUEUE', DEFAULT_QUEUE_SIZE))
+        
         # Initialize database
-        self.init_database()
+        self.init_database(db_path, import_legacy)
+        
+        # Live scrapes run one at a time; cached callers share the latest result
+        self.scrape_lock = threading.Lock()
+        self.cache = ScrapeCache(
+            os.path.join(os.path.dirname(self.db_path), 'scrape_snapshot.json'),
+            refresh=self.scrape_all_sources,
+            mode=cache_mode,
+            spawn_refresh=spawn_refresh_process
+        )
         
         # Keywords for hazard detection - Focused on Indian coastal hazards
         self.hazard_keywords = {
@@ -83,6 +128,15 @@ class RealWebScraper:
             'https://feeds.bbci.co.uk/news/science_and_environment/rss.xml'
         ]
         
+        # NOAA CAP alert feeds for different regions
+        self.noaa_feeds = [
+            'https://alerts.weather.gov/cap/us.php?x=1',
+            'https://alerts.weather.gov/cap/wwaatmget.php?x=fla',  # Florida
+            'https://alerts.weather.gov/cap/wwaatmget.php?x=cal',  # California
+            'https://alerts.weather.gov/cap/wwaatmget.php?x=tx',   # Texas
+            'https://alerts.weather.gov/cap/wwaatmget.php?x=nc',   # North Carolina
+        ]
+        
         # Reddit communities to monitor - Focused on Indian coastal areas
         self.reddit_communities = [
             'india', 'IndiaNonPolitical', 'mumbai', 'chennai', 'kolkata', 'bangalore',
@@ -91,53 +145,51 @@ class RealWebScraper:
             'flooding', 'climate', 'IndiaTech'
         ]
         
-    def init_database(self):
-        """Initialize SQLite database for storing scraped data"""
-        os.makedirs('data', exist_ok=True)
-        self.db_path = 'data/scraped_posts.db'
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS posts (
-                id TEXT PRIMARY KEY,
-                text TEXT,
-                created_at TEXT,
-                author TEXT,
-                location TEXT,
-                source TEXT,
-                url TEXT,
-                sentiment TEXT,
-                urgency TEXT,
-                hazard_type TEXT,
-                engagement_data TEXT,
-                scraped_at TEXT
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-        
-    def save_to_database(self, posts: List[ScrapedPost]):
-        """Save scraped posts to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for post in posts:
-            engagement_json = json.dumps(post.engagement or {})
-            cursor.execute('''
-                INSERT OR REPLACE INTO posts 
-                (id, text, created_at, author, location, source, url, sentiment, urgency, hazard_type, engagement_data, scraped_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                post.id, post.text, post.created_at, post.author, post.location,
-                post.source, post.url, post.sentiment, post.urgency, post.hazard_type,
-                engagement_json, datetime.now().isoformat()
-            ))
-        
-        conn.commit()
-        conn.close()
+    def init_database(self, db_path: Optional[str] = None, import_legacy: bool = True):
+        """Initialize the partitioned SQLite store for scraped data"""
+        self.store = PostStore(db_path, import_legacy=import_legacy)
+        self.db_path = self.store.db_path
+        self.store.apply_retention()
+        
+        # Near-duplicate index lives alongside the posts partitions
+        self.dedupe_index = NearDuplicateIndex(self.db_path)
+        self.analytics = IncrementalAnalytics('scraped_posts', self.db_path)
+        self.rollups = TrendRollups(self.db_path)
+        if self.rollups.is_empty():
+            # One-off backfill from posts stored before rollups existed
+            self.rollups.add(self.store.iter_posts())
+        self.rollups.prune()
+        
+        # Newly inserted posts are published here as they are saved
+        self.events = PostEventBus()
+        
+        # Per-source polling intervals and stats for scheduled runs
+        self.scheduler = AdaptivePollScheduler(self.db_path)
+        
+    def save_to_database(self, posts: List[ScrapedPost]) -> List[str]:
+        """Save scraped posts to database; returns the ids of posts not stored before"""
+        scraped_at = datetime.now().isoformat()
+        with span('db_write', table='scraped_posts', posts=len(posts)) as write, \
+                DB_WRITE_SECONDS.time(table='scraped_posts'):
+            inserted = self.store.save_posts({
+                'id': post.id, 'text': post.text, 'created_at': post.created_at,
+                'author': post.author, 'location': post.location, 'source': post.source,
+                'url': post.url, 'sentiment': post.sentiment, 'urgency': post.urgency,
+                'hazard_type': post.hazard_type, 'engagement_data': json.dumps(post.engagement or {}),
+                'scraped_at': scraped_at, 'duplicate_count': post.duplicate_count
+            } for post in posts)
+            write.set_attribute('inserted', len(inserted))
+        DB_POSTS_WRITTEN.inc(len(inserted), table='scraped_posts')
+        
+        # Trend rollups count each post once, when it is first stored
+        new_ids = set(inserted)
+        new_posts = [post for post in posts if post.id in new_ids]
+        self.rollups.add(new_posts)
+        
+        # Push newly detected posts to live subscribers (the daemon's /events stream)
+        if new_posts and self.events.has_subscribers():
+            self.events.publish(self.format_posts_for_api(new_posts))
+        return inserted
         
     def detect_hazard_type(self, text: str) -> str:
         """Detect hazard type from text content"""
@@ -207,163 +259,225 @@ class RealWebScraper:
         else:
             return 'Neutral'
     
-    def scrape_noaa_alerts(self) -> List[ScrapedPost]:
+    def scrape_noaa_alerts(self, on_unit: Optional[UnitHook] = None) -> List[ScrapedPost]:
         """Scrape NOAA weather alerts"""
         posts = []
-        
-        try:
-            # NOAA RSS feeds for different regions
-            noaa_feeds = [
-                'https://alerts.weather.gov/cap/us.php?x=1',
-                'https://alerts.weather.gov/cap/wwaatmget.php?x=fla',  # Florida
-                'https://alerts.weather.gov/cap/wwaatmget.php?x=cal',  # California
-                'https://alerts.weather.gov/cap/wwaatmget.php?x=tx',   # Texas
-                'https://alerts.weather.gov/cap/wwaatmget.php?x=nc',   # North Carolina
-            ]
-            
-            for feed_url in noaa_feeds:
-                try:
-                    response = self.session.get(feed_url, timeout=10)
-                    if response.status_code == 200:
-                        # Parse the CAP XML format
-                        soup = BeautifulSoup(response.content, 'xml')
-                        entries = soup.find_all('entry')
-                        
-                        for entry in entries[:5]:  # Limit to 5 per feed
-                            title = entry.find('title')
-                            summary = entry.find('summary')
-                            updated = entry.find('updated')
-                            link = entry.find('link')
-                            
-                            if title and summary:
-                                text = f"{title.text}: {summary.text}"
-                                
-                                # Check if it's coastal-related
-                                if self.is_coastal_related(text):
-                                    post_id = hashlib.md5(text.encode()).hexdigest()[:12]
-                                    
-                                    posts.append(ScrapedPost(
-                                        id=f"noaa_{post_id}",
-                                        text=text[:500],  # Limit length
-                                        created_at=updated.text if updated else datetime.now().isoformat(),
-                                        author="NOAA National Weather Service",
-                                        location="United States",
-                                        source="noaa",
-                                        url=link.get('href') if link else feed_url,
-                                        sentiment=self.analyze_sentiment(text),
-                                        urgency=self.calculate_urgency(text, 'noaa'),
-                                        hazard_type=self.detect_hazard_type(text),
-                                        engagement={'shares': random.randint(10, 100), 'views': random.randint(100, 1000)}
-                                    ))
-                except Exception as e:
-                    logger.error(f"Error scraping NOAA feed {feed_url}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Error in NOAA scraping: {e}")
-            
+        for feed_url in self.noaa_feeds:
+            try:
+                unit_posts = self.poll_cap_feed(feed_url)
+                posts.extend(on_unit(unit_posts) if on_unit else unit_posts)
+            except Exception as e:
+                logger.error(f"Error scraping NOAA feed {feed_url}: {e}")
         return posts
     
-    def scrape_reddit_posts(self) -> List[ScrapedPost]:
+    def poll_cap_feed(self, feed_url: str) -> List[ScrapedPost]:
+        """Fetch coastal alerts from one NOAA CAP region feed"""
+        return self.poll_unit(f"cap:{feed_url}")
+    
+    def scrape_reddit_posts(self, on_unit: Optional[UnitHook] = None) -> List[ScrapedPost]:
         """Scrape Reddit posts from coastal communities"""
         posts = []
-        
-        try:
-            for community in self.reddit_communities[:3]:  # Limit communities
-                try:
-                    # Use Reddit JSON API (public, no auth required)
-                    url = f"https://www.reddit.com/r/{community}/hot.json?limit=10"
-                    
-                    response = self.session.get(url, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        for post_data in data['data']['children']:
-                            post = post_data['data']
-                            
-                            # Combine title and selftext
-                            text = post.get('title', '')
-                            if post.get('selftext'):
-                                text += f" {post['selftext'][:200]}"
-                            
-                            # Check if coastal-related
-                            if self.is_coastal_related(text):
-                                created_utc = datetime.fromtimestamp(post['created_utc']).isoformat()
-                                
-                                posts.append(ScrapedPost(
-                                    id=f"reddit_{post['id']}",
-                                    text=text[:500],
-                                    created_at=created_utc,
-                                    author=post.get('author', 'unknown'),
-                                    location=f"r/{community}",
-                                    source="reddit",
-                                    url=f"https://reddit.com{post.get('permalink', '')}",
-                                    sentiment=self.analyze_sentiment(text),
-                                    urgency=self.calculate_urgency(text, 'reddit'),
-                                    hazard_type=self.detect_hazard_type(text),
-                                    engagement={
-                                        'upvotes': post.get('ups', 0),
-                                        'comments': post.get('num_comments', 0),
-                                        'score': post.get('score', 0)
-                                    }
-                                ))
-                                
-                    time.sleep(1)  # Rate limiting
-                    
-                except Exception as e:
-                    logger.error(f"Error scraping Reddit r/{community}: {e}")
-                    
-        except Exception as e:
-            logger.error(f"Error in Reddit scraping: {e}")
-            
+        for community in self.reddit_communities[:3]:  # Limit communities
+            try:
+                unit_posts = self.poll_subreddit(community)
+                posts.extend(on_unit(unit_posts) if on_unit else unit_posts)
+            except Exception as e:
+                logger.error(f"Error scraping Reddit r/{community}: {e}")
         return posts
     
-    def scrape_rss_feeds(self) -> List[ScrapedPost]:
+    def poll_subreddit(self, community: str) -> List[ScrapedPost]:
+        """Fetch coastal posts from one subreddit"""
+        return self.poll_unit(f"subreddit:{community}")
+    
+    def scrape_rss_feeds(self, on_unit: Optional[UnitHook] = None) -> List[ScrapedPost]:
         """Scrape RSS news feeds"""
         posts = []
-        
-        try:
-            for feed_url in self.rss_feeds[:4]:  # Limit feeds
-                try:
-                    feed = feedparser.parse(feed_url)
+        for feed_url in self.rss_feeds[:4]:  # Limit feeds
+            try:
+                unit_posts = self.poll_rss_feed(feed_url)
+                posts.extend(on_unit(unit_posts) if on_unit else unit_posts)
+            except Exception as e:
+                logger.error(f"Error scraping RSS feed {feed_url}: {e}")
+        return posts
+    
+    def poll_rss_feed(self, feed_url: str) -> List[ScrapedPost]:
+        """Fetch coastal stories from one RSS feed"""
+        return self.poll_unit(f"rss:{feed_url}")
+    
+    def poll_unit(self, unit_id: str) -> List[ScrapedPost]:
+        """Fetch, parse and classify one source unit in the calling thread"""
+        with span('source', unit=unit_id) as source:
+            fetched = self.fetch_unit(unit_id)
+            with span('parse') as parse:
+                candidates = self.parse_unit(fetched)
+                parse.set_attribute('outputs', len(candidates))
+            with span('classify', items=len(candidates)):
+                posts = [self.classify_candidate(candidate) for candidate in candidates]
+            source.set_attribute('posts', len(posts))
+            return posts
+    
+    def fetch_unit(self, unit_id: str) -> Tuple[str, Any]:
+        """Download one source unit; returns (unit_id, raw payload). Raises on errors."""
+        kind, target = unit_id.split(':', 1)
+        if kind == 'subreddit':
+            self._wait_for_reddit()
+            # Use Reddit JSON API (public, no auth required)
+            url = f"https://www.reddit.com/r/{target}/hot.json?limit=10"
+        elif kind in ('cap', 'rss'):
+            url = target
+        else:
+            raise ValueError(f"Unknown source unit {unit_id}")
+        
+        host = urlparse(url).netloc
+        started = time.perf_counter()
+        with span('request', url=url, host=host) as request:
+            try:
+                if kind == 'rss':
+                    feed, response = fetch_feed(self.session, url)
+                    request.set_attribute('status', response.status_code)
+                    response.raise_for_status()
+                    if feed.bozo and not feed.entries:
+                        raise ValueError(f"Unreadable feed: {feed.bozo_exception}")
+                    size, payload = len(response.content), feed
+                else:
+                    response = self.session.get(url, timeout=10)
+                    request.set_attribute('status', response.status_code)
+                    response.raise_for_status()
+                    size = len(response.content)
+                    payload = response.content if kind == 'cap' else response.json()
+            except Exception:
+                FETCH_ERRORS.inc(host=host)
+                raise
+            finally:
+                FETCH_SECONDS.observe(time.perf_counter() - started, host=host)
+            request.set_attribute('bytes', size)
+        FETCH_BYTES.inc(size, host=host)
+        return unit_id, payload
+    
+    def _wait_for_reddit(self):
+        """Space Reddit requests at least a second apart across fetch workers"""
+        if http_cassette.replaying():
+            return
+        with self.reddit_gate:
+            wait = self.reddit_next_request - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self.reddit_next_request = time.monotonic() + 1.0
+    
+    def parse_unit(self, fetched: Tuple[str, Any]) -> List[Candidate]:
+        """Turn a fetched payload into unclassified coastal-related posts"""
+        unit_id, payload = fetched
+        kind, target = unit_id.split(':', 1)
+        with PARSE_SECONDS.time(source=kind):
+            return self._parse_payload(kind, target, payload)
+    
+    def _parse_payload(self, kind: str, target: str, payload: Any) -> List[Candidate]:
+        """parse_unit for one source kind's payload"""
+        candidates = []
+        
+        if kind == 'cap':
+            # Parse the CAP XML format
+            soup = BeautifulSoup(payload, 'xml')
+            for entry in soup.find_all('entry')[:5]:  # Limit to 5 per feed
+                title = entry.find('title')
+                summary = entry.find('summary')
+                updated = entry.find('updated')
+                link = entry.find('link')
+                
+                if title and summary:
+                    text = f"{title.text}: {summary.text}"
                     
-                    for entry in feed.entries[:5]:  # Limit entries per feed
-                        title = getattr(entry, 'title', '')
-                        summary = getattr(entry, 'summary', '')
-                        text = f"{title}. {summary}"
-                        
-                        # Check if coastal-related
-                        if self.is_coastal_related(text):
-                            # Get published date
-                            published = getattr(entry, 'published_parsed', None)
-                            if published:
-                                created_at = datetime(*published[:6]).isoformat()
-                            else:
-                                created_at = datetime.now().isoformat()
-                            
-                            post_id = hashlib.md5(text.encode()).hexdigest()[:12]
-                            source_name = urlparse(feed_url).netloc.replace('www.', '').replace('feeds.', '')
-                            
-                            posts.append(ScrapedPost(
-                                id=f"news_{post_id}",
-                                text=text[:500],
-                                created_at=created_at,
-                                author=f"{source_name.upper()} News",
-                                location="Global",
-                                source="news",
-                                url=getattr(entry, 'link', feed_url),
-                                sentiment=self.analyze_sentiment(text),
-                                urgency=self.calculate_urgency(text, source_name),
-                                hazard_type=self.detect_hazard_type(text),
-                                engagement={'shares': random.randint(5, 50), 'views': random.randint(50, 500)}
-                            ))
-                            
-                except Exception as e:
-                    logger.error(f"Error scraping RSS feed {feed_url}: {e}")
+                    # Check if it's coastal-related
+                    if self.is_coastal_related(text):
+                        post_id = hashlib.md5(text.encode()).hexdigest()[:12]
+                        candidates.append(Candidate(ScrapedPost(
+                            id=f"noaa_{post_id}",
+                            text=text[:500],  # Limit length
+                            created_at=updated.text if updated else datetime.now().isoformat(),
+                            author="NOAA National Weather Service",
+                            location="United States",
+                            source="noaa",
+                            url=link.get('href') if link else target,
+                            engagement={'shares': random.randint(10, 100), 'views': random.randint(100, 1000)}
+                        ), full_text=text, urgency_source='noaa'))
+        
+        elif kind == 'subreddit':
+            for post_data in payload['data']['children']:
+                post = post_data['data']
+                
+                # Combine title and selftext
+                text = post.get('title', '')
+                if post.get('selftext'):
+                    text += f" {post['selftext'][:200]}"
+                
+                # Check if coastal-related
+                if self.is_coastal_related(text):
+                    created_utc = datetime.fromtimestamp(post['created_utc']).isoformat()
+                    candidates.append(Candidate(ScrapedPost(
+                        id=f"reddit_{post['id']}",
+                        text=text[:500],
+                        created_at=created_utc,
+                        author=post.get('author', 'unknown'),
+                        location=f"r/{target}",
+                        source="reddit",
+                        url=f"https://reddit.com{post.get('permalink', '')}",
+                        engagement={
+                            'upvotes': post.get('ups', 0),
+                            'comments': post.get('num_comments', 0),
+                            'score': post.get('score', 0)
+                        }
+                    ), full_text=text, urgency_source='reddit'))
+        
+        elif kind == 'rss':
+            source_name = urlparse(target).netloc.replace('www.', '').replace('feeds.', '')
+            for entry in payload.entries[:5]:  # Limit entries per feed
+                title = getattr(entry, 'title', '')
+                summary = getattr(entry, 'summary', '')
+                text = f"{title}. {summary}"
+                
+                # Check if coastal-related
+                if self.is_coastal_related(text):
+                    # Get published date
+                    published = getattr(entry, 'published_parsed', None)
+                    if published:
+                        created_at = datetime(*published[:6]).isoformat()
+                    else:
+                        created_at = datetime.now().isoformat()
                     
-        except Exception as e:
-            logger.error(f"Error in RSS scraping: {e}")
-            
-        return posts
+                    post_id = hashlib.md5(text.encode()).hexdigest()[:12]
+                    candidates.append(Candidate(ScrapedPost(
+                        id=f"news_{post_id}",
+                        text=text[:500],
+                        created_at=created_at,
+                        author=f"{source_name.upper()} News",
+                        location="Global",
+                        source="news",
+                        url=getattr(entry, 'link', target),
+                        engagement={'shares': random.randint(5, 50), 'views': random.randint(50, 500)}
+                    ), full_text=text, urgency_source=source_name))
+        
+        return candidates
+    
+    def classify_candidate(self, candidate: Candidate) -> ScrapedPost:
+        """Fill in sentiment, urgency and hazard type from the untruncated text"""
+        post, text = candidate.post, candidate.full_text
+        with CLASSIFY_SECONDS.time():
+            post.sentiment = self.analyze_sentiment(text)
+            post.urgency = self.calculate_urgency(text, candidate.urgency_source)
+            post.hazard_type = self.detect_hazard_type(text)
+        return post
+    
+    def source_units(self) -> Dict[str, Callable[[], List[ScrapedPost]]]:
+        """Every independently pollable source, keyed by a stable unit id"""
+        return {unit_id: functools.partial(self.poll_unit, unit_id) for unit_id in self.source_unit_ids()}
+    
+    def source_unit_ids(self, limited: bool = False) -> List[str]:
+        """Ids of every source unit; `limited` keeps only those a full scrape covers"""
+        reddit_communities = self.reddit_communities[:3] if limited else self.reddit_communities
+        rss_feeds = self.rss_feeds[:4] if limited else self.rss_feeds
+        return ([f"cap:{feed_url}" for feed_url in self.noaa_feeds] +
+                [f"subreddit:{community}" for community in reddit_communities] +
+                [f"rss:{feed_url}" for feed_url in rss_feeds])
     
     def is_coastal_related(self, text: str) -> bool:
         """Check if text is related to Indian coastal hazards"""
@@ -396,78 +510,142 @@ class RealWebScraper:
         
         return has_indian_area or (india_related and has_coastal_term) or has_coastal_term
     
-    def scrape_all_sources(self) -> Dict[str, Any]:
-        """Scrape all sources and return formatted data"""
+    def scrape_all_sources(self, cached: bool = False,
+                           on_posts: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """Scrape all sources and return formatted data.
+        
+        With `cached`, the latest result is served stale-while-revalidate
+        instead of waiting for a live scrape (see scrape_cache.py). With
+        `on_posts`, a live scrape hands over each batch of formatted posts
+        as soon as they are stored.
+        """
+        if cached:
+            return self.cache.get()
+        with self.scrape_lock:
+            return self.scrape_live(on_posts)
+    
+    def scrape_live(self, on_posts: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """Scrape every source now through the staged pipeline"""
         logger.info("Starting comprehensive web scraping...")
+        unit_ids = self.source_unit_ids(limited=True)
+        with span('scrape', units=len(unit_ids)) as run:
+            pipeline = self.build_pipeline(on_posts)
+            all_posts = pipeline.run(unit_ids)
+            
+            result = self.process_posts(all_posts, stored=True)
+            result['pipeline'] = pipeline.metrics()
+            run.set_attribute('posts', len(all_posts))
+        return result
+    
+    def build_pipeline(self, on_posts: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Pipeline:
+        """fetch -> parse -> dedupe -> classify -> persist over source unit ids.
+        
+        Fetches overlap with parsing and classification; bounded queues hold
+        back fetch workers when the later stages fall behind. Deduplication
+        and persistence use one worker each since they share SQLite
+        connections. Persisted posts are handed to `on_posts` per batch.
+        """
+        def fetch(unit_id: str) -> List[Tuple[str, Any]]:
+            current_span().set_attribute('unit', unit_id)
+            try:
+                return [self.fetch_unit(unit_id)]
+            except Exception as e:
+                logger.error(f"Error scraping {unit_id}: {e}")
+                return []
+        
+        def persist(posts: List[ScrapedPost]) -> List[ScrapedPost]:
+            self.persist_posts(posts)
+            if on_posts:
+                on_posts(self.format_posts_for_api(posts))
+            return posts
+        
+        return Pipeline([
+            Stage('fetch', fetch, workers=self.fetch_workers, queue_size=self.queue_size),
+            Stage('parse', self.parse_unit, queue_size=self.queue_size),
+            Stage('dedupe', self.dedupe_candidates, queue_size=self.queue_size, batch_size=32),
+            Stage('classify', lambda candidate: [self.classify_candidate(candidate)],
+                  workers=self.classify_workers, queue_size=self.queue_size),
+            Stage('persist', persist, queue_size=self.queue_size, batch_size=32),
+        ], name='scrape')
+    
+    def poll_due_sources(self) -> Dict[str, Any]:
+        """Poll only the source units the adaptive scheduler says are due.
+        
+        Each unit's posts are stored, and so published, as soon as it is
+        polled, so an urgent alert does not wait for the rest of the round.
+        """
+        with self.scrape_lock, span('poll') as poll:
+            all_posts = self.scheduler.run_due(self.source_units(), on_posts=self.store_posts)
+            poll.set_attribute('posts', len(all_posts))
+            return self.process_posts(all_posts, stored=True)
+    
+    def run_scheduler(self, stop: Optional[threading.Event] = None):
+        """Poll sources on their adaptive intervals until `stop` is set"""
+        self.scheduler.run_forever(
+            self.poll_due_sources, lambda: list(self.source_units()), stop=stop
+        )
+    
+    def store_posts(self, posts: List[ScrapedPost]) -> List[ScrapedPost]:
+        """Deduplicate and persist posts; returns the canonical posts"""
+        # Collapse syndicated copies and cross-posts onto one canonical post
+        posts = self.collapse_near_duplicates(posts)
+        self.persist_posts(posts)
+        return posts
+    
+    def persist_posts(self, posts: List[ScrapedPost]):
+        """Save already deduplicated posts and fold them into the analytics counters"""
+        if posts:
+            self.save_to_database(posts)
+            self.analytics.apply(posts)
+    
+    def process_posts(self, all_posts: List[ScrapedPost], stored: bool = False) -> Dict[str, Any]:
+        """Deduplicate, store and summarise freshly scraped posts"""
+        if not stored:
+            all_posts = self.store_posts(all_posts)
         
-        all_posts = []
-        
-        # Scrape NOAA alerts
-        logger.info("Scraping NOAA alerts...")
-        noaa_posts = self.scrape_noaa_alerts()
-        all_posts.extend(noaa_posts)
-        logger.info(f"Found {len(noaa_posts)} NOAA posts")
-        
-        # Scrape Reddit
-        logger.info("Scraping Reddit posts...")
-        reddit_posts = self.scrape_reddit_posts()
-        all_posts.extend(reddit_posts)
-        logger.info(f"Found {len(reddit_posts)} Reddit posts")
-        
-        # Scrape RSS feeds
-        logger.info("Scraping RSS feeds...")
-        rss_posts = self.scrape_rss_feeds()
-        all_posts.extend(rss_posts)
-        logger.info(f"Found {len(rss_posts)} RSS posts")
-        
-        # Save to database
-        if all_posts:
-            self.save_to_database(all_posts)
-        
-        # Calculate analytics
+        # Calculate analytics for this run, plus cumulative and windowed totals
         analytics = self.calculate_analytics(all_posts)
+        analytics['cumulative'] = self.analytics.summary()
         
-        # Format for API response
-        formatted_posts = self.format_posts_for_api(all_posts)
+        # Posts stay objects; serialization.py encodes them for the API response
+        for post in all_posts:
+            if post.polarity is None:
+                post.polarity = self.sentiment_to_polarity(post.sentiment)
         
         logger.info(f"Total scraped posts: {len(all_posts)}")
         
         return {
-            'posts': formatted_posts,
+            'posts': all_posts,
             'analytics': analytics,
-            'count': len(formatted_posts),
+            'count': len(all_posts),
             'last_scraped': datetime.now().isoformat()
         }
     
+    def collapse_near_duplicates(self, posts: List[ScrapedPost]) -> List[ScrapedPost]:
+        """Drop near-duplicate posts, keeping one canonical post with a duplicate count"""
+        collapsed = self.dedupe_index.collapse(posts, text_of=lambda p: p.text, id_of=lambda p: p.id)
+        
+        canonical_posts = []
+        for post, duplicate_count in collapsed:
+            post.duplicate_count = duplicate_count
+            canonical_posts.append(post)
+        
+        if len(canonical_posts) < len(posts):
+            logger.info(f"Collapsed {len(posts) - len(canonical_posts)} near-duplicate posts")
+        return canonical_posts
+    
+    def dedupe_candidates(self, candidates: List[Candidate]) -> List[Candidate]:
+        """collapse_near_duplicates for parsed posts, before they are classified"""
+        by_post = {id(candidate.post): candidate for candidate in candidates}
+        canonical = self.collapse_near_duplicates([candidate.post for candidate in candidates])
+        return [by_post[id(post)] for post in canonical]
+    
     def format_posts_for_api(self, posts: List[ScrapedPost]) -> List[Dict[str, Any]]:
         """Format posts for API response"""
-        formatted = []
-        
         for post in posts:
-            formatted.append({
-                'id': post.id,
-                'text': post.text,
-                'created_at': post.created_at,
-                'author': {
-                    'username': post.author,
-                    'name': post.author,
-                    'location': post.location
-                },
-                'location': {
-                    'type': post.source,
-                    'name': post.location
-                },
-                'sentiment': post.sentiment,
-                'polarity': self.sentiment_to_polarity(post.sentiment),
-                'urgency': post.urgency,
-                'hazard_type': post.hazard_type,
-                'metrics': post.engagement or {},
-                'processed_at': datetime.now().isoformat(),
-                'source': post.source,
-                'url': post.url
-            })
-        
-        return formatted
+            if post.polarity is None:
+                post.polarity = self.sentiment_to_polarity(post.sentiment)
+        return [post.build_api() for post in posts]
     
     def sentiment_to_polarity(self, sentiment: str) -> float:
         """Convert sentiment to polarity score"""
@@ -480,71 +658,88 @@ class RealWebScraper:
     
     def calculate_analytics(self, posts: List[ScrapedPost]) -> Dict[str, Any]:
         """Calculate analytics from scraped posts"""
-        if not posts:
-            return self.empty_analytics()
-        
-        # Count sentiments
-        sentiment_counts = {'Positive': 0, 'Negative': 0, 'Neutral': 0}
-        urgency_counts = {'high': 0, 'medium': 0, 'low': 0}
-        hazard_counts = {}
-        
-        total_engagement = 0
-        total_likes = 0
-        total_shares = 0
-        
-        for post in posts:
-            sentiment_counts[post.sentiment] += 1
-            urgency_counts[post.urgency] += 1
-            
-            if post.hazard_type in hazard_counts:
-                hazard_counts[post.hazard_type] += 1
-            else:
-                hazard_counts[post.hazard_type] = 1
-            
-            # Calculate engagement
-            if post.engagement:
-                engagement_sum = sum(post.engagement.values())
-                total_engagement += engagement_sum
-                total_likes += post.engagement.get('upvotes', post.engagement.get('views', 0))
-                total_shares += post.engagement.get('shares', post.engagement.get('score', 0))
-        
-        return {
-            'total_mentions': len(posts),
-            'sentiment_breakdown': {
-                'positive': sentiment_counts['Positive'],
-                'negative': sentiment_counts['Negative'],
-                'neutral': sentiment_counts['Neutral']
-            },
-            'urgency_breakdown': urgency_counts,
-            'hazard_types': hazard_counts,
-            'engagement_stats': {
-                'avg_likes': total_likes / len(posts) if posts else 0,
-                'avg_retweets': total_shares / len(posts) if posts else 0,
-                'total_engagement': total_engagement
-            },
-            'last_updated': datetime.now().isoformat()
-        }
+        return StreamingAnalytics().extend(posts).result()
     
     def empty_analytics(self) -> Dict[str, Any]:
         """Return empty analytics structure"""
-        return {
-            'total_mentions': 0,
-            'sentiment_breakdown': {'positive': 0, 'negative': 0, 'neutral': 0},
-            'urgency_breakdown': {'high': 0, 'medium': 0, 'low': 0},
-            'hazard_types': {},
-            'engagement_stats': {'avg_likes': 0, 'avg_retweets': 0, 'total_engagement': 0},
-            'last_updated': datetime.now().isoformat()
-        }
+        return StreamingAnalytics().result()
 
 def main():
     """Main function for CLI usage"""
-    scraper = RealWebScraper()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Scrape coastal hazard posts from public sources")
+    parser.add_argument('keywords', nargs='?', help="Comma-separated keywords (accepted for API compatibility)")
+    parser.add_argument('--serve', action='store_true', help="Run as a long-lived local HTTP daemon")
+    parser.add_argument('--cached', action='store_true',
+                        help="Serve the latest result stale-while-revalidate instead of always scraping")
+    parser.add_argument('--refresh-cache', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--stream', action='store_true',
+                        help="Write one JSON line per post as posts are stored, then a summary line")
+    parser.add_argument('--schedule', action='store_true',
+                        help="Poll each source on its own adaptive interval until interrupted")
+    parser.add_argument('--no-schedule', action='store_true', help="With --serve, do not poll in the background")
+    parser.add_argument('--format', choices=FORMATS, default='json',
+                        help="Encoding of the result written to stdout")
+    parser.add_argument('--trace', metavar='PATH', help="Write tracing spans of this run to PATH")
+    parser.add_argument('--trace-format', choices=tracing.TRACE_FORMATS, default='jsonl',
+                        help="Span file format: JSON lines, or OTLP/JSON for OpenTelemetry tools")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record', metavar='CASSETTE', help="Store every HTTP response in a gzip cassette file")
+    cassette.add_argument('--replay', metavar='CASSETTE', help="Serve HTTP responses from a cassette, offline")
+    parser.add_argument('--replay-latency', choices=http_cassette.LATENCIES, default='recorded',
+                        help="Wait out each recorded download time, or answer at once")
+    parser.add_argument('--source-override', metavar='URL',
+                        help="Send every source request to this server instead (see stand_in_server.py)")
+    parser.add_argument('--host', default=os.environ.get('SCRAPER_SERVICE_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SCRAPER_SERVICE_PORT', 8765)))
+    args = parser.parse_args()
+    
+    if args.trace:
+        tracing.configure(args.trace, args.trace_format)
+    if args.record or args.replay:
+        # Through the environment as well, so detached refresh processes use it too
+        http_cassette.configure_processes(args.record or args.replay, 'record' if args.record else 'replay',
+                                          args.replay_latency)
+    if args.source_override:
+        # Through the environment, so detached refresh processes use it too
+        os.environ['CORSAIR_SOURCE_OVERRIDE'] = args.source_override
+    
+    if args.serve:
+        from scraper_service import serve
+        serve(args.host, args.port, schedule=not args.no_schedule)
+        return
+    
+    scraper = RealWebScraper(cache_mode='process')
+    
+    if args.schedule:
+        try:
+            scraper.run_scheduler()
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    if args.refresh_cache:
+        # Detached background refresh started by a --cached run; it owns the lock file
+        scraper.cache.refresh_now(holds_lock=True)
+        return
+    
+    if args.stream:
+        with streaming_stdout() as emitter:
+            result = scraper.scrape_all_sources(on_posts=emitter.posts_batch)
+            result.pop('posts')
+            result['metrics'] = metrics.snapshot()
+            emitter.summary(result)
+        return
     
     # Run scraping
-    result = scraper.scrape_all_sources()
+    result = scraper.scrape_all_sources(cached=args.cached)
+    
+    # Where this run spent its time (fetch latency per host, parse, classify, DB writes)
+    result['metrics'] = metrics.snapshot()
     
-    # Output JSON for API consumption
-    print(json.dumps(result))
+    # Output for API consumption (one JSON line, or MessagePack bytes)
+    write_output(result, args.format)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Stale-while-revalidate cache for scrape results
+The most recent scrape result is kept in a JSON snapshot next to the posts
+database. Callers get it immediately while it is younger than `max_stale`;
+once it is older than `max_age` a single background refresh is started.
+Concurrent callers share that refresh instead of scraping again: threads in
+one process (the daemon) wait on the same in-flight refresh, separate CLI
+processes coordinate through a lock file.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from metrics import CACHE_REQUESTS
+from serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 60.0
+DEFAULT_MAX_STALE = 900.0
+# A refresh holding the lock longer than this is assumed dead
+DEFAULT_LOCK_TIMEOUT = 300.0
+
+
+class ScrapeCache:
+    """Serve cached scrape results and refresh them at most once at a time.
+
+    ``mode='thread'`` refreshes on a background thread (long-lived processes);
+    ``mode='process'`` calls ``spawn_refresh`` to start a detached process
+    that runs ``refresh_now`` and exits, so a short-lived CLI can return at
+    once.
+    """
+
+    def __init__(self, snapshot_path: str, refresh: Callable[[], Dict[str, Any]],
+                 mode: str = 'thread', spawn_refresh: Optional[Callable[[], None]] = None,
+                 max_age: Optional[float] = None, max_stale: Optional[float] = None,
+                 lock_timeout: float = DEFAULT_LOCK_TIMEOUT):
+        if mode not in ('thread', 'process'):
+            raise ValueError("mode must be 'thread' or 'process'")
+        if mode == 'process' and spawn_refresh is None:
+            raise ValueError("process mode needs spawn_refresh")
+        self.snapshot_path = snapshot_path
+        self.lock_path = snapshot_path + '.lock'
+        self.refresh = refresh
+        self.mode = mode
+        self.spawn_refresh = spawn_refresh
+        self.max_age = max_age if max_age is not None else float(os.environ.get('SCRAPE_CACHE_MAX_AGE', DEFAULT_MAX_AGE))
+        self.max_stale = max_stale if max_stale is not None else float(os.environ.get('SCRAPE_CACHE_MAX_STALE', DEFAULT_MAX_STALE))
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._inflight: Optional[threading.Event] = None
+
+    # --- snapshot file ---
+
+    def read_snapshot(self) -> Optional[Dict[str, Any]]:
+        """{'result': ..., 'stored_at': epoch seconds} or None"""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                return loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def write_snapshot(self, result: Dict[str, Any]):
+        """Atomically replace the snapshot"""
+        os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(dumps({'result': result, 'stored_at': time.time()}))
+        os.replace(tmp_path, self.snapshot_path)
+
+    # --- cross-process lock ---
+
+    def _try_lock(self) -> bool:
+        for _ in range(2):
+            try:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(f"{os.getpid()} {time.time()}")
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.lock_path) < self.lock_timeout:
+                        return False
+                    logger.warning("Breaking stale scrape refresh lock")
+                    os.remove(self.lock_path)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def _unlock(self):
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+    def refreshing(self) -> bool:
+        if self._inflight is not None:
+            return True
+        try:
+            return time.time() - os.path.getmtime(self.lock_path) < self.lock_timeout
+        except OSError:
+            return False
+
+    # --- refresh ---
+
+    def refresh_now(self, holds_lock: bool = False) -> Dict[str, Any]:
+        """Scrape synchronously and store the snapshot.
+
+        ``holds_lock`` is passed by a spawned refresh process whose parent
+        took the lock on its behalf; it is released when the refresh ends.
+        """
+        try:
+            result = self.refresh()
+            self.write_snapshot(result)
+            return result
+        finally:
+            if holds_lock:
+                self._unlock()
+
+    def _start_thread_refresh(self) -> threading.Event:
+        with self._lock:
+            if self._inflight is not None:
+                return self._inflight
+            done = self._inflight = threading.Event()
+
+        def run():
+            try:
+                self.refresh_now()
+            except Exception as e:
+                logger.error(f"Background scrape refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._inflight = None
+                done.set()
+
+        threading.Thread(target=run, name='scrape-cache-refresh', daemon=True).start()
+        return done
+
+    def _start_process_refresh(self) -> bool:
+        if not self._try_lock():
+            return False
+        try:
+            self.spawn_refresh()
+            return True
+        except Exception as e:
+            logger.error(f"Could not start background scrape refresh: {e}")
+            self._unlock()
+            return False
+
+    def _wait_for_other_refresh(self, previous: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Wait until another process's refresh has written a newer snapshot"""
+        deadline = time.time() + self.lock_timeout
+        previous_at = previous['stored_at'] if previous else 0
+        while time.time() < deadline and os.path.exists(self.lock_path):
+            time.sleep(0.25)
+            snapshot = self.read_snapshot()
+            if snapshot and snapshot['stored_at'] > previous_at:
+                return snapshot
+        snapshot = self.read_snapshot()
+        return snapshot if snapshot and snapshot['stored_at'] > previous_at else None
+
+    def _annotate(self, result: Dict[str, Any], status: str, stored_at: float) -> Dict[str, Any]:
+        CACHE_REQUESTS.inc(cache='scrape', result=status)
+        return {**result, 'cache': {
+            'status': status,
+            'age_seconds': round(max(0.0, time.time() - stored_at), 3),
+            'refreshing': self.refreshing()
+        }}
+
+    def get(self) -> Dict[str, Any]:
+        """Return a scrape result, as fresh as the cache policy requires"""
+        snapshot = self.read_snapshot()
+        age = time.time() - snapshot['stored_at'] if snapshot else None
+
+        if snapshot and age <= self.max_age:
+            return self._annotate(snapshot['result'], 'fresh', snapshot['stored_at'])
+
+        if snapshot and age <= self.max_stale:
+            if self.mode == 'thread':
+                self._start_thread_refresh()
+            else:
+                self._start_process_refresh()
+            return self._annotate(snapshot['result'], 'stale', snapshot['stored_at'])
+
+        # Missing or too stale to serve: wait for a refresh, sharing one already running
+        if self.mode == 'thread':
+            self._start_thread_refresh().wait(self.lock_timeout)
+            fresh = self.read_snapshot()
+            if fresh and (not snapshot or fresh['stored_at'] > snapshot['stored_at']):
+                return self._annotate(fresh['result'], 'miss', fresh['stored_at'])
+        elif self._try_lock():
+            result = self.refresh_now(holds_lock=True)
+            return self._annotate(result, 'miss', time.time())
+        else:
+            fresh = self._wait_for_other_refresh(snapshot)
+            if fresh:
+                return self._annotate(fresh['result'], 'miss', fresh['stored_at'])
+
+        # The shared refresh failed or timed out; scrape directly
+        result = self.refresh_now()
+        return self._annotate(result, 'miss', time.time())
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Long-running scraper daemon for the Next.js API routes
+Keeps one RealWebScraper (HTTP session, compiled matchers, database
+connections) warm and answers JSON calls over localhost HTTP, so API
+requests no longer pay interpreter start, imports and DB initialisation.
+
+Start with `python real_web_scraper.py --serve`. Endpoints:
+  GET  /health
+  GET  /scrape[?fresh=1]       latest posts + analytics, stale-while-revalidate
+  POST /scrape                 scrape all sources now
+  GET  /posts?limit=100        recently stored posts
+  GET  /analytics              cumulative analytics with today/7d windows
+  GET  /trends?granularity=hour&hours=168&hazard_type=cyclone&urgency=high
+  GET  /events?urgency=high&hazard_type=cyclone&source=noaa
+                               Server-Sent Events stream of newly stored posts
+  GET  /schedule              adaptive polling intervals and per-source stats
+  GET  /reddit-hazards         analysed Reddit posts (backend/reddit_analyzer.py)
+  GET  /metrics                Prometheus text; ?format=json for the JSON snapshot
+
+Responses are JSON; add ?format=msgpack or `Accept: application/x-msgpack`
+for MessagePack.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from analytics import GRANULARITIES, ROLLUP_DIMENSIONS
+from metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus, snapshot
+from post_events import DEFAULT_BUFFER_SIZE, parse_filters
+from post_model import Post
+from real_web_scraper import RealWebScraper
+from serialization import CONTENT_TYPES, check_format, dumps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Comment line sent on idle event streams so proxies keep the connection open
+SSE_KEEPALIVE_SECONDS = 15.0
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+class ScraperService:
+    """Warm state shared by all request handler threads"""
+
+    def __init__(self, scraper: Optional[RealWebScraper] = None):
+        self.scraper = scraper or RealWebScraper()
+        self.started_at = time.time()
+        self._reddit_analyzer = None
+
+    def health(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'db_path': self.scraper.db_path,
+            'scraping': self.scraper.scrape_lock.locked()
+        }
+
+    def scrape(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Cached (stale-while-revalidate) unless ?fresh=1"""
+        fresh = params.get('fresh', '').lower() in ('1', 'true', 'yes')
+        return self.scraper.scrape_all_sources(cached=not fresh)
+
+    def scrape_live(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return self.scraper.scrape_all_sources()
+
+    def posts(self, params: Dict[str, str]) -> Dict[str, Any]:
+        limit = max(1, min(int(params.get('limit', 100)), 1000))
+        rows = self.scraper.store.recent_posts(limit)
+        posts = [Post.from_record(row) for row in rows]
+        formatted = self.scraper.format_posts_for_api(posts)
+        return {'posts': formatted, 'count': len(formatted)}
+
+    def analytics(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return self.scraper.analytics.summary()
+
+    def trends(self, params: Dict[str, str]) -> Dict[str, Any]:
+        granularity = params.get('granularity', 'hour')
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        hours = float(params.get('hours', 24 * 7))
+        filters = {name: params[name] for name in ROLLUP_DIMENSIONS if name in params}
+        series = self.scraper.rollups.trend(
+            granularity, since=datetime.now() - timedelta(hours=hours), **filters
+        )
+        return {'granularity': granularity, 'filters': filters, 'series': series}
+
+    def schedule(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'budget_per_minute': round(self.scraper.scheduler.budget.rate * 60, 2),
+            'sources': self.scraper.scheduler.stats()
+        }
+
+    def metrics(self, params: Dict[str, str]) -> Dict[str, Any]:
+        return snapshot()
+
+    def reddit_hazards(self, params: Dict[str, str]) -> Any:
+        if self._reddit_analyzer is None:
+            if BACKEND_DIR not in sys.path:
+                sys.path.append(BACKEND_DIR)
+            import reddit_analyzer
+            self._reddit_analyzer = reddit_analyzer
+        return self._reddit_analyzer.get_analyzed_reddit_posts()
+
+    def routes(self) -> Dict[Tuple[str, str], Callable[[Dict[str, str]], Any]]:
+        return {
+            ('GET', '/health'): self.health,
+            ('GET', '/scrape'): self.scrape,
+            ('POST', '/scrape'): self.scrape_live,
+            ('GET', '/posts'): self.posts,
+            ('GET', '/analytics'): self.analytics,
+            ('GET', '/trends'): self.trends,
+            ('GET', '/schedule'): self.schedule,
+            ('GET', '/reddit-hazards'): self.reddit_hazards,
+            ('GET', '/metrics'): self.metrics,
+        }
+
+
+def make_handler(service: ScraperService):
+    routes = service.routes()
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = 'CorsairScraper/1.0'
+
+        def _dispatch(self, method: str):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if (method, url.path.rstrip('/')) == ('GET', '/events'):
+                self._stream_events(params)
+                return
+            if (method, url.path.rstrip('/')) == ('GET', '/metrics') and 'format' not in params:
+                self._send_body(200, render_prometheus().encode('utf-8'), PROMETHEUS_CONTENT_TYPE)
+                return
+            handler = routes.get((method, url.path.rstrip('/') or '/'))
+            if handler is None:
+                self._send(404, {'error': f'No route for {method} {url.path}'})
+                return
+            try:
+                fmt = self._response_format(params)
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+                return
+            try:
+                self._send(200, handler(params), fmt)
+            except ValueError as e:
+                self._send(400, {'error': str(e)}, fmt)
+            except Exception as e:
+                logger.exception(f"{method} {url.path} failed")
+                self._send(500, {'error': str(e)}, fmt)
+
+        def _response_format(self, params: Dict[str, str]) -> str:
+            if 'format' in params:
+                return check_format(params['format'])
+            if CONTENT_TYPES['msgpack'] in (self.headers.get('Accept') or ''):
+                return check_format('msgpack')
+            return 'json'
+
+        def _send(self, status: int, payload: Any, fmt: str = 'json'):
+            self._send_body(status, dumps(payload, fmt), CONTENT_TYPES[fmt])
+
+        def _send_body(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream_events(self, params: Dict[str, str]):
+            """Push newly stored posts as Server-Sent Events until the client disconnects"""
+            try:
+                buffer_size = max(1, min(int(params.get('buffer', DEFAULT_BUFFER_SIZE)), 10000))
+            except ValueError:
+                self._send(400, {'error': 'buffer must be an integer'})
+                return
+            subscription = service.scraper.events.subscribe(parse_filters(params), buffer_size)
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'keep-alive')
+            self.end_headers()
+            try:
+                self.wfile.write(b'retry: 2000\n: connected\n\n')
+                self.wfile.flush()
+                while not subscription.closed:
+                    events, dropped = subscription.take(SSE_KEEPALIVE_SECONDS)
+                    chunks = []
+                    if dropped:
+                        chunks.append(f"event: dropped\ndata: {dumps({'count': dropped}).decode('utf-8')}\n\n")
+                    for event_id, post in events:
+                        chunks.append(f"id: {event_id}\nevent: post\ndata: {dumps(post).decode('utf-8')}\n\n")
+                    self.wfile.write((''.join(chunks) or ': keepalive\n\n').encode('utf-8'))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                subscription.close()
+
+        def do_GET(self):
+            self._dispatch('GET')
+
+        def do_POST(self):
+            # No endpoint takes a body; drain any so the connection stays usable
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+            self._dispatch('POST')
+
+        def log_message(self, format, *args):
+            logger.info("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, schedule: bool = True):
+    """Run the daemon until interrupted, polling sources in the background unless `schedule` is off"""
+    service = ScraperService()
+    stop = threading.Event()
+    if schedule:
+        threading.Thread(target=service.scraper.run_scheduler, args=(stop,),
+                         name='poll-scheduler', daemon=True).start()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    logger.info(f"Scraper service listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        service.scraper.events.close()
+        server.server_close()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Serialization for service output
+Results handed to Node (CLI stdout, daemon responses, the scrape snapshot)
+are encoded here: JSON through orjson when it is installed (the standard
+json module otherwise) and MessagePack through msgpack as an optional
+binary format. post_model.Post objects are encoded as they are reached, so
+a result can carry posts without first copying all of them into dicts.
+
+  python serialization.py --posts 100000    # benchmark large payloads
+"""
+
+import json
+import sys
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional, TextIO
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+from post_model import Post
+
+FORMATS = ('json', 'msgpack')
+CONTENT_TYPES = {'json': 'application/json', 'msgpack': 'application/x-msgpack'}
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """Encode what the encoders do not handle natively"""
+    if isinstance(obj, Post):
+        return obj.build_api()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, tuple):
+        # e.g. time.struct_time from feedparser; json encodes it as a list
+        return list(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    return str(obj)
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == 'msgpack' and not MSGPACK_AVAILABLE:
+        raise ValueError("msgpack output needs the msgpack package (pip install msgpack)")
+    return fmt
+
+
+def dumps(obj: Any, fmt: str = 'json', indent: bool = False) -> bytes:
+    """Encode `obj` as UTF-8 JSON or MessagePack bytes"""
+    if fmt == 'msgpack':
+        check_format(fmt)
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+    if ORJSON_AVAILABLE:
+        options = _ORJSON_OPTIONS | orjson.OPT_INDENT_2 if indent else _ORJSON_OPTIONS
+        return orjson.dumps(obj, default=_default, option=options)
+    return json.dumps(obj, default=_default, ensure_ascii=False,
+                      indent=2 if indent else None).encode('utf-8')
+
+
+def loads(data: bytes, fmt: str = 'json') -> Any:
+    if fmt == 'msgpack':
+        check_format(fmt)
+        return msgpack.unpackb(data, raw=False)
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_output(obj: Any, fmt: str = 'json', out: Optional[TextIO] = None):
+    """Write one encoded result to stdout (JSON on a single line, MessagePack as raw bytes)"""
+    out = out or sys.stdout
+    data = dumps(obj, fmt)
+    out.flush()
+    buffer = getattr(out, 'buffer', None)
+    if buffer is None:
+        if fmt != 'json':
+            raise ValueError(f"{fmt} output needs a binary stream")
+        out.write(data.decode('utf-8') + '\n')
+        out.flush()
+        return
+    buffer.write(data + b'\n' if fmt == 'json' else data)
+    buffer.flush()
+
+
+def benchmark(count: int = 100000, repeat: int = 3) -> Dict[str, Any]:
+    """Time encoding `count` posts: stdlib json over API dicts vs this module's encoders over Post objects"""
+    posts = [
+        Post(id=f"news_{i:08x}", text=f"Cyclone warning for the Odisha coast, update {i}: storm surge expected",
+             created_at='2025-09-06T10:30:00', author='IMD', location='Odisha', source='news',
+             url=f"https://example.org/story/{i}", sentiment='Negative', urgency='high',
+             hazard_type='cyclone', engagement={'shares': i % 50, 'views': i % 500}, polarity=-0.5,
+             processed_at='2025-09-06T10:31:00')
+        for i in range(count)
+    ]
+    result = {'posts': posts, 'count': count}
+
+    def best(encode) -> tuple:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = encode()
+            timings.append(time.perf_counter() - started)
+        return min(timings), len(data)
+
+    cases = {
+        'json_dicts': lambda: json.dumps({'posts': [post.build_api() for post in posts], 'count': count}),
+        'json': lambda: dumps(result),
+    }
+    if MSGPACK_AVAILABLE:
+        cases['msgpack'] = lambda: dumps(result, 'msgpack')
+
+    report = {'posts': count, 'orjson': ORJSON_AVAILABLE, 'cases': {}}
+    for name, encode in cases.items():
+        seconds, size = best(encode)
+        report['cases'][name] = {
+            'seconds': round(seconds, 4),
+            'bytes': size,
+            'posts_per_second': round(count / seconds) if seconds else None
+        }
+    return report
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark service output encoders")
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.posts, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
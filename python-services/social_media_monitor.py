@@ -1,47 +1,77 @@
-import spacy
 from geopy.geocoders import Nominatim
 import time
 import tweepy
-from textblob import TextBlob
-import json
 import sys
 import os
 from datetime import datetime
-import firebase_admin
-from firebase_admin import credentials, firestore
+
+from firestore_writer import FirestoreBatchWriter, FirestoreShadow, get_firestore_client
+from firestore_spool import FirestoreSpool, SpoolFlusher
+from gazetteer import default_gazetteer
+from analytics import IncrementalAnalytics, StreamingAnalytics
+from ndjson_stream import streaming_stdout
+from nlp_executor import load_models, shared_executor, text_features, text_polarity
+from post_model import Post
+from serialization import write_output
 
 # === CONFIGURATION ===
 # Load environment variables
 TWITTER_BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN', 'AAAAAAAAAAAAAAAAAAAAAOnS3wEAAAAAAYVNy0cKH%2FdLmyZIfNFs76Y%2BPmI%3Dd7TFqbMScFTpvyrg7oxvDQ0VrFgtuKhyweointfslpbAGifWnq')
 
-# Load spaCy English model for Named Entity Recognition
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model 'en_core_web_sm'...")
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
-
-# Initialize geolocator with a custom user_agent
-geolocator = Nominatim(user_agent="corsair_ocean_hazard_app")
+# Models, clients and stores are set up by _init() on first use, not on import:
+# NLP pool workers import this script as a module and must not start them again
+nlp_models = None
+nlp = None
+nlp_executor = None
+gazetteer = None
+geolocator = None
+db = None
+writer = None
+spool = None
+flusher = None
+analytics_store = None
 
-# Initialize Firebase Admin (if not already initialized)
-try:
-    if not firebase_admin._apps:
-        # Use the same service account as your Next.js app
-        cred = credentials.Certificate("firebase-admin-key.json")
-        firebase_admin.initialize_app(cred)
-    db = firestore.client()
-except Exception as e:
-    print(f"Firebase initialization warning: {e}")
-    db = None
+def _init():
+    """Load the models and open the clients and stores, once per process"""
+    global nlp_models, nlp, nlp_executor, gazetteer, geolocator
+    global db, writer, spool, flusher, analytics_store
+    if nlp_models is not None:
+        return
+    
+    # Load spaCy English model for Named Entity Recognition (downloaded on first use)
+    nlp_models = load_models(('textblob', 'spacy'))
+    nlp = nlp_models['spacy']
+    
+    # Batches of tweets are analysed on worker processes that load the same models;
+    # tweets the gazetteer already placed only need their polarity, on the same pool
+    nlp_executor = shared_executor(text_features)
+    
+    # Known coastal places resolve without spaCy or geocoding
+    gazetteer = default_gazetteer()
+    
+    # Initialize geolocator with a custom user_agent
+    geolocator = Nominatim(user_agent="corsair_ocean_hazard_app")
+    
+    # Initialize Firebase Admin (if not already initialized)
+    # Uses the same service account as your Next.js app
+    db = get_firestore_client()
+    writer = FirestoreBatchWriter(db, shadow=FirestoreShadow()) if db else None
+    
+    # Durable upload queue; documents wait here while Firestore is unavailable
+    spool = FirestoreSpool()
+    flusher = SpoolFlusher(spool, writer) if writer else None
+    if flusher:
+        flusher.start()
+    
+    # Cumulative analytics shared with the other services uploading to social_media_posts
+    analytics_store = IncrementalAnalytics('social_media_posts')
 
 def is_location_coastal_india(location_name):
     """
     Enhanced location checking for coastal areas in India.
     Returns True if the location is in coastal India, else False.
     """
+    _init()
     coastal_keywords = [
         'beach', 'coast', 'port', 'marina', 'harbor', 'harbour', 
         'bay', 'gulf', 'sea', 'ocean', 'shore', 'waterfront'
@@ -66,24 +96,36 @@ def is_location_coastal_india(location_name):
         print(f"Geocoding error for '{location_name}': {e}")
         return False
 
-def extract_location_from_text(text):
+def extract_location_from_text(text, locations=None):
     """
     Extracts location entities (GPE or LOC) from text using spaCy NER.
-    Returns the first location entity found or None.
+    Returns the first location entity found or None. Pass `locations`
+    from text_features to skip running spaCy again.
     """
-    doc = nlp(text)
-    for ent in doc.ents:
-        if ent.label_ in ("GPE", "LOC"):
-            return ent.text
-    return None
+    _init()
+    if locations is None:
+        locations = [ent.text for ent in nlp(text).ents if ent.label_ in ("GPE", "LOC")]
+    return locations[0] if locations else None
+
+def gazetteer_location(place):
+    """location_info for a place the gazetteer resolved"""
+    return {
+        'type': 'gazetteer',
+        'name': place.name,
+        'state': place.state,
+        'country': 'India',
+        'coordinates': place.coordinates()
+    }
 
-def analyze_sentiment(text):
+def analyze_sentiment(text, polarity=None):
     """
     Enhanced sentiment analysis with severity scoring.
-    Returns sentiment and urgency level.
+    Returns sentiment and urgency level. Pass a precomputed TextBlob
+    `polarity` to skip recomputing it.
     """
-    analysis = TextBlob(text)
-    polarity = analysis.sentiment.polarity
+    _init()
+    if polarity is None:
+        polarity = nlp_models['textblob'](text).sentiment.polarity
     
     # Determine sentiment
     if polarity > 0.1:
@@ -138,11 +180,13 @@ def extract_hazard_type(text):
     
     return 'unknown'
 
-def search_coastal_hazard_tweets(keywords=None, max_results=50):
+def search_coastal_hazard_tweets(keywords=None, max_results=50, on_tweet=None):
     """
     Searches for tweets related to coastal hazards in India.
-    Enhanced for CORSAIR integration.
+    Enhanced for CORSAIR integration. `on_tweet` is called with each
+    relevant tweet as soon as it is analysed.
     """
+    _init()
     if keywords is None:
         keywords = [
             "coastal flooding", "tsunami warning", "high tide", "storm surge",
@@ -160,6 +204,9 @@ def search_coastal_hazard_tweets(keywords=None, max_results=50):
     # Enhanced query for coastal hazards
     query = f"({' OR '.join(keywords)}) (India OR coastal OR beach OR shore) -is:retweet lang:en"
     
+    # Pool workers load their models while the search request is in flight
+    nlp_executor.start()
+    
     try:
         tweets_response = client.search_recent_tweets(
             query=query,
@@ -178,29 +225,54 @@ def search_coastal_hazard_tweets(keywords=None, max_results=50):
         places = {place.id: place for place in tweets_response.includes.get('places', [])}
         users = {user.id: user for user in tweets_response.includes.get('users', [])}
         
+        # A tweet's geo place decides first: outside India it is dropped, in India it
+        # needs no lookup. Otherwise the gazetteer, and spaCy NER only when that finds nothing.
+        tweets = tweets_response.data
+        geo_places = [places.get(tweet.geo.get('place_id')) if tweet.geo else None for tweet in tweets]
+        known_places = [None if place else gazetteer.first(tweet.text) for tweet, place in zip(tweets, geo_places)]
+        needs_ner = [place is None and known_place is None for place, known_place in zip(geo_places, known_places)]
+        ner_features = iter(nlp_executor.map(
+            [tweet.text for tweet, ner in zip(tweets, needs_ner) if ner]))
+        polarities = iter(nlp_executor.map(
+            [tweet.text for tweet, place, ner in zip(tweets, geo_places, needs_ner)
+             if not ner and (place is None or place.country_code == "IN")], task=text_polarity))
+        
         filtered_results = []
-        for tweet in tweets_response.data:
+        for tweet, place, known_place, ner in zip(tweets, geo_places, known_places, needs_ner):
+            if place and place.country_code != "IN":
+                continue
+            if ner:
+                tweet_features = next(ner_features)
+            else:
+                tweet_features = {'polarity': next(polarities), 'locations': []}
             is_coastal_india = False
             location_info = None
             
             # Check geo information
-            place = places.get(tweet.geo.get('place_id')) if tweet.geo else None
-            if place and place.country_code == "IN":
+            if place:
                 is_coastal_india = True
                 location_info = {
                     'type': 'geo',
                     'name': place.full_name,
                     'country': place.country
                 }
+            elif known_place:
+                is_coastal_india = True
+                location_info = gazetteer_location(known_place)
             else:
                 # Extract location from text or user profile
-                location_name = extract_location_from_text(tweet.text)
+                location_name = extract_location_from_text(tweet.text, tweet_features['locations'])
                 user = users.get(tweet.author_id)
                 
+                profile_place = None
                 if not location_name and user and user.location:
+                    profile_place = gazetteer.first(user.location)
                     location_name = user.location
                 
-                if location_name:
+                if profile_place:
+                    is_coastal_india = True
+                    location_info = gazetteer_location(profile_place)
+                elif location_name:
                     is_coastal_india = is_location_coastal_india(location_name)
                     if is_coastal_india:
                         location_info = {
@@ -211,34 +283,37 @@ def search_coastal_hazard_tweets(keywords=None, max_results=50):
             
             if is_coastal_india:
                 # Analyze the tweet
-                sentiment_data = analyze_sentiment(tweet.text)
+                sentiment_data = analyze_sentiment(tweet.text, tweet_features['polarity'])
                 hazard_type = extract_hazard_type(tweet.text)
                 user_info = users.get(tweet.author_id)
                 
-                tweet_data = {
-                    'id': tweet.id,
-                    'text': tweet.text,
-                    'created_at': tweet.created_at.isoformat() if tweet.created_at else None,
-                    'author': {
-                        'username': user_info.username if user_info else None,
-                        'name': user_info.name if user_info else None,
-                        'location': user_info.location if user_info else None
-                    },
-                    'location': location_info,
-                    'sentiment': sentiment_data['sentiment'],
-                    'polarity': sentiment_data['polarity'],
-                    'urgency': sentiment_data['urgency'],
-                    'hazard_type': hazard_type,
-                    'metrics': {
+                tweet_data = Post(
+                    id=tweet.id,
+                    text=tweet.text,
+                    created_at=tweet.created_at.isoformat() if tweet.created_at else None,
+                    author=user_info.username if user_info else None,
+                    author_name=user_info.name if user_info else None,
+                    author_location=user_info.location if user_info else None,
+                    location=location_info['name'],
+                    location_type=location_info['type'],
+                    country=location_info.get('country'),
+                    location_state=location_info.get('state'),
+                    coordinates=location_info.get('coordinates'),
+                    sentiment=sentiment_data['sentiment'],
+                    polarity=sentiment_data['polarity'],
+                    urgency=sentiment_data['urgency'],
+                    hazard_type=hazard_type,
+                    engagement={
                         'retweet_count': tweet.public_metrics.get('retweet_count', 0),
                         'like_count': tweet.public_metrics.get('like_count', 0),
                         'reply_count': tweet.public_metrics.get('reply_count', 0)
                     } if tweet.public_metrics else {},
-                    'processed_at': datetime.now().isoformat(),
-                    'source': 'twitter'
-                }
+                    source='twitter'
+                )
                 
                 filtered_results.append(tweet_data)
+                if on_tweet:
+                    on_tweet(tweet_data.build_api())
         
         return filtered_results
     
@@ -251,25 +326,22 @@ def search_coastal_hazard_tweets(keywords=None, max_results=50):
 
 def save_to_firestore(tweets_data):
     """
-    Saves social media data to Firestore for CORSAIR integration.
+    Queues social media data for Firestore upload for CORSAIR integration.
+    The spool flusher delivers it in the background.
     """
-    if not db:
-        print("Firestore not initialized. Skipping database save.")
-        return False
-    
+    _init()
     try:
-        batch = db.batch()
-        collection_ref = db.collection('social_media_posts')
-        
-        for tweet in tweets_data:
-            doc_ref = collection_ref.document(f"twitter_{tweet['id']}")
-            batch.set(doc_ref, tweet, merge=True)
-        
-        batch.commit()
-        print(f"Saved {len(tweets_data)} tweets to Firestore.")
+        queued = spool.enqueue(
+            'social_media_posts', ((f"twitter_{tweet.id}", tweet.build_api()) for tweet in tweets_data)
+        )
+        if flusher:
+            flusher.notify()
+            print(f"Queued {queued} tweets for Firestore upload.")
+        else:
+            print(f"Firestore not initialized. Kept {queued} tweets in the upload spool for a later run.")
         return True
     except Exception as e:
-        print(f"Error saving to Firestore: {e}")
+        print(f"Error queueing tweets for Firestore: {e}")
         return False
 
 def get_analytics_summary(tweets_data):
@@ -279,90 +351,81 @@ def get_analytics_summary(tweets_data):
     if not tweets_data:
         return {}
     
-    total_tweets = len(tweets_data)
-    sentiments = [tweet['sentiment'] for tweet in tweets_data]
-    urgency_levels = [tweet['urgency'] for tweet in tweets_data]
-    hazard_types = [tweet['hazard_type'] for tweet in tweets_data]
-    
-    summary = {
-        'total_mentions': total_tweets,
-        'sentiment_breakdown': {
-            'positive': sentiments.count('Positive'),
-            'negative': sentiments.count('Negative'),
-            'neutral': sentiments.count('Neutral')
-        },
-        'urgency_breakdown': {
-            'high': urgency_levels.count('high'),
-            'medium': urgency_levels.count('medium'),
-            'low': urgency_levels.count('low')
-        },
-        'hazard_types': {hazard: hazard_types.count(hazard) for hazard in set(hazard_types)},
-        'engagement_stats': {
-            'avg_likes': sum(tweet['metrics'].get('like_count', 0) for tweet in tweets_data) / total_tweets,
-            'avg_retweets': sum(tweet['metrics'].get('retweet_count', 0) for tweet in tweets_data) / total_tweets,
-            'total_engagement': sum(
-                tweet['metrics'].get('like_count', 0) + 
-                tweet['metrics'].get('retweet_count', 0) + 
-                tweet['metrics'].get('reply_count', 0) 
-                for tweet in tweets_data
-            )
-        },
-        'last_updated': datetime.now().isoformat()
-    }
-    
-    return summary
+    return StreamingAnalytics().extend(tweets_data).result()
 
-def main():
+def run_monitor(keywords=None, on_tweet=None):
     """
-    Main function that can be called from Node.js or run standalone.
+    Searches, stores and summarises tweets; returns the output document.
+    `on_tweet` receives each tweet as soon as it is classified.
     """
-    # Get keywords from command line arguments or use defaults
-    keywords = None
-    if len(sys.argv) > 1:
-        keywords = sys.argv[1].split(',')
-    
+    _init()
     print("🌊 CORSAIR Social Media Monitor Starting...")
     print(f"Searching for coastal hazard tweets with keywords: {keywords or 'default set'}")
     
     # Search for tweets
-    tweets_data = search_coastal_hazard_tweets(keywords)
+    tweets_data = search_coastal_hazard_tweets(keywords, on_tweet=on_tweet)
     
-    if tweets_data:
-        print(f"\n✅ Found {len(tweets_data)} relevant tweets from coastal India")
-        
-        # Save to Firestore
-        save_to_firestore(tweets_data)
-        
-        # Generate analytics
-        analytics = get_analytics_summary(tweets_data)
-        
-        # Output results as JSON for Node.js integration
-        output = {
-            'success': True,
-            'tweets': tweets_data,
-            'analytics': analytics,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        print(json.dumps(output, indent=2))
-        
-        # Also save analytics to Firestore
-        if db:
-            try:
-                db.collection('social_media_analytics').document('latest').set(analytics, merge=True)
-                print("📊 Analytics saved to Firestore")
-            except Exception as e:
-                print(f"Error saving analytics: {e}")
-    
-    else:
-        output = {
+    if not tweets_data:
+        return {
             'success': False,
             'message': 'No relevant tweets found',
             'tweets': [],
             'analytics': {},
             'timestamp': datetime.now().isoformat()
         }
-        print(json.dumps(output))
+    
+    print(f"\n✅ Found {len(tweets_data)} relevant tweets from coastal India")
+    
+    # Save to Firestore
+    save_to_firestore(tweets_data)
+    
+    # Generate analytics
+    analytics = get_analytics_summary(tweets_data)
+    
+    # Also save cumulative analytics to Firestore, ahead of queued tweets
+    try:
+        analytics_store.apply(tweets_data, id_of=lambda tweet: f"twitter_{tweet.id}")
+        spool.enqueue('social_media_analytics', [('latest', analytics_store.summary())], priority_of=lambda _: 0)
+        print("📊 Analytics queued for Firestore")
+    except Exception as e:
+        print(f"Error saving analytics: {e}")
+    
+    # Give the upload a bounded head start; anything left stays spooled for the next run
+    if flusher:
+        flusher.drain(timeout=10)
+        print(f"📤 Firestore upload: {flusher.totals}, spool: {spool.stats()}")
+    
+    return {
+        'success': True,
+        'tweets': tweets_data,
+        'analytics': analytics,
+        'timestamp': datetime.now().isoformat()
+    }
+
+def main():
+    """
+    Main function that can be called from Node.js or run standalone.
+    With --stream, prints one JSON line per tweet and a final summary line;
+    all other output goes to stderr.
+    """
+    stream = '--stream' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--stream']
+    
+    # Get keywords from command line arguments or use defaults
+    keywords = None
+    if args:
+        keywords = args[0].split(',')
+    
+    if stream:
+        with streaming_stdout() as emitter:
+            output = run_monitor(keywords, on_tweet=emitter.post)
+            output.pop('tweets')
+            emitter.summary(output)
+        return
+    
+    # Output results as JSON for Node.js integration, after all log lines
+    output = run_monitor(keywords)
+    write_output(output)
 
 if __name__ == "__main__":
     main()
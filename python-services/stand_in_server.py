@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the public sources the scrapers poll
+Serves the endpoints the scrapers use, with content generated from the
+synthetic corpus (synthetic_corpus.py), so concurrency, rate limiting and
+failure handling can be load-tested against sources we control:
+
+  /r/<subreddit>/hot.json, /r/<subreddit>/new.json   Reddit listings
+  /alerts/active                                     api.weather.gov GeoJSON alerts
+  /cap/...  (or any path on alerts.weather.gov)      NOAA CAP Atom feeds
+  /search?f=tweets&q=...                             Nitter search HTML
+  anything else                                      RSS 2.0 (Atom if the path mentions atom)
+
+Each response carries the next posts of its shape's corpus, so repeated
+polls see new posts. Latency follows a configurable distribution per
+source kind. A seeded share of requests can be answered with 429, left
+hanging past the client timeout, or given a truncated (malformed)
+payload. GET /_stats reports requests and injected faults by kind.
+
+  python stand_in_server.py --port 8799 --latency lognormal:0.2,0.5 \\
+      --latency reddit=fixed:1.5 --rate-limited 0.05 --timeouts 0.02 --malformed 0.05
+
+Point the scrapers at it with CORSAIR_SOURCE_OVERRIDE=http://127.0.0.1:8799
+(see http_session.py): every request then goes to the stand-in, with the
+original host as the first path segment.
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape as xml_escape
+
+from serialization import dumps
+from synthetic_corpus import CorpusConfig, CorpusGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8799
+KINDS = ('reddit', 'alerts', 'cap', 'nitter', 'rss')
+# Corpus shape each source kind serves
+KIND_SHAPES = {'reddit': 'reddit', 'alerts': 'cap', 'cap': 'cap', 'nitter': 'tweet', 'rss': 'news'}
+# Hanging requests outlast the scrapers' 10 second timeout
+DEFAULT_HANG_SECONDS = 15.0
+
+
+# --- latency distributions ---
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """'0', 'fixed:0.2', 'uniform:0.05,0.5', 'exponential:0.2' or 'lognormal:MEDIAN,SIGMA' (seconds)"""
+    name, _, args = spec.strip().partition(':')
+    try:
+        values = [float(value) for value in args.split(',')] if args else []
+        if name in ('0', 'none') and not values:
+            return lambda rng: 0.0
+        if name == 'fixed' and len(values) == 1:
+            return lambda rng: values[0]
+        if name == 'uniform' and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if name == 'exponential' and len(values) == 1 and values[0] > 0:
+            return lambda rng: rng.expovariate(1 / values[0])
+        if name == 'lognormal' and len(values) == 2 and values[0] > 0:
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    except ValueError:
+        pass
+    raise ValueError(f"bad latency distribution {spec!r}")
+
+
+@dataclass
+class StandInConfig:
+    """Content and fault settings; equal seeds give the same content and fault sequence"""
+    seed: int = 7
+    corpus_size: int = 5000
+    items: int = 10
+    # Latency spec per source kind; 'default' applies to the rest
+    latency: Dict[str, str] = field(default_factory=lambda: {'default': '0'})
+    rate_limited: float = 0.0
+    retry_after: int = 5
+    timeouts: float = 0.0
+    hang_seconds: float = DEFAULT_HANG_SECONDS
+    malformed: float = 0.0
+
+
+class StandInSources:
+    """Generated content, fault decisions and request counts shared by the handler threads"""
+
+    def __init__(self, config: Optional[StandInConfig] = None):
+        self.config = config or StandInConfig()
+        unknown = set(self.config.latency) - set(KINDS) - {'default'}
+        if unknown:
+            raise ValueError(f"unknown source kinds: {', '.join(sorted(unknown))}")
+        self.lock = threading.Lock()
+        self.rng = random.Random(self.config.seed)
+        default = parse_latency(self.config.latency.get('default', '0'))
+        self.latency = {kind: parse_latency(self.config.latency[kind]) if kind in self.config.latency else default
+                        for kind in KINDS}
+        self._corpora: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursors: Dict[str, int] = {}
+        self.stats: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+
+    def _corpus(self, shape: str) -> List[Dict[str, Any]]:
+        corpus = self._corpora.get(shape)
+        if corpus is None:
+            # Recent timestamps, so freshness filters treat the posts as new
+            config = CorpusConfig(count=self.config.corpus_size, seed=self.config.seed, shape_mix={shape: 1.0},
+                                  start=datetime.now(timezone.utc) - timedelta(days=1), span_days=1.0)
+            corpus = self._corpora[shape] = [record['data'] for record in CorpusGenerator(config)]
+        return corpus
+
+    def take(self, kind: str, count: int) -> List[Dict[str, Any]]:
+        """The next `count` posts of the kind's corpus, wrapping around at the end"""
+        shape = KIND_SHAPES[kind]
+        with self.lock:
+            corpus = self._corpus(shape)
+            start = self._cursors.get(shape, 0)
+            self._cursors[shape] = (start + count) % len(corpus)
+        return [dict(corpus[(start + offset) % len(corpus)]) for offset in range(count)]
+
+    def decide(self, kind: str) -> Tuple[str, float]:
+        """(outcome, latency) for one request: outcome is ok, rate_limited, timeout or malformed"""
+        config = self.config
+        with self.lock:
+            roll = self.rng.random()
+            latency = max(0.0, self.latency[kind](self.rng))
+            if roll < config.timeouts:
+                outcome = 'timeout'
+            elif roll < config.timeouts + config.rate_limited:
+                outcome = 'rate_limited'
+            elif roll < config.timeouts + config.rate_limited + config.malformed:
+                outcome = 'malformed'
+            else:
+                outcome = 'ok'
+            counts = self.stats[kind]
+            counts[outcome] = counts.get(outcome, 0) + 1
+        return outcome, latency
+
+    def truncate(self, body: bytes) -> bytes:
+        """Cut a payload off mid-document, as a dropped upstream connection would"""
+        with self.lock:
+            return body[:max(1, int(len(body) * self.rng.uniform(0.2, 0.8)))]
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            return {kind: dict(counts) for kind, counts in self.stats.items() if counts}
+
+
+# --- payloads ---
+
+def route(host: str, path: str) -> str:
+    """Source kind for a request, from the original host and path"""
+    parts = [part for part in path.split('/') if part]
+    if len(parts) >= 3 and parts[0] == 'r' and parts[2] in ('hot.json', 'new.json'):
+        return 'reddit'
+    if path.rstrip('/') == '/alerts/active':
+        return 'alerts'
+    if parts[:1] == ['cap'] or host == 'alerts.weather.gov':
+        return 'cap'
+    if path.rstrip('/') == '/search':
+        return 'nitter'
+    return 'rss'
+
+
+def reddit_listing(posts: List[Dict[str, Any]], subreddit: str) -> Tuple[bytes, str]:
+    for post in posts:
+        post.update(subreddit=subreddit, subreddit_name_prefixed=f"r/{subreddit}",
+                    permalink=f"/r/{subreddit}/comments/{post['id']}/")
+    listing = {'kind': 'Listing', 'data': {
+        'after': None, 'dist': len(posts), 'children': [{'kind': 't3', 'data': post} for post in posts]
+    }}
+    return dumps(listing), 'application/json; charset=UTF-8'
+
+
+def alerts_geojson(alerts: List[Dict[str, Any]]) -> Tuple[bytes, str]:
+    features = [{
+        'id': f"urn:oid:{alert['id']}",
+        'type': 'Feature',
+        'geometry': None,
+        'properties': {
+            'id': alert['id'], 'areaDesc': alert['areaDesc'], 'sent': alert['updated'],
+            'event': alert['event'], 'severity': alert['severity'], 'headline': alert['title'],
+            'description': alert['summary'], 'senderName': 'India Meteorological Department',
+            'web': alert['link']
+        }
+    } for alert in alerts]
+    return dumps({'type': 'FeatureCollection', 'features': features}), 'application/geo+json'
+
+
+def cap_atom(alerts: List[Dict[str, Any]], url: str) -> Tuple[bytes, str]:
+    entries = ''.join(
+        f"<entry><id>{xml_escape(alert['link'])}</id><updated>{alert['updated']}</updated>"
+        f"<title>{xml_escape(alert['title'])}</title><link href=\"{xml_escape(alert['link'])}\"/>"
+        f"<summary>{xml_escape(alert['summary'])}</summary><cap:event>{xml_escape(alert['event'])}</cap:event>"
+        f"<cap:severity>{alert['severity']}</cap:severity>"
+        f"<cap:areaDesc>{xml_escape(alert['areaDesc'])}</cap:areaDesc></entry>"
+        for alert in alerts
+    )
+    body = ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:cap="urn:oasis:names:tc:emergency:cap:1.2">'
+            f"<id>{xml_escape(url)}</id><title>Current Watches, Warnings and Advisories</title>"
+            f"<updated>{datetime.now(timezone.utc).isoformat()}</updated>{entries}</feed>")
+    return body.encode('utf-8'), 'application/atom+xml'
+
+
+def news_feed(stories: List[Dict[str, Any]], url: str, atom: bool = False) -> Tuple[bytes, str]:
+    if atom:
+        entries = ''.join(
+            f"<entry><id>{xml_escape(story['link'])}</id><title>{xml_escape(story['title'])}</title>"
+            f"<link href=\"{xml_escape(story['link'])}\"/><summary>{xml_escape(story['summary'])}</summary>"
+            f"<updated>{datetime.strptime(story['published'], '%a, %d %b %Y %H:%M:%S %z').isoformat()}</updated>"
+            f"</entry>"
+            for story in stories
+        )
+        body = ('<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+                f"<id>{xml_escape(url)}</id><title>Stand-in feed</title>{entries}</feed>")
+        return body.encode('utf-8'), 'application/atom+xml'
+    items = ''.join(
+        f"<item><title>{xml_escape(story['title'])}</title><link>{xml_escape(story['link'])}</link>"
+        f"<guid>{xml_escape(story['link'])}</guid><description>{xml_escape(story['summary'])}</description>"
+        f"<pubDate>{story['published']}</pubDate></item>"
+        for story in stories
+    )
+    body = ('<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Stand-in feed</title><link>{xml_escape(url)}</link>{items}</channel></rss>")
+    return body.encode('utf-8'), 'application/rss+xml; charset=UTF-8'
+
+
+def nitter_search(tweets: List[Dict[str, Any]]) -> Tuple[bytes, str]:
+    items = ''.join(
+        f'<div class="timeline-item"><div class="tweet-body"><div class="tweet-header">'
+        f'<a class="fullname" href="/{tweet["handle"]}">{escape(tweet["username"])}</a>'
+        f'<a class="username" href="/{tweet["handle"]}">@{tweet["handle"]}</a>'
+        f'<span class="tweet-date"><a href="/{tweet["handle"]}/status/{tweet["tweet_id"]}" '
+        f'title="{tweet["timestamp"]}">{tweet["timestamp"]}</a></span></div>'
+        f'<div class="tweet-content media-body">{escape(tweet["content"])}</div>'
+        f'<div class="tweet-stats"><span class="tweet-stat">{tweet["replies"]}</span>'
+        f'<span class="tweet-stat">{tweet["retweets"]}</span><span class="tweet-stat">{tweet["likes"]}</span>'
+        f'</div></div></div>'
+        for tweet in tweets
+    )
+    body = f'<!DOCTYPE html><html><body><div class="timeline">{items}</div></body></html>'
+    return body.encode('utf-8'), 'text/html; charset=utf-8'
+
+
+def render(sources: StandInSources, kind: str, host: str, path: str,
+           params: Dict[str, str]) -> Tuple[bytes, str]:
+    """Response body and content type for one request"""
+    url = f"https://{host or 'stand-in'}{path}"
+    if kind == 'reddit':
+        count = max(1, min(int(params.get('limit', 25)), 100))
+        return reddit_listing(sources.take(kind, count), path.split('/')[2])
+    if kind == 'alerts':
+        return alerts_geojson(sources.take(kind, sources.config.items))
+    if kind == 'cap':
+        return cap_atom(sources.take(kind, sources.config.items), url)
+    if kind == 'nitter':
+        return nitter_search(sources.take(kind, sources.config.items))
+    return news_feed(sources.take(kind, sources.config.items), url, atom='atom' in path.lower())
+
+
+def split_target(path: str) -> Tuple[str, str]:
+    """'/www.reddit.com/r/india/hot.json' -> ('www.reddit.com', '/r/india/hot.json'); plain paths have no host"""
+    first, _, rest = path.lstrip('/').partition('/')
+    if '.' in first and not first.endswith(('.json', '.xml', '.rss', '.atom')):
+        return first, '/' + rest
+    return '', path
+
+
+# --- server ---
+
+def make_handler(sources: StandInSources):
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = 'CorsairStandIn/1.0'
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/_stats':
+                self._send(200, dumps({'sources': sources.snapshot()}), 'application/json')
+                return
+            host, path = split_target(url.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            kind = route(host, path)
+            outcome, latency = sources.decide(kind)
+
+            if outcome == 'timeout':
+                # Hold the connection open without answering, then drop it
+                time.sleep(sources.config.hang_seconds)
+                self.close_connection = True
+                return
+            if latency:
+                time.sleep(latency)
+            if outcome == 'rate_limited':
+                self._send(429, dumps({'message': 'Too Many Requests', 'error': 429}), 'application/json',
+                           {'Retry-After': str(sources.config.retry_after)})
+                return
+            try:
+                body, content_type = render(sources, kind, host, path, params)
+            except (ValueError, IndexError) as e:
+                self._send(400, dumps({'error': str(e)}), 'application/json')
+                return
+            if outcome == 'malformed':
+                body = sources.truncate(body)
+            self._send(200, body, content_type)
+
+        def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return Handler
+
+
+def start(config: Optional[StandInConfig] = None, host: str = DEFAULT_HOST,
+          port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Serve in a background thread (port 0 picks a free port); stop with server.shutdown()"""
+    server = ThreadingHTTPServer((host, port), make_handler(StandInSources(config)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='stand-in-server', daemon=True).start()
+    return server
+
+
+def parse_latency_options(values: List[str]) -> Dict[str, str]:
+    """['lognormal:0.2,0.5', 'reddit=fixed:1'] -> {'default': 'lognormal:0.2,0.5', 'reddit': 'fixed:1'}"""
+    latency = {'default': '0'}
+    for value in values:
+        kind, _, spec = value.rpartition('=')
+        latency[kind or 'default'] = spec
+    for spec in latency.values():
+        parse_latency(spec)
+    return latency
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve synthetic stand-ins for the scrapers' sources")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--seed', type=int, default=StandInConfig.seed)
+    parser.add_argument('--items', type=int, default=StandInConfig.items, help="Posts per feed response")
+    parser.add_argument('--latency', action='append', default=[], metavar='[KIND=]SPEC',
+                        help=f"Latency distribution, optionally for one kind ({', '.join(KINDS)}); repeatable")
+    parser.add_argument('--rate-limited', type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument('--retry-after', type=int, default=StandInConfig.retry_after)
+    parser.add_argument('--timeouts', type=float, default=0.0, help="Share of requests left hanging")
+    parser.add_argument('--hang-seconds', type=float, default=DEFAULT_HANG_SECONDS)
+    parser.add_argument('--malformed', type=float, default=0.0, help="Share of responses cut off mid-payload")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        sources = StandInSources(StandInConfig(
+            seed=args.seed, items=args.items, latency=parse_latency_options(args.latency),
+            rate_limited=args.rate_limited, retry_after=args.retry_after, timeouts=args.timeouts,
+            hang_seconds=args.hang_seconds, malformed=args.malformed
+        ))
+    except ValueError as e:
+        parser.error(str(e))
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(sources))
+    server.daemon_threads = True
+    logger.info(f"Stand-in sources on http://{args.host}:{server.server_address[1]} "
+                f"(set CORSAIR_SOURCE_OVERRIDE to this URL)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic post corpus for load testing
+Generates any number of realistic posts in the raw shapes the services
+ingest (Reddit JSON children, RSS entries, NOAA CAP entries and scraped
+tweets) from a seed, so benchmarks replay the same workload every run.
+The hazard mix, Indian coastal place names, exact and near-duplicate rates
+and per-shape text length distributions are configurable. Output streams
+to NDJSON (gzip when the path ends in .gz) in constant memory:
+
+  python synthetic_corpus.py --count 1000000 --seed 7 --out corpus.ndjson.gz
+
+Each line is {"shape": ..., "data": {raw post}, "label": {...}}; the label
+records the intended hazard, place and duplicate relations. An exact
+duplicate repeats its original's shape and raw post; a near-duplicate
+keeps the shape and perturbs the text.
+"""
+
+import gzip
+import json
+import random
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from serialization import dumps, loads
+
+SHAPES = ('reddit', 'news', 'cap', 'tweet')
+
+DEFAULT_SHAPE_MIX = {'reddit': 0.35, 'news': 0.25, 'cap': 0.1, 'tweet': 0.3}
+
+# 'none' posts are off-topic chatter the relevance filters should drop
+DEFAULT_HAZARD_MIX = {
+    'cyclone': 0.16, 'monsoon_flooding': 0.14, 'coastal_flooding': 0.08, 'storm_surge': 0.07,
+    'tsunami': 0.03, 'high_tide': 0.06, 'beach_erosion': 0.05, 'marine_pollution': 0.05,
+    'rip_current': 0.04, 'sea_level_rise': 0.03, 'coral_bleaching': 0.02, 'none': 0.27
+}
+
+# Mean words per post body, by shape; lengths are log-normal around these
+DEFAULT_MEAN_WORDS = {'reddit': 60, 'news': 45, 'cap': 90, 'tweet': 28}
+LENGTH_SIGMA = 0.5
+MAX_TWEET_CHARS = 280
+
+# How many earlier posts duplicates are drawn from
+DUPLICATE_WINDOW = 2000
+
+PLACES = [
+    ('Mumbai', 'Maharashtra'), ('Ratnagiri', 'Maharashtra'), ('Alibag', 'Maharashtra'),
+    ('Chennai', 'Tamil Nadu'), ('Cuddalore', 'Tamil Nadu'), ('Nagapattinam', 'Tamil Nadu'),
+    ('Thoothukudi', 'Tamil Nadu'), ('Rameswaram', 'Tamil Nadu'), ('Kanyakumari', 'Tamil Nadu'),
+    ('Kolkata', 'West Bengal'), ('Digha', 'West Bengal'), ('Sagar Island', 'West Bengal'),
+    ('Kochi', 'Kerala'), ('Alappuzha', 'Kerala'), ('Kozhikode', 'Kerala'),
+    ('Thiruvananthapuram', 'Kerala'), ('Kollam', 'Kerala'), ('Panaji', 'Goa'), ('Vasco da Gama', 'Goa'),
+    ('Visakhapatnam', 'Andhra Pradesh'), ('Kakinada', 'Andhra Pradesh'), ('Machilipatnam', 'Andhra Pradesh'),
+    ('Nellore', 'Andhra Pradesh'), ('Puri', 'Odisha'), ('Paradip', 'Odisha'), ('Gopalpur', 'Odisha'),
+    ('Balasore', 'Odisha'), ('Mangaluru', 'Karnataka'), ('Udupi', 'Karnataka'), ('Karwar', 'Karnataka'),
+    ('Surat', 'Gujarat'), ('Kandla', 'Gujarat'), ('Porbandar', 'Gujarat'), ('Veraval', 'Gujarat'),
+    ('Dwarka', 'Gujarat'), ('Puducherry', 'Puducherry'), ('Karaikal', 'Puducherry'),
+    ('Daman', 'Dadra and Nagar Haveli and Daman and Diu'), ('Port Blair', 'Andaman and Nicobar Islands'),
+    ('Kavaratti', 'Lakshadweep')
+]
+
+SEAS = ['Bay of Bengal', 'Arabian Sea', 'Indian Ocean']
+
+HAZARD_PHRASES = {
+    'cyclone': ['cyclone {name} is intensifying over the {sea}', 'very severe cyclonic storm expected to cross near {place}',
+                'IMD issues cyclone warning for {state}', 'cyclonic storm brings strong winds to {place}'],
+    'monsoon_flooding': ['heavy rain causes waterlogging across {place}', 'monsoon flooding cuts off roads in {place}',
+                         'incessant rain leads to inundation in low lying areas of {place}'],
+    'coastal_flooding': ['coastal flooding reported along the {place} shore', 'tidal flooding enters homes near {place}',
+                         'sea water intrusion floods fishing hamlets in {state}'],
+    'storm_surge': ['storm surge of up to {metres} metres expected at {place}', 'surge warning issued for the {place} coast',
+                    'tidal surge damages the sea wall in {place}'],
+    'tsunami': ['tsunami warning issued for the {state} coast after an undersea earthquake',
+                'INCOIS monitoring tsunami risk for {place}', 'tsunami advisory lifted for {place}'],
+    'high_tide': ['high tide alert for {place} beaches this weekend', 'king tide of {metres} metres expected in {place}',
+                  'extreme tide floods the promenade at {place}'],
+    'beach_erosion': ['beach erosion has swallowed {metres} metres of shoreline at {place}',
+                      'coastal erosion threatens houses in {place}', 'shore erosion worsens after the monsoon in {state}'],
+    'marine_pollution': ['oil spill spotted off {place}', 'marine pollution from industrial discharge near {place}',
+                         'plastic waste and water contamination reported on {place} beach'],
+    'rip_current': ['rip current warning for swimmers at {place} beach', 'dangerous currents claim a life near {place}',
+                    'fishermen warning issued as strong undertow hits {place}'],
+    'sea_level_rise': ['sea level rise is submerging farmland around {place}', 'rising seas push {state} villages inland'],
+    'coral_bleaching': ['coral bleaching spreads across reefs near {place}', 'reef damage observed around {place}'],
+    'none': ['traffic jam near {place} station this morning', 'new cafe opened in {place}, great coffee',
+             'cricket match tickets for {place} sold out', 'power cut in parts of {place} for maintenance']
+}
+
+URGENT_PHRASES = ['Evacuate immediately.', 'Red alert in force.', 'Emergency teams deployed.', 'Stay indoors, this is urgent.']
+CALM_PHRASES = ['Situation is being monitored.', 'No damage reported so far.', 'Residents advised to stay informed.']
+FILLER = (
+    'local officials said the district administration has set up relief camps and control rooms while '
+    'fishermen were advised not to venture into the sea residents shared photos of the waterfront and '
+    'asked for updates schools remain open for now and the power supply has been restored in most areas '
+    'volunteers are distributing food and drinking water near the harbour the weather department will '
+    'issue another bulletin in the evening'
+).split()
+
+CAP_EVENTS = {
+    'cyclone': 'Cyclone Warning', 'storm_surge': 'Storm Surge Warning', 'tsunami': 'Tsunami Warning',
+    'coastal_flooding': 'Coastal Flood Warning', 'high_tide': 'High Tide Advisory', 'rip_current': 'Rip Current Statement',
+    'monsoon_flooding': 'Heavy Rainfall Warning'
+}
+CYCLONE_NAMES = ['Biparjoy', 'Michaung', 'Remal', 'Dana', 'Fengal', 'Asna', 'Tej', 'Hamoon']
+NEWS_FEEDS = ['https://www.thehindu.com/news/national/feeder/default.rss',
+              'https://timesofindia.indiatimes.com/rssfeeds/1221656.cms',
+              'https://indianexpress.com/section/india/feed/', 'https://feeds.hindustantimes.com/HT/HTTopNews']
+SUBREDDITS = ['india', 'mumbai', 'chennai', 'kolkata', 'kerala', 'goa', 'Odisha', 'weather', 'monsoon']
+DEFAULT_START = datetime(2025, 6, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class CorpusConfig:
+    """What to generate; equal configs (including the seed) give identical corpora"""
+    count: int = 10000
+    seed: int = 42
+    shape_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_SHAPE_MIX))
+    hazard_mix: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_HAZARD_MIX))
+    mean_words: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MEAN_WORDS))
+    duplicate_rate: float = 0.05
+    near_duplicate_rate: float = 0.10
+    start: datetime = DEFAULT_START
+    span_days: float = 30.0
+
+
+def _weighted(mix: Dict[str, float]) -> Tuple[List[str], List[float]]:
+    keys = list(mix)
+    cumulative, total = [], 0.0
+    for key in keys:
+        total += mix[key]
+        cumulative.append(total)
+    if total <= 0:
+        raise ValueError("mix weights must add up to more than zero")
+    return keys, cumulative
+
+
+class CorpusGenerator:
+    """Streams synthetic posts for a CorpusConfig"""
+
+    def __init__(self, config: Optional[CorpusConfig] = None):
+        self.config = config or CorpusConfig()
+        unknown = set(self.config.shape_mix) - set(SHAPES)
+        if unknown:
+            raise ValueError(f"unknown shapes: {', '.join(sorted(unknown))}")
+        unknown = set(self.config.hazard_mix) - set(HAZARD_PHRASES)
+        if unknown:
+            raise ValueError(f"unknown hazards: {', '.join(sorted(unknown))}")
+        self._shapes = _weighted(self.config.shape_mix)
+        self._hazards = _weighted(self.config.hazard_mix)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.generate()
+
+    def generate(self) -> Iterator[Dict[str, Any]]:
+        config = self.config
+        rng = random.Random(config.seed)
+        recent: deque = deque(maxlen=DUPLICATE_WINDOW)
+        step = config.span_days * 86400 / max(1, config.count)
+        for index in range(config.count):
+            created = config.start + timedelta(seconds=index * step + rng.uniform(0, step))
+            shape = rng.choices(self._shapes[0], cum_weights=self._shapes[1])[0]
+            roll = rng.random()
+            post_id = f"syn{config.seed}_{index:08d}"
+            if recent and roll < config.duplicate_rate:
+                # The same raw post seen again (a re-fetch or a second feed carrying it)
+                original = rng.choice(recent)
+                shape, hazard, place = original['shape'], original['hazard'], original['place']
+                data = dict(original['data'])
+                label = {'duplicate_of': original['id']}
+            else:
+                if recent and roll < config.duplicate_rate + config.near_duplicate_rate:
+                    # The same story reposted from the same kind of source
+                    original = rng.choice(recent)
+                    shape, hazard, place = original['shape'], original['hazard'], original['place']
+                    text = self._perturb(rng, original['text'])
+                    label = {'near_duplicate_of': original['id']}
+                else:
+                    hazard = rng.choices(self._hazards[0], cum_weights=self._hazards[1])[0]
+                    place = rng.choice(PLACES)
+                    text = self._text(rng, shape, hazard, place)
+                    label = {}
+                data = getattr(self, f"_{shape}")(rng, post_id, text, hazard, place, created)
+            if not label:
+                recent.append({'id': post_id, 'shape': shape, 'data': data, 'text': text,
+                               'hazard': hazard, 'place': place})
+            yield {
+                'shape': shape,
+                'data': data,
+                'label': {'id': post_id, 'hazard': hazard, 'place': place[0], 'state': place[1], **label}
+            }
+
+    # --- text ---
+
+    def _text(self, rng: random.Random, shape: str, hazard: str, place: Tuple[str, str]) -> str:
+        phrase = rng.choice(HAZARD_PHRASES[hazard]).format(
+            place=place[0], state=place[1], sea=rng.choice(SEAS),
+            name=rng.choice(CYCLONE_NAMES), metres=rng.randint(1, 6)
+        )
+        words = max(6, int(rng.lognormvariate(0, LENGTH_SIGMA) * self.config.mean_words[shape]))
+        sentences = [phrase[0].upper() + phrase[1:] + '.']
+        if hazard != 'none':
+            sentences.append(rng.choice(URGENT_PHRASES if rng.random() < 0.3 else CALM_PHRASES))
+        filler_words = words - sum(len(sentence.split()) for sentence in sentences)
+        if filler_words > 0:
+            start = rng.randrange(len(FILLER))
+            body = [FILLER[(start + i) % len(FILLER)] for i in range(filler_words)]
+            sentences.append(' '.join(body).capitalize() + '.')
+        text = ' '.join(sentences)
+        if shape == 'tweet':
+            text = text[:MAX_TWEET_CHARS - 12].rsplit(' ', 1)[0] + f" #{place[0].replace(' ', '')}"
+        return text
+
+    def _perturb(self, rng: random.Random, text: str) -> str:
+        """A near-duplicate: the same story with a prefix, a dropped word or a swapped word"""
+        words = text.split()
+        edit = rng.random()
+        if edit < 0.4:
+            words.insert(0, rng.choice(['UPDATE:', 'RT', 'Breaking:', 'via @IMDWeather']))
+        elif edit < 0.7 and len(words) > 8:
+            del words[rng.randrange(len(words))]
+        elif len(words) > 8:
+            i = rng.randrange(len(words) - 1)
+            words[i], words[i + 1] = words[i + 1], words[i]
+        else:
+            words.append(rng.choice(['#alert', '#India', '#weather']))
+        return ' '.join(words)
+
+    # --- shapes ---
+
+    def _reddit(self, rng, post_id, text, hazard, place, created) -> Dict[str, Any]:
+        title, _, selftext = text.partition('. ')
+        subreddit = rng.choice(SUBREDDITS)
+        ups = int(rng.paretovariate(1.2) * 5)
+        return {
+            'id': post_id, 'title': title, 'selftext': selftext,
+            'author': f"user_{rng.randrange(50000)}", 'created_utc': created.timestamp(),
+            'subreddit': subreddit, 'subreddit_name_prefixed': f"r/{subreddit}",
+            'ups': ups, 'score': ups - rng.randint(0, max(1, ups // 10)),
+            'num_comments': int(ups * rng.uniform(0.05, 0.4)),
+            'permalink': f"/r/{subreddit}/comments/{post_id}/"
+        }
+
+    def _news(self, rng, post_id, text, hazard, place, created) -> Dict[str, Any]:
+        title, _, summary = text.partition('. ')
+        feed = rng.choice(NEWS_FEEDS)
+        return {
+            'id': post_id, 'title': title, 'summary': summary, 'feed_url': feed,
+            'link': f"https://{feed.split('/')[2]}/news/{post_id}",
+            'published': created.strftime('%a, %d %b %Y %H:%M:%S +0000')
+        }
+
+    def _cap(self, rng, post_id, text, hazard, place, created) -> Dict[str, Any]:
+        event = CAP_EVENTS.get(hazard, 'Special Weather Statement')
+        return {
+            'id': post_id, 'title': f"{event} issued for {place[0]}, {place[1]}", 'summary': text,
+            'event': event, 'areaDesc': f"{place[0]}; {place[1]}",
+            'severity': rng.choice(['Extreme', 'Severe', 'Moderate', 'Minor']),
+            'updated': created.isoformat(), 'link': f"https://sachet.ndma.gov.in/cap/{post_id}"
+        }
+
+    def _tweet(self, rng, post_id, text, hazard, place, created) -> Dict[str, Any]:
+        if len(text) > MAX_TWEET_CHARS:
+            # A story reposted from a longer source
+            text = text[:MAX_TWEET_CHARS - 1].rsplit(' ', 1)[0] + '…'
+        handle = f"coastwatch_{rng.randrange(20000)}"
+        likes = int(rng.paretovariate(1.1) * 3)
+        return {
+            'username': handle.replace('_', ' ').title(), 'handle': handle, 'content': text,
+            'timestamp': created.strftime('%Y-%m-%d %H:%M'), 'retweets': int(likes * rng.uniform(0.1, 0.6)),
+            'likes': likes, 'replies': int(likes * rng.uniform(0.02, 0.2)), 'tweet_id': post_id,
+            'verified': rng.random() < 0.05, 'source': 'SYNTHETIC'
+        }
+
+
+def record_text(record: Dict[str, Any]) -> str:
+    """The text a service would classify for a corpus record"""
+    data = record['data']
+    shape = record['shape']
+    if shape == 'reddit':
+        return f"{data['title']} {data['selftext']}"
+    if shape == 'news':
+        return f"{data['title']}. {data['summary']}"
+    if shape == 'cap':
+        return f"{data['title']}: {data['summary']}"
+    return data['content']
+
+
+def _open(path: str, mode: str) -> BinaryIO:
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return open(path, mode + 'b')
+
+
+def write_ndjson(records: Iterable[Dict[str, Any]], out: Any = None) -> int:
+    """Write records to a path (or an open stream, default stdout); returns the count"""
+    if isinstance(out, str):
+        stream = _open(out, 'w')
+    else:
+        out = out or sys.stdout
+        stream = getattr(out, 'buffer', out)
+    written = 0
+    try:
+        for record in records:
+            stream.write(dumps(record) + b'\n')
+            written += 1
+    finally:
+        if isinstance(out, str):
+            stream.close()
+        else:
+            stream.flush()
+    return written
+
+
+def read_ndjson(path: str, limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Stream records back from a corpus file"""
+    with _open(path, 'r') as f:
+        for index, line in enumerate(f):
+            if limit is not None and index >= limit:
+                return
+            yield loads(line)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """'reddit=0.5,tweet=0.5' -> {'reddit': 0.5, 'tweet': 0.5}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic post corpus as NDJSON")
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', help="Output path (.gz to compress); default stdout")
+    parser.add_argument('--shapes', type=parse_mix, help="Shape mix, e.g. reddit=0.4,news=0.2,cap=0.1,tweet=0.3")
+    parser.add_argument('--hazards', type=parse_mix, help="Hazard mix, e.g. cyclone=0.5,none=0.5")
+    parser.add_argument('--duplicate-rate', type=float, default=0.05)
+    parser.add_argument('--near-duplicate-rate', type=float, default=0.10)
+    parser.add_argument('--span-days', type=float, default=30.0)
+    args = parser.parse_args()
+
+    config = CorpusConfig(count=args.count, seed=args.seed, duplicate_rate=args.duplicate_rate,
+                          near_duplicate_rate=args.near_duplicate_rate, span_days=args.span_days)
+    if args.shapes:
+        config.shape_mix = args.shapes
+    if args.hazards:
+        config.hazard_mix = args.hazards
+    written = write_ndjson(CorpusGenerator(config), args.out)
+    if args.out:
+        print(json.dumps({'written': written, 'out': args.out, 'seed': args.seed}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Lightweight span tracing for scrape and monitoring runs
+A span times one step (a run, a source, an HTTP request, parsing,
+classification, a database write) with attributes such as the URL, status
+and item counts. Spans nest through a context variable, so a span opened
+inside another becomes its child. Pipeline stages also link each span to
+the span that produced its input. That is how the critical path follows
+one item through fetch -> parse -> classify -> persist across worker
+threads.
+
+Tracing is off unless an exporter is configured, e.g. with
+CORSAIR_TRACE=run.jsonl (one JSON object per span) or, with
+CORSAIR_TRACE_FORMAT=otlp, OTLP/JSON ExportTraceServiceRequest lines that
+an OpenTelemetry collector's file receiver can read. Summarise a trace:
+
+  python tracing.py summary run.jsonl     # critical path of the latest run
+"""
+
+import atexit
+import bisect
+import contextvars
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from serialization import dumps, loads
+
+TRACE_FORMATS = ('jsonl', 'otlp')
+SERVICE_NAME = 'corsair-scraper'
+
+# OTLP status codes
+_STATUS_CODES = {'unset': 0, 'ok': 1, 'error': 2}
+
+
+class Span:
+    """One timed step; set attributes while it is open"""
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'links', 'attributes',
+                 'start_ns', 'end_ns', 'status', 'error')
+
+    def __init__(self, name: str, parent: Optional['Span'] = None,
+                 links: Sequence[str] = (), attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.links = list(links)
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = 'ok'
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_record(self) -> Dict[str, Any]:
+        record = {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'status': self.status,
+            'attributes': self.attributes
+        }
+        if self.links:
+            record['links'] = self.links
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class _NoopSpan(Span):
+    """Stands in for spans while tracing is off"""
+
+    def __init__(self):
+        pass
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current: contextvars.ContextVar = contextvars.ContextVar('corsair_span', default=None)
+_exporter = None
+_UNSET = object()
+
+
+# --- exporters ---
+
+class JsonLinesExporter:
+    """Appends one JSON object per finished span"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self._file = open(path, 'ab')
+
+    def export(self, span: Span):
+        line = dumps(span.to_record()) + b'\n'
+        with self.lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self.lock:
+            self._file.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    status = {'code': _STATUS_CODES[span.status]}
+    if span.error:
+        status['message'] = span.error
+    otlp = {
+        'traceId': span.trace_id,
+        'spanId': span.span_id,
+        'name': span.name,
+        'kind': 1,  # SPAN_KIND_INTERNAL
+        'startTimeUnixNano': str(span.start_ns),
+        'endTimeUnixNano': str(span.end_ns),
+        'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in span.attributes.items()],
+        'status': status
+    }
+    if span.parent_id:
+        otlp['parentSpanId'] = span.parent_id
+    if span.links:
+        otlp['links'] = [{'traceId': span.trace_id, 'spanId': link} for link in span.links]
+    return otlp
+
+
+class OtlpFileExporter:
+    """Writes each trace as one OTLP/JSON ExportTraceServiceRequest line when its root span ends"""
+
+    def __init__(self, path: str, service_name: str = SERVICE_NAME):
+        self.path = path
+        self.service_name = service_name
+        self.lock = threading.Lock()
+        self._pending: Dict[str, List[Span]] = defaultdict(list)
+        self._file = open(path, 'ab')
+
+    def export(self, span: Span):
+        with self.lock:
+            self._pending[span.trace_id].append(span)
+            if span.parent_id is None:
+                self._write(self._pending.pop(span.trace_id))
+
+    def _write(self, spans: List[Span]):
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'corsair.tracing'}, 'spans': [_otlp_span(span) for span in spans]}]
+        }]}
+        self._file.write(dumps(request) + b'\n')
+        self._file.flush()
+
+    def close(self):
+        with self.lock:
+            # Spans that ended after their root (or whose root never ended)
+            for spans in self._pending.values():
+                self._write(spans)
+            self._pending.clear()
+            self._file.close()
+
+
+def configure(path: Optional[str] = None, fmt: Optional[str] = None):
+    """Export spans to `path` (None turns tracing off)"""
+    global _exporter
+    fmt = fmt or 'jsonl'
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"trace format must be one of {', '.join(TRACE_FORMATS)}")
+    previous, _exporter = _exporter, None
+    if previous is not None:
+        previous.close()
+    if path:
+        _exporter = OtlpFileExporter(path) if fmt == 'otlp' else JsonLinesExporter(path)
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def current_span() -> Span:
+    return _current.get() or NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, parent: Any = _UNSET, links: Sequence[Span] = (), **attributes) -> Iterator[Span]:
+    """Time the with-block as a span, a child of the current span unless `parent` is given.
+
+    `links` are spans this one follows from (e.g. the pipeline stage that
+    produced its input). Exceptions mark the span as failed and propagate.
+    """
+    exporter = _exporter
+    if exporter is None:
+        yield NOOP_SPAN
+        return
+    if parent is _UNSET:
+        parent = _current.get()
+    if parent is NOOP_SPAN:
+        parent = None
+    current = Span(name, parent, [link.span_id for link in links if link is not None and link is not NOOP_SPAN],
+                   attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = 'error'
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        exporter.export(current)
+
+
+def _close():
+    if _exporter is not None:
+        _exporter.close()
+
+
+atexit.register(_close)
+configure(os.environ.get('CORSAIR_TRACE'), os.environ.get('CORSAIR_TRACE_FORMAT'))
+
+
+# --- reading and summarising ---
+
+def _from_otlp(request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for resource_spans in request.get('resourceSpans', []):
+        for scope_spans in resource_spans.get('scopeSpans', []):
+            for otlp in scope_spans.get('spans', []):
+                attributes = {}
+                for attribute in otlp.get('attributes', []):
+                    value = next(iter(attribute['value'].values()), None)
+                    if 'intValue' in attribute['value']:
+                        value = int(value)
+                    attributes[attribute['key']] = value
+                start, end = int(otlp['startTimeUnixNano']), int(otlp['endTimeUnixNano'])
+                status = otlp.get('status', {})
+                yield {
+                    'trace_id': otlp['traceId'], 'span_id': otlp['spanId'],
+                    'parent_id': otlp.get('parentSpanId') or None, 'name': otlp['name'],
+                    'start_ns': start, 'end_ns': end, 'duration_ms': round((end - start) / 1e6, 3),
+                    'status': 'error' if status.get('code') == 2 else 'ok', 'error': status.get('message'),
+                    'attributes': attributes, 'links': [link['spanId'] for link in otlp.get('links', [])]
+                }
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """Span records from a JSON lines or OTLP/JSON trace file"""
+    spans = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = loads(line)
+            if 'resourceSpans' in record:
+                spans.extend(_from_otlp(record))
+            else:
+                spans.append(record)
+    return spans
+
+
+def critical_path(spans: List[Dict[str, Any]], root: Dict[str, Any]) -> List[Tuple[int, Dict[str, Any]]]:
+    """(depth, span) along the chain of spans that determined when `root` finished.
+
+    Walking back from a span's end, the path takes the child that finished
+    last, then the sibling it was linked from (its pipeline input) or else
+    the latest child that finished before it started, and so on; each child
+    on the path is expanded the same way.
+    """
+    by_id = {record['span_id']: record for record in spans}
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in spans:
+        if record.get('parent_id'):
+            children[record['parent_id']].append(record)
+
+    path: List[Tuple[int, Dict[str, Any]]] = []
+
+    def walk(record: Dict[str, Any], depth: int):
+        path.append((depth, record))
+        kids = sorted(children.get(record['span_id'], []), key=lambda kid: kid['end_ns'])
+        if not kids:
+            return
+        ends = [kid['end_ns'] for kid in kids]
+        chain = []
+        current = kids[-1]
+        while current is not None:
+            chain.append(current)
+            linked = [by_id[link] for link in current.get('links') or ()
+                      if link in by_id and by_id[link].get('parent_id') == record['span_id']]
+            if linked:
+                current = max(linked, key=lambda kid: kid['end_ns'])
+                continue
+            index = bisect.bisect_right(ends, current['start_ns']) - 1
+            current = kids[index] if index >= 0 else None
+        for kid in reversed(chain):
+            walk(kid, depth + 1)
+
+    walk(root, 0)
+    return path
+
+
+def _describe(attributes: Dict[str, Any], width: int = 70) -> str:
+    text = ' '.join(f"{key}={value}" for key, value in attributes.items())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def summarize(spans: List[Dict[str, Any]], trace_id: Optional[str] = None, top: int = 10) -> str:
+    """Critical path and slowest span names of one trace (default: the latest root)"""
+    roots = [record for record in spans if not record.get('parent_id')
+             and (trace_id is None or record['trace_id'] == trace_id)]
+    if not roots:
+        return "No matching trace found"
+    root = max(roots, key=lambda record: record['start_ns'])
+    trace = [record for record in spans if record['trace_id'] == root['trace_id']]
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in trace:
+        if record.get('parent_id'):
+            children[record['parent_id']].append(record)
+
+    lines = [f"trace {root['trace_id']}  {root['name']}  {root['duration_ms'] / 1000:.3f}s  ({len(trace)} spans)",
+             '', 'critical path (offset, duration, self time):']
+    for depth, record in critical_path(trace, root):
+        duration = record['end_ns'] - record['start_ns']
+        self_time = max(0, duration - sum(kid['end_ns'] - kid['start_ns'] for kid in children[record['span_id']]))
+        failed = f"  ERROR {record.get('error') or ''}" if record.get('status') == 'error' else ''
+        lines.append(f"  +{(record['start_ns'] - root['start_ns']) / 1e9:8.3f}s {duration / 1e9:8.3f}s "
+                     f"{self_time / 1e9:8.3f}s  {'  ' * depth}{record['name']}  "
+                     f"{_describe(record.get('attributes') or {})}{failed}")
+
+    totals: Dict[str, List[float]] = defaultdict(list)
+    for record in trace:
+        totals[record['name']].append((record['end_ns'] - record['start_ns']) / 1e9)
+    lines += ['', f"{'span':<24} {'count':>7} {'total s':>9} {'max s':>9}"]
+    for name, durations in sorted(totals.items(), key=lambda item: -sum(item[1]))[:top]:
+        lines.append(f"{name:<24} {len(durations):>7} {sum(durations):>9.3f} {max(durations):>9.3f}")
+    errors = [record for record in trace if record.get('status') == 'error']
+    if errors:
+        lines += ['', f"{len(errors)} failed spans:"]
+        lines += [f"  {record['name']}  {_describe(record.get('attributes') or {})}  {record.get('error')}"
+                  for record in errors[:top]]
+    return '\n'.join(lines)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarise span traces")
+    commands = parser.add_subparsers(dest='command', required=True)
+    summary = commands.add_parser('summary', help="Print the critical path of a traced run")
+    summary.add_argument('path', help="JSON lines or OTLP/JSON trace file")
+    summary.add_argument('--trace', help="Trace id (default: the latest run in the file)")
+    summary.add_argument('--top', type=int, default=10, help="Span names listed by total time")
+    args = parser.parse_args()
+
+    if args.command == 'summary':
+        print(summarize(load_spans(args.path), args.trace, args.top))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,12 +2,29 @@ import { NextResponse } from 'next/server';
 import { exec } from 'child_process';
 import { promisify } from 'util';
 import path from 'path';
+import { callScraperService, scraperServiceFailure } from '@/lib/scraper-service';
 
 const execAsync = promisify(exec);
 
 export async function GET() {
     try {
-        // Execute the Python script
+        // Prefer the warm scraper daemon; run the script only when it is not running
+        let servicePosts;
+        try {
+            servicePosts = await callScraperService('/reddit-hazards');
+        } catch (error) {
+            console.error('Scraper service error:', error);
+            const { body, status } = scraperServiceFailure(error);
+            return NextResponse.json(body, { status });
+        }
+        if (servicePosts) {
+            return NextResponse.json({
+                success: true,
+                data: servicePosts
+            });
+        }
+
+        // Otherwise execute the Python script
         const scriptPath = path.join(process.cwd(), 'backend', 'reddit_analyzer.py');
         const { stdout, stderr } = await execAsync(`python "${scriptPath}"`);
 
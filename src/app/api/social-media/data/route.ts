@@ -1,10 +1,28 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import path from 'path';
+import { callScraperService, scraperServiceFailure } from '@/lib/scraper-service';
 
 export async function GET(request: NextRequest) {
+  // Prefer the warm scraper daemon; spawn Python only when it is not running
+  let serviceResult;
   try {
-    // Try to run the real web scraper
+    serviceResult = await callScraperService('/scrape');
+  } catch (error) {
+    console.error('Scraper service error:', error);
+    const { body, status } = scraperServiceFailure(error);
+    return NextResponse.json(body, { status });
+  }
+  if (serviceResult) {
+    return NextResponse.json({
+      success: true,
+      data: serviceResult,
+      message: 'Live data from real web scraper - NOAA, Reddit, RSS feeds'
+    });
+  }
+
+  try {
+    // Otherwise run the real web scraper in a fresh process
     const scraperPath = path.join(process.cwd(), 'python-services', 'real_web_scraper.py');
     const venvPath = path.join(process.cwd(), 'python-services', 'venv');
     
@@ -13,8 +31,9 @@ export async function GET(request: NextRequest) {
       ? path.join(venvPath, 'Scripts', 'python.exe')
       : path.join(venvPath, 'bin', 'python');
     
-    // Run Python scraper with virtual environment
-    const pythonProcess = spawn(pythonExe, [scraperPath], {
+    // Run Python scraper with virtual environment; --cached serves the latest
+    // result at once and refreshes it in the background when it is stale
+    const pythonProcess = spawn(pythonExe, [scraperPath, '--cached'], {
       cwd: process.cwd(),
       stdio: ['pipe', 'pipe', 'pipe']
     });
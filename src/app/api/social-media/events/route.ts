@@ -0,0 +1,30 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getScraperServiceUrl } from '@/lib/scraper-service';
+
+// Long-lived stream; never cache or prerender
+export const dynamic = 'force-dynamic';
+
+// Proxies the scraper daemon's Server-Sent Events stream of newly stored posts.
+// Query parameters (urgency, hazard_type, source, buffer) are passed through,
+// e.g. /api/social-media/events?urgency=high
+export async function GET(request: NextRequest) {
+  const upstream = await fetch(`${getScraperServiceUrl()}/events${request.nextUrl.search}`, {
+    cache: 'no-store',
+    signal: request.signal
+  }).catch(() => null);
+
+  if (!upstream || !upstream.ok || !upstream.body) {
+    return NextResponse.json(
+      { success: false, message: 'Live post stream unavailable - start python-services/real_web_scraper.py --serve' },
+      { status: 503 }
+    );
+  }
+
+  return new Response(upstream.body, {
+    headers: {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache, no-transform',
+      Connection: 'keep-alive'
+    }
+  });
+}
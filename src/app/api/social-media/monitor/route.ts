@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { spawn } from 'child_process';
 import path from 'path';
+import { callScraperService, scraperServiceFailure, SCRAPE_TIMEOUT_MS } from '@/lib/scraper-service';
 
 export async function POST(request: NextRequest): Promise<NextResponse> {
   try {
@@ -36,6 +37,26 @@ export async function POST(request: NextRequest): Promise<NextResponse> {
     // Use the FREE monitoring service instead of expensive Twitter API
     console.log('Starting FREE social media monitoring with keywords:', finalKeywords);
     
+    // Prefer the warm scraper daemon; spawn Python only when it is not running.
+    // The daemon scrapes its configured sources, so keywords are not sent to it.
+    let serviceResult;
+    try {
+      serviceResult = await callScraperService('/scrape', { method: 'POST' }, SCRAPE_TIMEOUT_MS);
+    } catch (error) {
+      console.error('Scraper service error:', error);
+      const { body, status } = scraperServiceFailure(error);
+      return NextResponse.json(body, { status });
+    }
+    if (serviceResult) {
+      return NextResponse.json({
+        success: true,
+        ...serviceResult,
+        message: 'FREE monitoring completed! Sources: Reddit, News RSS, Government alerts.',
+        cost: 'FREE - No API fees!',
+        sources: ['Reddit (free)', 'News RSS (free)', 'Government APIs (free)']
+      });
+    }
+    
     // Path to the real web scraper (same as data endpoint)
     const pythonScriptPath = path.join(process.cwd(), 'python-services', 'real_web_scraper.py');
     const venvPath = path.join(process.cwd(), 'python-services', 'venv');
@@ -0,0 +1,88 @@
+// Client for the long-running Python scraper daemon
+// (python-services/real_web_scraper.py --serve). Routes call the daemon first
+// and fall back to spawning a fresh Python process only when it is not running.
+// A daemon that is running but slow (e.g. busy with a live scrape) is not down:
+// spawning a second scraper next to it would only add load.
+
+const DEFAULT_SERVICE_URL = 'http://127.0.0.1:8765';
+
+export const DEFAULT_TIMEOUT_MS = 30000;
+// POST /scrape runs a live scrape of every source before it answers
+export const SCRAPE_TIMEOUT_MS = 180000;
+
+export function getScraperServiceUrl(): string {
+  return process.env.SCRAPER_SERVICE_URL || DEFAULT_SERVICE_URL;
+}
+
+/** The daemon is running but did not answer in time */
+export class ScraperServiceBusyError extends Error {
+  constructor(endpoint: string, timeoutMs: number) {
+    super(`Scraper service ${endpoint} did not answer within ${timeoutMs / 1000}s`);
+    this.name = 'ScraperServiceBusyError';
+  }
+}
+
+/** The daemon answered with an error status */
+export class ScraperServiceError extends Error {
+  constructor(endpoint: string, readonly status: number) {
+    super(`Scraper service ${endpoint} returned ${status}`);
+    this.name = 'ScraperServiceError';
+  }
+}
+
+function isConnectionRefused(error: unknown): boolean {
+  // Node's fetch wraps the socket error: TypeError('fetch failed', { cause })
+  const cause = (error as { cause?: { code?: string } } | null)?.cause;
+  return cause?.code === 'ECONNREFUSED';
+}
+
+/**
+ * Call a daemon endpoint and return its JSON, or null when the daemon is not
+ * running (connection refused) and the caller should fall back.
+ * Throws ScraperServiceBusyError when it does not reply in time and
+ * ScraperServiceError when it answers with an error status.
+ */
+export async function callScraperService<T = any>(
+  endpoint: string,
+  init: RequestInit = {},
+  timeoutMs = DEFAULT_TIMEOUT_MS
+): Promise<T | null> {
+  const controller = new AbortController();
+  const timeout = setTimeout(() => controller.abort(), timeoutMs);
+
+  try {
+    const response = await fetch(`${getScraperServiceUrl()}${endpoint}`, {
+      ...init,
+      signal: controller.signal,
+      cache: 'no-store'
+    });
+    if (!response.ok) {
+      throw new ScraperServiceError(endpoint, response.status);
+    }
+    return (await response.json()) as T;
+  } catch (error) {
+    if (controller.signal.aborted) {
+      throw new ScraperServiceBusyError(endpoint, timeoutMs);
+    }
+    if (isConnectionRefused(error)) {
+      return null;
+    }
+    throw error;
+  } finally {
+    clearTimeout(timeout);
+  }
+}
+
+/** Response body and status for a daemon that is up but failed or is busy */
+export function scraperServiceFailure(error: unknown): { body: Record<string, unknown>; status: number } {
+  if (error instanceof ScraperServiceBusyError) {
+    return {
+      body: { success: false, busy: true, error: 'Scraper service is busy, try again shortly' },
+      status: 503
+    };
+  }
+  return {
+    body: { success: false, error: error instanceof Error ? error.message : 'Scraper service error' },
+    status: 502
+  };
+}